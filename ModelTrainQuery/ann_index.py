@@ -0,0 +1,190 @@
+import math
+import time
+
+import faiss
+import numpy as np
+
+INDEX_TYPES = ("flat", "ivf-flat", "ivf-pq", "hnsw")
+TRAIN_SAMPLE = 100_000
+# Defaults are stored in the saved index, so load_local queries with the same settings.
+NPROBE = 16
+PQ_M = 48
+PQ_NBITS = 8
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+
+
+def default_nlist(count):
+    """About 4*sqrt(n) lists, but never fewer than 39 training points per list."""
+    return max(1, min(int(4 * math.sqrt(count)), count // 39))
+
+
+def _pq_subquantizers(dim, requested):
+    return max(m for m in range(1, min(requested, dim) + 1) if dim % m == 0)
+
+
+def reconstruct_all(index):
+    """Every stored vector, in position order (approximate for PQ)."""
+    if index.ntotal == 0:
+        return np.empty((0, index.d), dtype=np.float32)
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.make_direct_map()
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def new_index(index_type, vectors, nlist=None, nprobe=NPROBE, pq_m=PQ_M, pq_nbits=PQ_NBITS,
+              hnsw_m=HNSW_M, ef_search=HNSW_EF_SEARCH, train_sample=TRAIN_SAMPLE, seed=0):
+    """An empty L2 index of `index_type`, trained on a random sample of `vectors` when it needs training."""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    count, dim = vectors.shape
+    if index_type == "flat":
+        return faiss.IndexFlatL2(dim)
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, hnsw_m)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index.hnsw.efSearch = ef_search
+        return index
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {index_type!r}; expected one of {', '.join(INDEX_TYPES)}")
+
+    nlist = nlist or default_nlist(count)
+    quantizer = faiss.IndexFlatL2(dim)
+    if index_type == "ivf-flat":
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist)
+        needed = nlist
+    else:
+        m = _pq_subquantizers(dim, pq_m)
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, m, pq_nbits)
+        needed = max(nlist, 2 ** pq_nbits)
+    if count < needed:
+        print(f"⚠️ {count} vectors are too few to train {index_type} (need {needed}); using a flat index.")
+        return faiss.IndexFlatL2(dim)
+
+    rng = np.random.default_rng(seed)
+    sample = vectors if count <= train_sample else vectors[rng.choice(count, train_sample, replace=False)]
+    start = time.time()
+    index.train(sample)
+    index.nprobe = nprobe
+    print(f"🎛️ Trained {index_type} (nlist={nlist}) on {len(sample)} vectors in {time.time() - start:.1f}s")
+    return index
+
+
+def index_type_of(index):
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf-pq"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf-flat"
+    return "flat"
+
+
+def convert_vectorstore(vectorstore, index_type, **params):
+    """Rebuild a langchain FAISS store's index as `index_type`, keeping positions and docstore ids."""
+    if index_type == index_type_of(vectorstore.index):
+        return vectorstore
+    vectors = reconstruct_all(vectorstore.index)
+    index = new_index(index_type, vectors, **params)
+    index.add(vectors)
+    vectorstore.index = index
+    print(f"🧱 Converted index to {index_type_of(index)} ({index.ntotal} vectors)")
+    return vectorstore
+
+
+def _renumber_ivf_ids(ivf, keep):
+    """After remove_ids, give the surviving ids (sorted `keep`) back positions 0..len(keep)-1 in place."""
+    invlists = ivf.invlists
+    for list_no in range(ivf.nlist):
+        size = invlists.list_size(list_no)
+        if size:
+            ids = faiss.rev_swig_ptr(invlists.get_ids(list_no), size)
+            ids[:] = np.searchsorted(keep, ids)
+
+
+def delete_documents(vectorstore, ids):
+    """FAISS.delete for any index type, in one pass however many ids are given.
+
+    langchain assumes remove_ids shifts later positions down, which only
+    IndexFlat does. IVF indexes keep the old ids, so the survivors are
+    renumbered in the inverted lists instead; codes are untouched, so IVF-PQ
+    loses no precision. HNSW cannot remove at all, so its remaining vectors
+    are re-added to an emptied copy. Callers should collect a whole update's
+    ids and delete them once.
+    """
+    if not ids:
+        return True
+    index = vectorstore.index
+    if isinstance(index, faiss.IndexFlat):
+        return vectorstore.delete(ids)
+    reversed_index = {doc_id: i for i, doc_id in vectorstore.index_to_docstore_id.items()}
+    drop = {reversed_index[doc_id] for doc_id in ids}
+    keep = [i for i in sorted(vectorstore.index_to_docstore_id) if i not in drop]
+    if isinstance(index, faiss.IndexIVF) and isinstance(faiss.downcast_InvertedLists(index.invlists),
+                                                        faiss.ArrayInvertedLists):
+        index.set_direct_map_type(faiss.DirectMap.NoMap)
+        index.remove_ids(faiss.IDSelectorBatch(np.fromiter(drop, dtype=np.int64, count=len(drop))))
+        _renumber_ivf_ids(index, np.asarray(keep, dtype=np.int64))
+    else:
+        vectors = reconstruct_all(index)[keep]
+        index = faiss.clone_index(index)
+        index.reset()
+        if len(vectors):
+            index.add(vectors)
+        vectorstore.index = index
+    vectorstore.docstore.delete(ids)
+    vectorstore.index_to_docstore_id = {
+        new: vectorstore.index_to_docstore_id[old] for new, old in enumerate(keep)
+    }
+    return True
+
+
+def set_search_params(index, nprobe=None, ef_search=None):
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None and nprobe:
+        ivf.nprobe = nprobe
+    if isinstance(index, faiss.IndexHNSW) and ef_search:
+        index.hnsw.efSearch = ef_search
+
+
+def search_subset(index, vectors, positions, k):
+    """index.search restricted to the sorted `positions`, for pre-filtered retrieval.
+
+    A flat index is searched by brute force over just those rows of its storage
+    (file-backed when loaded by mmap_store.read_index_mmap), so the cost scales
+    with the subset. Other index types
+    skip excluded ids through an IDSelector during their normal traversal.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    positions = np.asarray(positions, dtype=np.int64)
+    distances = np.full((len(vectors), k), np.inf, dtype=np.float32)
+    labels = np.full((len(vectors), k), -1, dtype=np.int64)
+    if len(positions) == 0 or len(vectors) == 0:
+        return distances, labels
+
+    if isinstance(index, faiss.IndexFlatL2):
+        stored = faiss.rev_swig_ptr(index.get_xb(), index.ntotal * index.d).reshape(index.ntotal, index.d)
+        subset = stored[positions]
+        scores = ((vectors ** 2).sum(axis=1)[:, None] - 2 * vectors @ subset.T + (subset ** 2).sum(axis=1)[None, :])
+        np.maximum(scores, 0, out=scores)
+        n = min(k, len(positions))
+        if n < len(positions):
+            top = np.argpartition(scores, n - 1, axis=1)[:, :n]
+        else:
+            top = np.tile(np.arange(n), (len(vectors), 1))
+        order = np.take_along_axis(scores, top, axis=1).argsort(axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        distances[:, :n] = np.take_along_axis(scores, top, axis=1)
+        labels[:, :n] = positions[top]
+        return distances, labels
+
+    selector = faiss.IDSelectorBatch(positions)
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        params = faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nprobe)
+    elif isinstance(index, faiss.IndexHNSW):
+        params = faiss.SearchParametersHNSW(sel=selector, efSearch=index.hnsw.efSearch)
+    else:
+        params = faiss.SearchParameters(sel=selector)
+    return index.search(vectors, k, params=params)
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+ANSWER_CACHE_FILE = "answer_cache.sqlite3"
+SIMILARITY_THRESHOLD = 0.95
+TTL_SECONDS = 7 * 24 * 3600
+MAX_ENTRIES = 10_000
+INDEX_FILES = ("index.faiss", "index.pkl", "docs_offsets.npy")
+
+
+def index_version(path):
+    """Fingerprint of a saved index directory; changes whenever the index is rebuilt or updated."""
+    parts = []
+    for name in INDEX_FILES:
+        file_path = os.path.join(path, name)
+        if os.path.exists(file_path):
+            stat = os.stat(file_path)
+            parts.append(f"{name}:{stat.st_size}:{stat.st_mtime_ns}")
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def chunk_ids(docs):
+    return [doc.id or hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest() for doc in docs]
+
+
+class AnswerCache:
+    """Generated answers reused for questions that mean the same thing.
+
+    A cached answer is returned when a new question's embedding has cosine
+    similarity >= threshold with a cached question AND retrieval returned the
+    same chunk ids, so the LLM would have seen the same context. Entries
+    expire after ttl seconds, the least recently used go past max_entries,
+    and entries built against another index version are dropped on open.
+    """
+
+    def __init__(self, path=ANSWER_CACHE_FILE, version="", threshold=SIMILARITY_THRESHOLD,
+                 ttl=TTL_SECONDS, max_entries=MAX_ENTRIES):
+        self.version = version
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers (id INTEGER PRIMARY KEY, version TEXT, vector BLOB, "
+            "chunk_ids TEXT, question TEXT, answer TEXT, created REAL, used REAL)"
+        )
+        dropped = self._conn.execute("DELETE FROM answers WHERE version != ? OR created < ?",
+                                     (version, time.time() - ttl)).rowcount
+        self._conn.commit()
+        if dropped:
+            print(f"♻️ Answer cache: dropped {dropped} entries from an older index or past their TTL")
+
+        rows = self._conn.execute("SELECT id, vector, chunk_ids, created FROM answers").fetchall()
+        self._ids = [row[0] for row in rows]
+        self._chunk_ids = [row[2] for row in rows]
+        self._created = [row[3] for row in rows]
+        self._vectors = np.stack([np.frombuffer(row[1], dtype=np.float32) for row in rows]) if rows else None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _unit(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def get(self, question_vector, docs):
+        """The cached answer for this question and retrieved context, or None."""
+        ids = json.dumps(chunk_ids(docs))
+        with self._lock:
+            if self._vectors is not None:
+                similarities = self._vectors @ self._unit(question_vector)
+                expired_before = time.time() - self.ttl
+                for row in np.argsort(-similarities):
+                    if similarities[row] < self.threshold:
+                        break
+                    if self._chunk_ids[row] == ids and self._created[row] >= expired_before:
+                        answer = self._conn.execute("SELECT answer FROM answers WHERE id = ?",
+                                                    (self._ids[row],)).fetchone()
+                        if answer is not None:
+                            self._conn.execute("UPDATE answers SET used = ? WHERE id = ?",
+                                               (time.time(), self._ids[row]))
+                            self._conn.commit()
+                            self.hits += 1
+                            return answer[0]
+            self.misses += 1
+            return None
+
+    def put(self, question, question_vector, docs, answer):
+        vector = self._unit(question_vector)
+        ids = json.dumps(chunk_ids(docs))
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO answers (version, vector, chunk_ids, question, answer, created, used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (self.version, vector.tobytes(), ids, question, answer, now, now),
+            )
+            self._ids.append(cursor.lastrowid)
+            self._chunk_ids.append(ids)
+            self._created.append(now)
+            self._vectors = vector[None] if self._vectors is None else np.vstack([self._vectors, vector])
+            if len(self._ids) > self.max_entries:
+                self._evict(len(self._ids) - self.max_entries)
+            self._conn.commit()
+
+    def _evict(self, count):
+        evicted = {row[0] for row in self._conn.execute(
+            "SELECT id FROM answers ORDER BY used LIMIT ?", (count,)).fetchall()}
+        self._conn.executemany("DELETE FROM answers WHERE id = ?", [(i,) for i in evicted])
+        keep = [row for row, answer_id in enumerate(self._ids) if answer_id not in evicted]
+        self._ids = [self._ids[row] for row in keep]
+        self._chunk_ids = [self._chunk_ids[row] for row in keep]
+        self._created = [self._created[row] for row in keep]
+        self._vectors = self._vectors[keep] if keep else None
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM answers")
+            self._conn.commit()
+            self._ids, self._chunk_ids, self._created, self._vectors = [], [], [], None
+
+    def summary(self):
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0.0
+        return f"{self.hits} hits / {self.misses} misses ({rate:.0f}% hit rate), {len(self._ids)} answers cached"
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
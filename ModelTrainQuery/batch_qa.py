@@ -0,0 +1,225 @@
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+
+from lexical_index import load_lexical_index
+from metadata_filter import load_filter_index
+from qa_service import (EMBEDDER_BACKEND, EMBEDDER_BACKENDS, LLM_MODEL_PATH, TOP_K, QAService, load_embedder,
+                        load_vectorstore, setup_llama_model)
+from query_server import StageStats
+from reranker import RERANK_DEPTH, RERANK_MODEL, CrossEncoderReranker
+
+# Questions embedded and searched per retrieval call.
+RETRIEVAL_BATCH = 1024
+# Each LLM worker loads its own llama.cpp model and gets cpu_count // workers threads.
+LLM_WORKERS = 1
+
+
+def load_questions(path):
+    """JSONL lines with "question" and optionally "id" and "filter"; ids default to the line number.
+
+    Any other fields (an expected answer or source, say) are copied to the results.
+    A "filter" that is not an object of field names is rejected with its line number.
+    """
+    questions = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get("filter") is not None and not isinstance(record["filter"], dict):
+                raise ValueError(f"{path}:{line_number}: \"filter\" must be an object of field names to values, "
+                                 f"not {record['filter']!r}")
+            record.setdefault("id", line_number)
+            questions.append(record)
+    return questions
+
+
+def unsupported_filters(questions, filter_index):
+    """Ids of questions whose filter the loaded index cannot apply; run_batch records these as errors."""
+    fields = set(filter_index.values) | {"crawled_after"} if filter_index is not None else set()
+    return [record["id"] for record in questions if set(record.get("filter") or ()) - fields]
+
+
+def completed_ids(path):
+    """Ids answered by an earlier run of `path`; a torn last line is cut off and failed ones are retried."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    valid = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            valid += len(line)
+            if "error" not in record:
+                done.add(record["id"])
+    if valid != os.path.getsize(path):
+        with open(path, "r+b") as f:
+            f.truncate(valid)
+    return done
+
+
+class ResultWriter:
+    """Appends one JSON line per finished question, from any thread, flushed as it goes."""
+
+    def __init__(self, path):
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+        self.written = 0
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self.written += 1
+
+    def close(self):
+        self._file.close()
+
+
+def result_record(record, docs_with_scores, timings, answer=None, error=None):
+    """The input record plus sources and stage timings; embed/search/... cover the question's whole retrieval batch."""
+    result = dict(record, sources=[{"source": doc.metadata.get("source"), "url": doc.metadata.get("url"),
+                                    "score": score} for doc, score in docs_with_scores],
+                  timings_ms={stage: round(seconds * 1000, 2) for stage, seconds in timings.items()})
+    if answer is not None:
+        result["answer"] = answer
+    if error is not None:
+        result["error"] = error
+    return result
+
+
+def _generation_worker(service, jobs, writer, stats):
+    while True:
+        job = jobs.get()
+        if job is None:
+            return
+        record, docs_with_scores, vector, timings, queued_at = job
+        started = time.perf_counter()
+        timings["llm_queue"] = started - queued_at
+        try:
+            answer = service.generate(record["question"], docs_with_scores, vector)
+        except Exception as e:
+            writer.write(result_record(record, docs_with_scores, timings, error=str(e)))
+            continue
+        timings["generate"] = time.perf_counter() - started
+        stats.record(timings)
+        writer.write(result_record(record, docs_with_scores, timings, answer))
+
+
+def run_batch(services, questions, writer, retrieval_batch=RETRIEVAL_BATCH, generate=True):
+    """Retrieve `questions` in large batches and answer them on one worker thread per service.
+
+    Retrieval of the next batch overlaps generation of the previous one; the
+    job queue is bounded so retrieval never runs far ahead of the LLMs.
+    """
+    stats = StageStats(window=max(1, len(questions)))
+    jobs = queue.Queue(maxsize=4 * len(services))
+    workers = []
+    if generate:
+        for i, service in enumerate(services):
+            worker = threading.Thread(target=_generation_worker, args=(service, jobs, writer, stats),
+                                      name=f"llm-worker-{i}", daemon=True)
+            worker.start()
+            workers.append(worker)
+
+    retriever = services[0]
+    try:
+        for start in range(0, len(questions), retrieval_batch):
+            block = questions[start:start + retrieval_batch]
+            groups = {}
+            for record in block:
+                groups.setdefault(json.dumps(record.get("filter") or None, sort_keys=True), []).append(record)
+            for group in groups.values():
+                try:
+                    results, vectors, batch_timings = retriever.retrieve([r["question"] for r in group],
+                                                                         group[0].get("filter") or None)
+                except ValueError as e:
+                    # A bad filter (unknown field, no filter index) fails its own questions, not the batch.
+                    print(f"❌ Retrieval failed for {len(group)} questions with filter {group[0].get('filter')}: {e}")
+                    for record in group:
+                        writer.write(result_record(dict(record, batch_size=len(group)), [], {}, error=str(e)))
+                    continue
+                for record, docs_with_scores, vector in zip(group, results, vectors):
+                    record = dict(record, batch_size=len(group))
+                    timings = dict(batch_timings)
+                    if generate:
+                        jobs.put((record, docs_with_scores, vector, timings, time.perf_counter()))
+                    else:
+                        stats.record(timings)
+                        writer.write(result_record(record, docs_with_scores, timings))
+            print(f"🔍 Retrieved {min(start + retrieval_batch, len(questions))}/{len(questions)} questions")
+    finally:
+        for _ in workers:
+            jobs.put(None)
+        for worker in workers:
+            worker.join()
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of questions, resumably, into a JSONL file.")
+    parser.add_argument("questions", help="JSONL of {\"question\": ..., \"id\"?: ..., \"filter\"?: {...}}")
+    parser.add_argument("output", help="results JSONL; questions already in it are skipped")
+    parser.add_argument("--index", default="vector_index")
+    parser.add_argument("--embedder", choices=EMBEDDER_BACKENDS, default=EMBEDDER_BACKEND)
+    parser.add_argument("--embedder-model", default=None,
+                        help="embedding model, e.g. finetune.py's fine-tuned-miniLM (must match the index)")
+    parser.add_argument("--llm", default=LLM_MODEL_PATH, help="GGUF model to answer with")
+    parser.add_argument("--workers", type=int, default=LLM_WORKERS, help="llama.cpp instances generating in parallel")
+    parser.add_argument("--retrieval-batch", type=int, default=RETRIEVAL_BATCH,
+                        help="questions per batched embed and search")
+    parser.add_argument("--retrieve-only", action="store_true", help="write retrieved sources without generating")
+    parser.add_argument("--top-k", type=int, default=TOP_K, help="chunks retrieved per question")
+    parser.add_argument("--no-lexical", action="store_true", help="vector search only, without BM25 fusion")
+    parser.add_argument("--rerank", type=int, nargs="?", const=RERANK_DEPTH, default=None, metavar="DEPTH",
+                        help="re-rank DEPTH candidates with a cross-encoder")
+    parser.add_argument("--context-tokens", type=int, default=None,
+                        help="cap on context tokens (default: whatever n_ctx leaves after prompt and answer)")
+    args = parser.parse_args()
+
+    questions = load_questions(args.questions)
+    done = completed_ids(args.output)
+    pending = [record for record in questions if record["id"] not in done]
+    print(f"📄 {len(questions)} questions, {len(questions) - len(pending)} already answered in {args.output}")
+    if not pending:
+        raise SystemExit(0)
+
+    embedder = load_embedder(args.embedder, args.embedder_model)
+    vectorstore = load_vectorstore(args.index, embedder=embedder)
+    lexical = None if args.no_lexical else load_lexical_index(args.index)
+    filter_index = load_filter_index(args.index)
+    unsupported = unsupported_filters(pending, filter_index)
+    if unsupported:
+        print(f"⚠️ {len(unsupported)} questions filter on fields this index does not have "
+              f"(first ids: {unsupported[:5]}); they will be written as errors")
+    reranker = CrossEncoderReranker(RERANK_MODEL, args.rerank) if args.rerank else None
+    # Answers are not cached here: an evaluation run should measure fresh generations.
+    if args.retrieve_only:
+        llms = [None]
+    else:
+        threads = max(1, (os.cpu_count() or 1) // args.workers)
+        llms = [setup_llama_model(args.llm, n_threads=threads) for _ in range(args.workers)]
+    services = [QAService(embedder, vectorstore, llm, k=args.top_k, pack_context=llm is not None,
+                          context_tokens=args.context_tokens, lexical=lexical,
+                          filter_index=filter_index, reranker=reranker)
+                for llm in llms]
+
+    writer = ResultWriter(args.output)
+    start = time.perf_counter()
+    try:
+        stats = run_batch(services, pending, writer, args.retrieval_batch, generate=not args.retrieve_only)
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - start
+    print(f"✅ Wrote {writer.written} results in {elapsed:.1f}s ({writer.written / elapsed:.1f} questions/s)")
+    print(f"📊 Stage latencies: {json.dumps(stats.summary()['stages'])}")
@@ -0,0 +1,86 @@
+import argparse
+import os
+import time
+
+import faiss
+import numpy as np
+
+from ann_index import INDEX_TYPES, new_index, reconstruct_all, set_search_params
+
+
+def load_vectors(index_path, count, dim, seed=0):
+    if index_path:
+        return reconstruct_all(faiss.read_index(os.path.join(index_path, "index.faiss")))
+    # Clustered synthetic vectors behave more like sentence embeddings than uniform noise.
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, count // 200), dim)).astype(np.float32)
+    vectors = centers[rng.integers(len(centers), size=count)] + 0.3 * rng.normal(size=(count, dim))
+    return vectors.astype(np.float32)
+
+
+def make_queries(vectors, count, seed=1):
+    """Stored vectors plus noise, so a query is close to, but not exactly, a chunk."""
+    rng = np.random.default_rng(seed)
+    picked = vectors[rng.choice(len(vectors), min(count, len(vectors)), replace=False)]
+    scale = 0.1 * float(np.linalg.norm(vectors, axis=1).mean()) / np.sqrt(vectors.shape[1])
+    return (picked + scale * rng.normal(size=picked.shape)).astype(np.float32)
+
+
+def measure(index, queries, truth, k):
+    index.search(queries[:1], k)
+    latencies = []
+    found = np.empty((len(queries), k), dtype=np.int64)
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        found[i] = index.search(query[None], k)[1][0]
+        latencies.append(time.perf_counter() - start)
+    recall = np.mean([len(set(row) & set(expected)) / k for row, expected in zip(found, truth)])
+    return recall, np.percentile(latencies, 50) * 1000, np.percentile(latencies, 99) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare FAISS index types on recall@k and query latency.")
+    parser.add_argument("--index-path", help="saved vector_index/ to take vectors from (default: synthetic)")
+    parser.add_argument("--count", type=int, default=100_000, help="synthetic vectors")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--types", nargs="+", choices=INDEX_TYPES, default=list(INDEX_TYPES))
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 16, 64], help="IVF values to sweep")
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[16, 64, 256], help="HNSW values to sweep")
+    args = parser.parse_args()
+
+    vectors = load_vectors(args.index_path, args.count, args.dim)
+    queries = make_queries(vectors, args.queries)
+    print(f"📄 {len(vectors)} vectors of dim {vectors.shape[1]}, {len(queries)} queries, k={args.k}")
+
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    truth = exact.search(queries, args.k)[1]
+
+    rows = []
+    for index_type in args.types:
+        start = time.perf_counter()
+        index = new_index(index_type, vectors)
+        index.add(vectors)
+        build = time.perf_counter() - start
+        size_mb = faiss.serialize_index(index).nbytes / 1e6
+        if index_type.startswith("ivf") and isinstance(index, faiss.IndexIVF):
+            settings = [(f"nprobe={n}", {"nprobe": n}) for n in args.nprobe]
+        elif index_type == "hnsw":
+            settings = [(f"efSearch={ef}", {"ef_search": ef}) for ef in args.ef_search]
+        else:
+            settings = [("exact", {})]
+        for label, params in settings:
+            set_search_params(index, **params)
+            recall, p50, p99 = measure(index, queries, truth, args.k)
+            rows.append((index_type, label, build, size_mb, recall, p50, p99))
+
+    print(f"\n{'index':>9} {'setting':>13} {'build s':>8} {'size MB':>8} "
+          f"{f'recall@{args.k}':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for index_type, label, build, size_mb, recall, p50, p99 in rows:
+        print(f"{index_type:>9} {label:>13} {build:>8.1f} {size_mb:>8.1f} {recall:>9.3f} {p50:>8.3f} {p99:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
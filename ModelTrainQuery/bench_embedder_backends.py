@@ -0,0 +1,79 @@
+import argparse
+import time
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from bench_parallel_embed import load_texts
+from onnx_embedder import ONNX_MODEL_DIR, OnnxEmbedder, cosine_parity
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+QUESTIONS = [
+    "What is Form G-1055?",
+    "How to file an asylum claim?",
+    "Who can request a fee waiver?",
+    "What happens after a Request for Evidence?",
+    "How long does naturalization processing take?",
+    "Can I travel while my green card application is pending?",
+]
+
+
+def percentile_ms(samples, q):
+    return float(np.percentile(samples, q)) * 1000
+
+
+def time_queries(encode, questions, rounds):
+    encode(questions[:1])
+    samples = []
+    for _ in range(rounds):
+        for question in questions:
+            start = time.perf_counter()
+            encode([question])
+            samples.append(time.perf_counter() - start)
+    return samples
+
+
+def time_batch(encode, texts):
+    encode(texts[:32])
+    start = time.perf_counter()
+    vectors = encode(texts)
+    return np.asarray(vectors), len(texts) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare PyTorch and ONNX (fp32/int8) embedder latency and parity.")
+    parser.add_argument("--model", default=MODEL_NAME, help="model the ONNX directory was exported from")
+    parser.add_argument("--onnx-dir", default=ONNX_MODEL_DIR)
+    parser.add_argument("--texts-dir", help="directory of .txt chunks (default: synthetic chunks)")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=50, help="passes over the question list for latency")
+    parser.add_argument("--threads", type=int, default=None, help="onnxruntime intra-op threads")
+    args = parser.parse_args()
+
+    texts = load_texts(args.texts_dir, args.count)
+    print(f"📄 {len(texts)} chunks, {len(QUESTIONS) * args.rounds} timed queries")
+
+    model = SentenceTransformer(args.model, device="cpu")
+    backends = [("torch", lambda batch: model.encode(batch, convert_to_numpy=True, show_progress_bar=False))]
+    for quantized in (False, True):
+        embedder = OnnxEmbedder(args.onnx_dir, quantized=quantized, threads=args.threads)
+        backends.append((f"onnx-{'int8' if quantized else 'fp32'}", embedder.encode))
+
+    rows = []
+    baseline = None
+    for name, encode in backends:
+        latencies = time_queries(encode, QUESTIONS, args.rounds)
+        vectors, rate = time_batch(encode, texts)
+        if baseline is None:
+            baseline = vectors
+        cosine = cosine_parity(baseline, vectors)
+        rows.append((name, percentile_ms(latencies, 50), percentile_ms(latencies, 99), rate,
+                     float(cosine.min()), float(cosine.mean())))
+
+    print(f"\n{'backend':>10} {'p50 ms':>8} {'p99 ms':>8} {'chunks/s':>9} {'min cos':>9} {'mean cos':>9}")
+    for name, p50, p99, rate, min_cos, mean_cos in rows:
+        print(f"{name:>10} {p50:>8.2f} {p99:>8.2f} {rate:>9.1f} {min_cos:>9.5f} {mean_cos:>9.5f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import argparse
+import json
+import random
+import re
+import time
+
+import numpy as np
+
+from lexical_index import LexicalIndex, reciprocal_rank_fusion
+from qa_service import EMBEDDER_BACKEND, EMBEDDER_BACKENDS, FUSION_DEPTH, doc_at, load_embedder, load_vectorstore
+from reranker import RERANK_DEPTH, RERANK_MODEL, CrossEncoderReranker
+
+FORM_RE = re.compile(r"\b[A-Z]{1,3}-\d+[A-Z]?\b")
+
+
+def load_questions(path):
+    """JSONL lines like {"question": "...", "source": "<page the answer is on>"}."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def synthetic_questions(vectorstore, count, seed=0):
+    """Known-item questions: a form number or a short phrase taken from a random chunk, labelled with its page."""
+    rng = random.Random(seed)
+    total = vectorstore.index.ntotal
+    questions = []
+    for position in rng.sample(range(total), min(count, total)):
+        doc = doc_at(vectorstore, position)
+        forms = FORM_RE.findall(doc.page_content)
+        if forms:
+            question = f"What is Form {rng.choice(forms)}?"
+        else:
+            words = doc.page_content.split()
+            start = rng.randrange(max(1, len(words) - 8))
+            question = " ".join(words[start:start + 8])
+        questions.append({"question": question, "source": doc.metadata.get("source", position)})
+    return questions
+
+
+def percentiles(samples):
+    return np.percentile(samples, 50) * 1000, np.percentile(samples, 99) * 1000
+
+
+def evaluate(embedder, vectorstore, lexical, questions, k, depth=FUSION_DEPTH, reranker=None):
+    depth = max(k, depth, reranker.depth if reranker else 0)
+    vectors = np.asarray(embedder.embed_documents([q["question"] for q in questions]), dtype=np.float32)
+    latencies = {"vector": [], "lexical": [], "fusion": [], "rerank": []}
+    hits = {"vector": 0, "lexical": 0, "hybrid": 0, "reranked": 0}
+
+    def hit(positions, source):
+        return any(doc_at(vectorstore, p).metadata.get("source", p) == source for p in positions[:k])
+
+    for vector, question in zip(vectors, questions):
+        start = time.perf_counter()
+        row = [p for p in vectorstore.index.search(vector[None], depth)[1][0].tolist() if p != -1]
+        searched = time.perf_counter()
+        lexical_row = [p for p, _ in lexical.search(question["question"], depth)]
+        lexical_done = time.perf_counter()
+        fused = [p for p, _ in reciprocal_rank_fusion([row, lexical_row], k)]
+        latencies["vector"].append(searched - start)
+        latencies["lexical"].append(lexical_done - searched)
+        latencies["fusion"].append(time.perf_counter() - lexical_done)
+
+        hits["vector"] += hit(row, question["source"])
+        hits["lexical"] += hit(lexical_row, question["source"])
+        hits["hybrid"] += hit(fused, question["source"])
+
+        if reranker is not None:
+            candidates = [(doc_at(vectorstore, p), score)
+                          for p, score in reciprocal_rank_fusion([row, lexical_row], reranker.depth)]
+            rerank_start = time.perf_counter()
+            (reranked,) = reranker.rerank([question["question"]], [candidates], k)
+            latencies["rerank"].append(time.perf_counter() - rerank_start)
+            hits["reranked"] += any(doc.metadata.get("source") == question["source"] for doc, _ in reranked)
+
+    total_latency = [sum(parts) for parts in zip(latencies["vector"], latencies["lexical"], latencies["fusion"])]
+    print(f"\n{'retrieval':>9} {f'recall@{k}':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, samples in (("vector", latencies["vector"]), ("lexical", latencies["lexical"]),
+                          ("hybrid", total_latency)):
+        p50, p99 = percentiles(samples)
+        print(f"{name:>9} {hits[name] / len(questions):>9.3f} {p50:>8.3f} {p99:>8.3f}")
+    p50, p99 = percentiles(latencies["fusion"])
+    print(f"{'fusion':>9} {'':>9} {p50:>8.3f} {p99:>8.3f}   (included in hybrid)")
+    if reranker is not None:
+        p50, p99 = percentiles(latencies["rerank"])
+        print(f"{'reranked':>9} {hits['reranked'] / len(questions):>9.3f} {p50:>8.3f} {p99:>8.3f}   "
+              f"(cross-encoder over {reranker.depth} hybrid candidates, on top of hybrid)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall@k and latency of vector, BM25 and fused retrieval.")
+    parser.add_argument("--index", default="vector_index")
+    parser.add_argument("--questions", help="JSONL of {question, source} (default: synthetic known-item questions)")
+    parser.add_argument("--count", type=int, default=500, help="synthetic questions")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--embedder", choices=EMBEDDER_BACKENDS, default=EMBEDDER_BACKEND)
+    parser.add_argument("--rerank", type=int, nargs="?", const=RERANK_DEPTH, default=None, metavar="DEPTH",
+                        help="also measure cross-encoder re-ranking of DEPTH fused candidates")
+    parser.add_argument("--rerank-model", default=RERANK_MODEL)
+    args = parser.parse_args()
+
+    embedder = load_embedder(args.embedder)
+    vectorstore = load_vectorstore(args.index, embedder=embedder)
+    questions = load_questions(args.questions) if args.questions else synthetic_questions(vectorstore, args.count)
+    print(f"📄 {len(questions)} questions over {vectorstore.index.ntotal} chunks")
+    reranker = CrossEncoderReranker(args.rerank_model, args.rerank) if args.rerank else None
+    evaluate(embedder, vectorstore, LexicalIndex(args.index), questions, args.k, reranker=reranker)
@@ -0,0 +1,73 @@
+import argparse
+import glob
+import os
+import random
+import time
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from parallel_embed import ParallelEmbedder
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+AUTOTUNE_WARMUP = 256
+SENTENCES = [
+    "Officers review the evidence submitted with the application.",
+    "Form I-589 is used to apply for asylum and for withholding of removal.",
+    "An applicant may request a fee waiver by filing Form I-912.",
+    "USCIS may issue a Request for Evidence if the record is incomplete.",
+    "The applicant must establish eligibility at the time of filing.",
+]
+
+
+def load_texts(texts_dir, count, seed=0):
+    if texts_dir:
+        texts = []
+        for path in sorted(glob.glob(os.path.join(texts_dir, "*.txt")))[:count]:
+            with open(path, "r", encoding="utf-8") as f:
+                texts.append(f.read())
+        return texts
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(SENTENCES) for _ in range(rng.randint(1, 14))) for _ in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare single-process and multi-process chunk embedding.")
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--texts-dir", help="directory of .txt chunks (default: synthetic chunks)")
+    parser.add_argument("--count", type=int, default=4000)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument("--batch-size", type=int, default=None, help="fixed batch size (default: auto-tune)")
+    args = parser.parse_args()
+
+    texts = load_texts(args.texts_dir, args.count)
+    print(f"📄 {len(texts)} chunks, {os.cpu_count()} cores")
+
+    model = SentenceTransformer(args.model, device="cpu")
+    model.encode(texts[:32])
+    start = time.perf_counter()
+    baseline = model.encode(texts, convert_to_numpy=True, show_progress_bar=False)
+    baseline_rate = len(texts) / (time.perf_counter() - start)
+
+    rows = [("single process", os.cpu_count(), baseline_rate, 0.0, 1.0)]
+    for workers in args.workers:
+        embedder = ParallelEmbedder(args.model, workers=workers, threads_per_worker=1, batch_size=args.batch_size)
+        embedder.encode(texts[:AUTOTUNE_WARMUP])
+        start = time.perf_counter()
+        vectors = embedder.encode(texts)
+        rate = len(texts) / (time.perf_counter() - start)
+        embedder.close()
+
+        max_diff = float(np.abs(vectors - baseline).max())
+        cosine = np.sum(vectors * baseline, axis=1) / (
+            np.linalg.norm(vectors, axis=1) * np.linalg.norm(baseline, axis=1))
+        rows.append((f"{workers} workers", workers, rate, max_diff, float(cosine.min())))
+
+    print(f"\n{'mode':>16} {'cores':>6} {'chunks/s':>9} {'per core':>9} {'max |diff|':>11} {'min cos':>9}")
+    for mode, cores, rate, max_diff, cosine in rows:
+        print(f"{mode:>16} {cores:>6} {rate:>9.1f} {rate / cores:>9.1f} {max_diff:>11.2e} {cosine:>9.6f}")
+
+
+if __name__ == "__main__":
+    main()
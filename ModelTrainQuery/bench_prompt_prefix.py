@@ -0,0 +1,55 @@
+import argparse
+import time
+
+import numpy as np
+
+from bench_embedder_backends import QUESTIONS
+from bench_parallel_embed import load_texts
+from qa_service import LLM_MODEL_PATH, PROMPT_TEMPLATE, setup_llama_model
+
+
+def first_token_seconds(client, prompt, reset):
+    """Time until llama.cpp returns the first generated token of `prompt`."""
+    if reset:
+        client.reset()
+    start = time.perf_counter()
+    client.create_completion(prompt, max_tokens=1)
+    return time.perf_counter() - start
+
+
+def run(client, contexts, reset):
+    client.reset()
+    samples = []
+    for context in contexts:
+        for question in QUESTIONS:
+            prompt = PROMPT_TEMPLATE.format(context=context, question=question)
+            samples.append(first_token_seconds(client, prompt, reset))
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time to first token with and without llama.cpp's reuse of the evaluated prompt prefix.")
+    parser.add_argument("--llm", default=LLM_MODEL_PATH, help="GGUF model path")
+    parser.add_argument("--contexts", type=int, default=3, help="retrieved contexts, each asked every question")
+    parser.add_argument("--chunks", type=int, default=3, help="chunks per context")
+    args = parser.parse_args()
+
+    client = setup_llama_model(args.llm).client
+    client.verbose = False
+    texts = load_texts(None, args.contexts * args.chunks)
+    contexts = ["\n\n".join(texts[i:i + args.chunks]) for i in range(0, len(texts), args.chunks)]
+    context_tokens = np.mean([len(client.tokenize(c.encode("utf-8"))) for c in contexts])
+    print(f"📄 {len(contexts)} contexts of ~{context_tokens:.0f} tokens x {len(QUESTIONS)} follow-up questions")
+
+    first_token_seconds(client, PROMPT_TEMPLATE.format(context=contexts[0], question=QUESTIONS[0]), reset=True)
+    cold = run(client, contexts, reset=True)
+    reused = run(client, contexts, reset=False)
+    print(f"{'mode':<28}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, samples in (("full prompt every time", cold), ("evaluated prefix reused", reused)):
+        print(f"{name:<28}{np.percentile(samples, 50) * 1000:>10.0f}{np.percentile(samples, 95) * 1000:>10.0f}")
+    print(f"⚡ Prefix reuse: {np.median(cold) / np.median(reused):.1f}x faster to first token")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import os
+import re
+from datetime import datetime
+
+# The chunker is shared with the scrapers (see uscis_text), so scraped chunks already fit.
+from uscis_text.text_chunker import TextChunker, default_chunker, tokenizer_counter
+
+BASE_URL = "https://www.uscis.gov"
+
+# Chunk objects written by scaper_to_s3_page.py: <timestamp>_<page slug>_chunk<n>.txt
+CHUNK_KEY_RE = re.compile(r"^(?P<ts>\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})_(?P<page>.+)_chunk(?P<n>\d+)\.txt$")
+# scraper_with_chunks.py writes <sanitized url>_chunk_<n>.txt. Both scrapers start each chunk with "---\n<url>\n".
+LEGACY_CHUNK_KEY_RE = re.compile(r"_chunk_(?P<n>\d+)\.txt$")
+URL_HEADER_RE = re.compile(r"^---\n(?P<url>https?://\S+)\n")
+POLICY_MANUAL_RE = re.compile(r"policy-manual.*?volume-(?P<volume>\d+)(?:-part-(?P<part>[a-z]))?(?:-chapter-(?P<chapter>\d+))?",
+                              re.IGNORECASE)
+
+
+def page_source(key):
+    """The page a chunk object belongs to; keys that don't follow the scraper layout stand alone."""
+    match = CHUNK_KEY_RE.match(os.path.basename(key))
+    return match["page"] if match else key
+
+
+def chunk_metadata(key, text):
+    """Splits a chunk object into (text, metadata): source page, URL, policy-manual volume/part/chapter,
+    crawl time and chunk number, as far as the key and text carry them.
+
+    The URL comes from the "---\\n<url>" header both scrapers start chunks
+    with, which is removed from the text. Only objects written before
+    scaper_to_s3_page.py added it fall back to a URL guessed from the page slug.
+    """
+    metadata = {"source": page_source(key)}
+    header = URL_HEADER_RE.match(text)
+    if header:
+        metadata["url"] = header["url"]
+        text = text[header.end():]
+
+    name = os.path.basename(key)
+    match = CHUNK_KEY_RE.match(name)
+    if match:
+        page = match["page"]
+        metadata.setdefault("url", BASE_URL if page == "root" else f"{BASE_URL}/{page.replace('_', '/')}")
+        metadata["crawled_at"] = datetime.strptime(match["ts"], "%Y-%m-%d_%H-%M-%S").isoformat()
+        metadata["chunk"] = int(match["n"])
+    else:
+        legacy = LEGACY_CHUNK_KEY_RE.search(name)
+        if legacy:
+            metadata["chunk"] = int(legacy["n"])
+
+    manual = POLICY_MANUAL_RE.search(metadata.get("url", name))
+    if manual:
+        metadata["volume"] = int(manual["volume"])
+        if manual["part"]:
+            metadata["part"] = manual["part"].upper()
+        if manual["chapter"]:
+            metadata["chapter"] = int(manual["chapter"])
+    return text, metadata
+
+
+def latest_pages(objects):
+    """Groups (key, text) chunk objects into {source: [(text, metadata)]}, keeping only each page's newest crawl."""
+    pages = {}
+    for key, text in objects:
+        chunk = chunk_metadata(key, text)
+        match = CHUNK_KEY_RE.match(os.path.basename(key))
+        if not match:
+            pages[key] = ("", {0: chunk})
+            continue
+        source, crawled_at, n = match["page"], match["ts"], int(match["n"])
+        current = pages.get(source)
+        if current is None or crawled_at > current[0]:
+            pages[source] = (crawled_at, {n: chunk})
+        elif crawled_at == current[0]:
+            current[1][n] = chunk
+    return {source: [chunks[n] for n in sorted(chunks)] for source, (_, chunks) in pages.items()}
+
+
+def embedder_chunker(embedder):
+    """A TextChunker counting with the embedder's own tokenizer, sized to its sequence length.
+
+    Scraped chunks already fit, so they come back whole; only longer legacy
+    objects are split again.
+    """
+    model = getattr(embedder, "model", None)
+    tokenizer = getattr(embedder, "tokenizer", None) or getattr(model, "tokenizer", None)
+    if tokenizer is None:
+        return default_chunker()
+    max_length = getattr(model, "max_seq_length", None) or getattr(embedder, "config", {}).get("max_seq_length")
+    if not max_length:
+        return TextChunker(tokenizer_counter(tokenizer))
+    # Room for [CLS] and [SEP].
+    return TextChunker(tokenizer_counter(tokenizer), max_tokens=max_length - 2)
@@ -0,0 +1,195 @@
+import re
+
+from langchain.docstore.document import Document
+
+N_CTX = 4096
+ANSWER_TOKENS = 256  # LlamaCpp's default max_tokens
+SHINGLE_SIZE = 5
+DUPLICATE_JACCARD = 0.8
+MIN_OVERLAP_CHARS = 40
+MIN_PARTIAL_TOKENS = 64
+SEPARATOR = "\n\n"
+
+WORD_RE = re.compile(r"\w+")
+SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+def token_counter(llm):
+    """Counts with the llama.cpp tokenizer when the LLM has one, otherwise about 4 characters per token."""
+    client = getattr(llm, "client", None)
+    if client is not None and hasattr(client, "tokenize"):
+        return lambda text: len(client.tokenize(text.encode("utf-8"), add_bos=False))
+    return estimate_tokens
+
+
+def source_line(metadata):
+    url = metadata.get("url")
+    return f"Source: {url}\n" if url else ""
+
+
+def context_block(doc):
+    """A context Document as it appears in the prompt: its text under the source URL, when known."""
+    return source_line(doc.metadata) + doc.page_content
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    words = WORD_RE.findall(text.lower())
+    if len(words) <= size:
+        return {tuple(words)}
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def overlap_length(left, right, min_chars=MIN_OVERLAP_CHARS):
+    """Length of the longest suffix of `left` that is also a prefix of `right`, if at least min_chars."""
+    if len(left) < min_chars or len(right) < min_chars:
+        return 0
+    probe = right[:min_chars]
+    start = max(0, len(left) - len(right))
+    while True:
+        position = left.find(probe, start)
+        if position == -1:
+            return 0
+        if right.startswith(left[position:]):
+            return len(left) - position
+        start = position + 1
+
+
+class ContextPacker:
+    """Turns ranked retrieval results into the context blocks sent to the LLM.
+
+    Near-duplicate chunks (shingle Jaccard >= duplicate_threshold, or one
+    contained in another) keep only their best-ranked copy. Chunks of the same
+    source that overlap, as neighbouring chunks from the overlapping splitters
+    do, are merged into one block. Blocks are then added in rank order until
+    the token budget left after the prompt and the answer is used up; the
+    block that crosses the budget is cut at a sentence boundary.
+    """
+
+    def __init__(self, count_tokens=estimate_tokens, n_ctx=N_CTX, answer_tokens=ANSWER_TOKENS,
+                 max_context_tokens=None, duplicate_threshold=DUPLICATE_JACCARD, min_overlap=MIN_OVERLAP_CHARS):
+        self.count_tokens = count_tokens
+        self.n_ctx = n_ctx
+        self.answer_tokens = answer_tokens
+        self.max_context_tokens = max_context_tokens
+        self.duplicate_threshold = duplicate_threshold
+        self.min_overlap = min_overlap
+        self.totals = {"questions": 0, "chunks": 0, "duplicates": 0, "merged": 0, "truncated": 0,
+                       "over_budget": 0, "tokens": 0}
+
+    def budget(self, reserved_tokens):
+        budget = self.n_ctx - self.answer_tokens - reserved_tokens
+        if self.max_context_tokens is not None:
+            budget = min(budget, self.max_context_tokens)
+        return max(0, budget)
+
+    def _dedupe(self, docs, stats):
+        kept = []
+        for doc in docs:
+            text = doc.page_content.strip()
+            if not text:
+                stats["duplicates"] += 1
+                continue
+            doc_shingles = shingles(text)
+            duplicate = False
+            for entry in kept:
+                if text in entry["text"] or jaccard(doc_shingles, entry["shingles"]) >= self.duplicate_threshold:
+                    duplicate = True
+                    break
+                if entry["text"] in text:
+                    # The lower-ranked chunk holds the better-ranked one; keep the fuller text at the better rank.
+                    entry.update(text=text, shingles=doc_shingles, metadata=dict(doc.metadata))
+                    duplicate = True
+                    break
+            if duplicate:
+                stats["duplicates"] += 1
+            else:
+                kept.append({"text": text, "shingles": doc_shingles, "metadata": dict(doc.metadata)})
+        return kept
+
+    def _merge(self, blocks, stats):
+        merged = True
+        while merged:
+            merged = False
+            for i, first in enumerate(blocks):
+                source = first["metadata"].get("source")
+                if source is None:
+                    continue
+                for j in range(i + 1, len(blocks)):
+                    second = blocks[j]
+                    if second["metadata"].get("source") != source:
+                        continue
+                    forward = overlap_length(first["text"], second["text"], self.min_overlap)
+                    backward = overlap_length(second["text"], first["text"], self.min_overlap)
+                    if forward:
+                        first["text"] = first["text"] + second["text"][forward:]
+                    elif backward:
+                        first["text"] = second["text"] + first["text"][backward:]
+                    else:
+                        continue
+                    del blocks[j]
+                    stats["merged"] += 1
+                    merged = True
+                    break
+                if merged:
+                    break
+        return blocks
+
+    def _truncate(self, text, budget):
+        pieces = []
+        used = 0
+        for sentence in SENTENCE_END_RE.split(text):
+            tokens = self.count_tokens(sentence + " ")
+            if used + tokens > budget:
+                break
+            pieces.append(sentence)
+            used += tokens
+        return " ".join(pieces), used
+
+    def pack(self, docs, reserved_tokens=0):
+        """Context Documents for `docs` (best first) within the budget, and counts of what was done."""
+        stats = {"chunks": len(docs), "duplicates": 0, "merged": 0, "truncated": 0, "over_budget": 0}
+        blocks = self._merge(self._dedupe(docs, stats), stats)
+
+        remaining = self.budget(reserved_tokens)
+        separator_tokens = self.count_tokens(SEPARATOR)
+        packed = []
+        for block in blocks:
+            header = source_line(block["metadata"])
+            overhead = separator_tokens + (self.count_tokens(header) if header else 0)
+            tokens = self.count_tokens(block["text"]) + overhead
+            if tokens <= remaining:
+                packed.append(Document(page_content=block["text"], metadata=block["metadata"]))
+                remaining -= tokens
+            elif remaining >= MIN_PARTIAL_TOKENS:
+                text, used = self._truncate(block["text"], remaining - overhead)
+                if text:
+                    packed.append(Document(page_content=text, metadata=block["metadata"]))
+                    remaining -= used + overhead
+                    stats["truncated"] += 1
+                else:
+                    stats["over_budget"] += 1
+            else:
+                stats["over_budget"] += 1
+
+        stats["tokens"] = self.budget(reserved_tokens) - remaining
+        stats["blocks"] = len(packed)
+        self.totals["questions"] += 1
+        for key in ("chunks", "duplicates", "merged", "truncated", "over_budget", "tokens"):
+            self.totals[key] += stats[key]
+        return packed, stats
+
+    def summary(self):
+        questions = max(1, self.totals["questions"])
+        return (f"{self.totals['tokens'] / questions:.0f} context tokens/question, "
+                f"{self.totals['duplicates']} duplicates dropped, {self.totals['merged']} chunks merged, "
+                f"{self.totals['truncated']} truncated, {self.totals['over_budget']} over budget")
@@ -0,0 +1,129 @@
+import hashlib
+import sqlite3
+import threading
+import unicodedata
+
+import numpy as np
+
+EMBEDDING_CACHE_FILE = "embedding_cache.sqlite3"
+MAX_ENTRIES = 500_000
+SQL_BATCH = 500
+# Eviction trims to this fraction of max_entries, so it runs once per many inserts rather than on each.
+LOW_WATER = 0.9
+# Lookups' last-used times are written with the next insert, or once this many are pending.
+TOUCH_FLUSH = 5_000
+
+
+def normalize_text(text):
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class EmbeddingCache:
+    """On-disk embeddings keyed by (model name, hash of whitespace/NFC-normalized text).
+
+    Holds at most max_entries vectors; past that the least recently used ones
+    are evicted down to LOW_WATER of it. Safe to share between threads and
+    between build and query processes. Rows are counted in memory, from an
+    upper bound that grows with every insert, and only recounted in SQLite
+    once it passes max_entries. Hits only mark their rows as used in memory;
+    those times reach SQLite in the next put_many transaction, so a lookup
+    costs no write of its own.
+    """
+
+    def __init__(self, path=EMBEDDING_CACHE_FILE, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB, dim INTEGER, used INTEGER)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_used ON embeddings (used)")
+        self._conn.commit()
+        self._clock = self._conn.execute("SELECT COALESCE(MAX(used), 0) FROM embeddings").fetchone()[0]
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self._touched = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(model_name, text):
+        return hashlib.sha256(f"{model_name}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys):
+        found = {}
+        keys = list(set(keys))
+        with self._lock:
+            self._clock += 1
+            for i in range(0, len(keys), SQL_BATCH):
+                batch = keys[i:i + SQL_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+            self._touched.update(dict.fromkeys(found, self._clock))
+            if len(self._touched) >= TOUCH_FLUSH:
+                self._write_touched()
+                self._conn.commit()
+        return found
+
+    def _write_touched(self):
+        if self._touched:
+            self._conn.executemany("UPDATE embeddings SET used = ? WHERE key = ?",
+                                   [(used, key) for key, used in self._touched.items()])
+            self._touched = {}
+
+    def put_many(self, vectors_by_key):
+        with self._lock:
+            self._clock += 1
+            self._write_touched()
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, dim, used) VALUES (?, ?, ?, ?)",
+                [(key, np.asarray(vector, dtype=np.float32).tobytes(), len(vector), self._clock)
+                 for key, vector in vectors_by_key.items()],
+            )
+            # Replaced keys are counted too, so this only overestimates.
+            self._count += len(vectors_by_key)
+            if self._count > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        excess = self._count - int(self.max_entries * LOW_WATER)
+        if self._count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY used LIMIT ?)", (excess,)
+            )
+            self._count -= excess
+
+    def embed(self, model_name, texts, encode):
+        """Embeddings for `texts` in order, calling encode(list_of_texts) only for cache misses."""
+        keys = [self.key(model_name, text) for text in texts]
+        found = self.get_many(keys)
+        misses = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                misses.setdefault(key, text)
+        if misses:
+            vectors = encode(list(misses.values()))
+            computed = {key: np.asarray(vector, dtype=np.float32) for key, vector in zip(misses, vectors)}
+            self.put_many(computed)
+            found.update(computed)
+        self.hits += len(keys) - len(misses)
+        self.misses += len(misses)
+        return np.stack([found[key] for key in keys]) if keys else np.empty((0, 0), dtype=np.float32)
+
+    def summary(self):
+        total = self.hits + self.misses
+        rate = self.hits / total * 100 if total else 0.0
+        return f"{self.hits} hits / {self.misses} misses ({rate:.0f}% hit rate)"
+
+    def close(self):
+        with self._lock:
+            self._write_touched()
+            self._conn.commit()
+            self._conn.close()
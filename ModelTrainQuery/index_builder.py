@@ -0,0 +1,164 @@
+import os
+import shutil
+import time
+
+from langchain_community.vectorstores import FAISS
+
+from ann_index import convert_vectorstore, delete_documents
+from chunk_objects import chunk_metadata, embedder_chunker
+from index_dedup import MinHashIndex, SmallestSourceFilter, minhash
+from mmap_store import save_vectorstore
+
+BATCH_SIZE = 512
+CHECKPOINT_EVERY = 20
+DONE_KEYS_FILE = "done_keys.txt"
+NEAR_DUPLICATES_FILE = "near_duplicates.npz"
+
+
+class StreamingIndexBuilder:
+    """Builds a FAISS store batch by batch instead of embedding the whole corpus at once.
+
+    Documents arrive as (source_key, text). Their split chunks are embedded in
+    batches of about batch_size and added to the index as they fill. Every
+    checkpoint_every batches the store and the set of finished source keys are
+    saved under checkpoint_dir, and a restarted build resumes from there.
+    Batches go into a flat index; a different index_type is trained and
+    built from it just before the final save. With near_duplicates, chunks
+    are filtered by SmallestSourceFilter: a chunk displaced by one seen later
+    is taken out of the pending batch or the index, so the copy kept does not
+    depend on download order. Chunks are stored under "<key>#<split>" ids.
+    """
+
+    def __init__(self, embedder, save_path="vector_index", batch_size=BATCH_SIZE,
+                 checkpoint_every=CHECKPOINT_EVERY, checkpoint_dir=None, splitter=None,
+                 index_type="flat", index_params=None, near_duplicates=True):
+        self.embedder = embedder
+        self.save_path = save_path
+        self.batch_size = batch_size
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_dir = checkpoint_dir or f"{save_path}_checkpoint"
+        self.splitter = splitter or embedder_chunker(embedder)
+        self.index_type = index_type
+        self.index_params = index_params or {}
+        self.near_duplicates = SmallestSourceFilter() if near_duplicates else None
+        self.vectorstore = None
+        self.done_keys = set()
+        self._batch_texts = []
+        self._batch_metadatas = []
+        self._batch_ids = []
+        self._batch_keys = []
+        self._batches_since_checkpoint = 0
+        self.chunks_added = 0
+
+    def build(self, documents):
+        self._resume()
+        start = time.time()
+        skipped = 0
+        for key, text in documents:
+            if key in self.done_keys:
+                skipped += 1
+                continue
+            text, metadata = chunk_metadata(key, text)
+            for i, chunk in enumerate(self.splitter.split_text(text)):
+                doc_id = f"{key}#{i}"
+                if self.near_duplicates is not None:
+                    keep, displaced = self.near_duplicates.add(doc_id, chunk, metadata["source"])
+                    if displaced:
+                        self._discard(displaced)
+                    if not keep:
+                        continue
+                self._batch_ids.append(doc_id)
+                self._batch_texts.append(chunk)
+                self._batch_metadatas.append(dict(metadata, split=i))
+            self._batch_keys.append(key)
+            if len(self._batch_texts) >= self.batch_size:
+                self._flush()
+        self._flush()
+
+        if self.vectorstore is None:
+            print("⚠️ No documents to index.")
+            return None
+        convert_vectorstore(self.vectorstore, self.index_type, **self.index_params)
+        print(f"💾 Saving vector store to {self.save_path}/ "
+              f"({self.chunks_added} chunks added, {skipped} documents already indexed, "
+              f"{self.duplicates_skipped} near-duplicate chunks skipped, "
+              f"{time.time() - start:.1f}s)")
+        save_vectorstore(self.vectorstore, self.save_path)
+        self._clear_checkpoint()
+        return self.vectorstore
+
+    @property
+    def duplicates_skipped(self):
+        return self.near_duplicates.skipped if self.near_duplicates is not None else 0
+
+    def _discard(self, doc_ids):
+        """Take displaced chunks back out of the pending batch, or the index if already embedded."""
+        doc_ids = set(doc_ids)
+        pending = [i for i, doc_id in enumerate(self._batch_ids) if doc_id in doc_ids]
+        for i in reversed(pending):
+            doc_ids.discard(self._batch_ids[i])
+            del self._batch_ids[i], self._batch_texts[i], self._batch_metadatas[i]
+        if doc_ids:
+            delete_documents(self.vectorstore, list(doc_ids))
+            self.chunks_added -= len(doc_ids)
+
+    def _flush(self):
+        if self._batch_texts:
+            vectors = self.embedder.embed_documents(self._batch_texts)
+            text_embeddings = list(zip(self._batch_texts, vectors))
+            if self.vectorstore is None:
+                self.vectorstore = FAISS.from_embeddings(text_embeddings, self.embedder,
+                                                         metadatas=self._batch_metadatas, ids=self._batch_ids)
+            else:
+                self.vectorstore.add_embeddings(text_embeddings, metadatas=self._batch_metadatas, ids=self._batch_ids)
+            self.chunks_added += len(self._batch_texts)
+            print(f"🧱 Indexed batch of {len(self._batch_texts)} chunks ({self.chunks_added} this run)")
+        self.done_keys.update(self._batch_keys)
+        self._batch_ids, self._batch_texts, self._batch_metadatas, self._batch_keys = [], [], [], []
+
+        self._batches_since_checkpoint += 1
+        if self._batches_since_checkpoint >= self.checkpoint_every:
+            self.checkpoint()
+
+    def checkpoint(self):
+        if self.vectorstore is None:
+            return
+        staging = f"{self.checkpoint_dir}.new"
+        shutil.rmtree(staging, ignore_errors=True)
+        self.vectorstore.save_local(staging)
+        with open(os.path.join(staging, DONE_KEYS_FILE), "w", encoding="utf-8") as f:
+            f.writelines(key + "\n" for key in sorted(self.done_keys))
+        if self.near_duplicates is not None:
+            # Signatures of skipped chunks too, which the rule still needs after a resume.
+            self.near_duplicates.index.save(os.path.join(staging, NEAR_DUPLICATES_FILE))
+        shutil.rmtree(self.checkpoint_dir, ignore_errors=True)
+        os.rename(staging, self.checkpoint_dir)
+        self._batches_since_checkpoint = 0
+        print(f"📌 Checkpoint: {len(self.done_keys)} documents in {self.checkpoint_dir}/")
+
+    def _resume(self):
+        staging = f"{self.checkpoint_dir}.new"
+        if not os.path.isdir(self.checkpoint_dir) and os.path.isdir(staging):
+            # Interrupted between removing the old checkpoint and renaming the new one.
+            os.rename(staging, self.checkpoint_dir)
+        done_file = os.path.join(self.checkpoint_dir, DONE_KEYS_FILE)
+        if not os.path.exists(done_file):
+            return
+        self.vectorstore = FAISS.load_local(self.checkpoint_dir, self.embedder,
+                                            allow_dangerous_deserialization=True)
+        with open(done_file, "r", encoding="utf-8") as f:
+            self.done_keys = set(line.strip() for line in f if line.strip())
+        if self.near_duplicates is not None:
+            signatures = os.path.join(self.checkpoint_dir, NEAR_DUPLICATES_FILE)
+            if os.path.exists(signatures):
+                index = MinHashIndex.load(signatures)
+            else:
+                index = MinHashIndex()
+                for doc_id, doc in self.vectorstore.docstore._dict.items():
+                    index.add(doc_id, minhash(doc.page_content), doc.metadata.get("source"))
+            self.near_duplicates = SmallestSourceFilter(index, kept=self.vectorstore.docstore._dict)
+        print(f"♻️ Resuming from {self.checkpoint_dir}/ with {len(self.done_keys)} documents indexed")
+
+    def _clear_checkpoint(self):
+        shutil.rmtree(self.checkpoint_dir, ignore_errors=True)
+        shutil.rmtree(f"{self.checkpoint_dir}.new", ignore_errors=True)
@@ -0,0 +1,51 @@
+from uscis_text.near_duplicates import MinHashIndex, minhash
+
+
+class SmallestSourceFilter:
+    """Near-duplicate chunk filter whose outcome does not depend on the order chunks arrive in.
+
+    A chunk is skipped when a chunk of a lexicographically smaller source
+    near-duplicates it, whether or not that chunk is kept itself. Every chunk's
+    signature stays indexed, so a chunk seen later can still displace one kept
+    earlier; add() hands those keys back for the caller to take out again.
+    """
+
+    def __init__(self, index=None, kept=()):
+        self.index = index if index is not None else MinHashIndex()
+        self.kept = set(kept)
+
+    @property
+    def skipped(self):
+        return len(self.index) - len(self.kept)
+
+    def add(self, key, text, source):
+        """Returns (keep, displaced): whether the chunk is kept, and the keys of kept chunks it displaces."""
+        signature = minhash(text)
+        matches = self.index.matches(signature, skip_source=source)
+        self.index.add(key, signature, source)
+        self.kept.discard(key)
+        if any(self.index.entries[match][0] < source for match in matches):
+            return False, []
+        displaced = [match for match in matches if match in self.kept]
+        self.kept.difference_update(displaced)
+        self.kept.add(key)
+        return True, displaced
+
+
+def drop_near_duplicates(pages):
+    """{source: [(text, metadata)]} without the pages, then the chunks, that near-duplicate a smaller source's.
+
+    Chunks follow the same rule as the rebuild paths (SmallestSourceFilter over
+    every page's chunks), so --update keeps the same copy as a full rebuild.
+    Pages the scraper already deduplicated pass through unchanged.
+    """
+    page_filter, chunk_filter = SmallestSourceFilter(), SmallestSourceFilter()
+    for source, chunks in pages.items():
+        page_filter.add(source, "\n".join(text for text, _ in chunks), source)
+        for i, (text, _) in enumerate(chunks):
+            chunk_filter.add(f"{source}#{i}", text, source)
+    kept = {source: [chunk for i, chunk in enumerate(chunks) if f"{source}#{i}" in chunk_filter.kept]
+            for source, chunks in pages.items() if source in page_filter.kept}
+    skipped_chunks = sum(len(pages[source]) - len(chunks) for source, chunks in kept.items())
+    print(f"👯 Skipped {len(pages) - len(kept)} near-duplicate pages and {skipped_chunks} near-duplicate chunks")
+    return kept
@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import uuid
+
+from langchain_community.vectorstores import FAISS
+
+from ann_index import delete_documents
+from chunk_objects import embedder_chunker
+from mmap_store import save_vectorstore
+
+MANIFEST_FILE = "manifest.json"
+
+
+def chunk_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+class IndexMaintainer:
+    """Adds, replaces and deletes a saved FAISS store's chunks page by page.
+
+    The manifest maps each source to {chunk hash: [docstore ids]}, so an update
+    only embeds chunks whose hash is new for that page and only deletes vectors
+    whose chunk disappeared. Deletions are collected and applied in one pass
+    by apply_deletes(), which sync() and save() call, since removing from an
+    IVF or HNSW index costs about the same for one id as for many.
+    """
+
+    def __init__(self, embedder, path="vector_index", splitter=None):
+        self.embedder = embedder
+        self.path = path
+        self.splitter = splitter or embedder_chunker(embedder)
+        self.vectorstore = None
+        self.manifest = {}
+        self.stats = {"added": 0, "deleted": 0, "unchanged": 0}
+        self._stale_ids = []
+
+        if os.path.exists(os.path.join(path, "index.faiss")):
+            self.vectorstore = FAISS.load_local(path, embedder, allow_dangerous_deserialization=True)
+            manifest_path = os.path.join(path, MANIFEST_FILE)
+            if os.path.exists(manifest_path):
+                with open(manifest_path, "r", encoding="utf-8") as f:
+                    self.manifest = json.load(f)
+            tracked = {doc_id for entry in self.manifest.values() for ids in entry.values() for doc_id in ids}
+            if tracked != set(self.vectorstore.docstore._dict):
+                # Missing, or left over from an index that was since rebuilt from scratch.
+                self.manifest = self._manifest_from_docstore()
+
+    def _manifest_from_docstore(self):
+        manifest = {}
+        untracked = 0
+        for doc_id, doc in self.vectorstore.docstore._dict.items():
+            source = doc.metadata.get("source")
+            if source is None:
+                untracked += 1
+                continue
+            manifest.setdefault(source, {}).setdefault(chunk_hash(doc.page_content), []).append(doc_id)
+        if untracked:
+            print(f"⚠️ {untracked} chunks have no source metadata and will never be updated; "
+                  f"rebuild with --streaming to track them.")
+        return manifest
+
+    def upsert(self, source, chunks):
+        """Make the index hold exactly the split pieces of `chunks`, (text, metadata) pairs, for this source.
+
+        Unchanged pieces keep the metadata they were first indexed with.
+        """
+        wanted = {}
+        for text, metadata in chunks:
+            for i, piece in enumerate(self.splitter.split_text(text)):
+                wanted.setdefault(chunk_hash(piece), []).append((piece, dict(metadata, split=i)))
+
+        existing = self.manifest.get(source, {})
+        stale_ids = [doc_id for h, ids in existing.items() if h not in wanted for doc_id in ids]
+        entry = {}
+        new_chunks = []
+        for h, copies in wanted.items():
+            ids = existing.get(h, [])
+            entry[h] = ids[:len(copies)]
+            stale_ids.extend(ids[len(copies):])
+            new_chunks.extend((h, chunk) for chunk in copies[len(ids):])
+            self.stats["unchanged"] += min(len(ids), len(copies))
+
+        self._stale_ids.extend(stale_ids)
+        if new_chunks:
+            texts_only = [piece for _, (piece, _) in new_chunks]
+            vectors = self.embedder.embed_documents(texts_only)
+            ids = [str(uuid.uuid4()) for _ in new_chunks]
+            metadatas = [metadata for _, (_, metadata) in new_chunks]
+            if self.vectorstore is None:
+                self.vectorstore = FAISS.from_embeddings(list(zip(texts_only, vectors)), self.embedder,
+                                                         metadatas=metadatas, ids=ids)
+            else:
+                self.vectorstore.add_embeddings(list(zip(texts_only, vectors)), metadatas=metadatas, ids=ids)
+            for (h, _), doc_id in zip(new_chunks, ids):
+                entry[h].append(doc_id)
+            self.stats["added"] += len(new_chunks)
+
+        if entry:
+            self.manifest[source] = entry
+        else:
+            self.manifest.pop(source, None)
+
+    def delete(self, source):
+        self._stale_ids.extend(doc_id for ids in self.manifest.pop(source, {}).values() for doc_id in ids)
+
+    def apply_deletes(self):
+        if self._stale_ids:
+            delete_documents(self.vectorstore, self._stale_ids)
+            self.stats["deleted"] += len(self._stale_ids)
+            self._stale_ids = []
+
+    def sync(self, pages, delete_missing=True):
+        """Bring the index in line with {source: [(text, metadata)]}; sources not in `pages` are removed."""
+        for source, chunks in pages.items():
+            self.upsert(source, chunks)
+        if delete_missing:
+            for source in set(self.manifest) - set(pages):
+                self.delete(source)
+        self.apply_deletes()
+        print(f"🔁 Index update: {self.stats['added']} chunks embedded, {self.stats['deleted']} deleted, "
+              f"{self.stats['unchanged']} unchanged across {len(self.manifest)} pages")
+
+    def save(self):
+        if self.vectorstore is None:
+            return
+        self.apply_deletes()
+        save_vectorstore(self.vectorstore, self.path)
+        manifest_path = os.path.join(self.path, MANIFEST_FILE)
+        with open(f"{manifest_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f)
+        os.replace(f"{manifest_path}.tmp", manifest_path)
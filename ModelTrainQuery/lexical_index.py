@@ -0,0 +1,145 @@
+import json
+import os
+import re
+import time
+from collections import Counter
+
+import numpy as np
+
+LEXICAL_DIR = "lexical"
+K1 = 1.2
+B = 0.75
+RRF_K = 60
+# Form numbers ("I-589", "G-1055", "N-400") stay one token; their number is indexed as well.
+TOKEN_RE = re.compile(r"[a-z]{1,3}-\d+[a-z]?|\w+")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have how i if in is it its may must not of on or "
+    "that the their there these this to was what when where which who will with you your".split()
+)
+
+
+def tokenize(text):
+    tokens = []
+    for token in TOKEN_RE.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        if "-" in token:
+            tokens.append(token.split("-", 1)[1])
+    return tokens
+
+
+class LexicalIndexBuilder:
+    """Collects per-position term counts; save() writes CSR-style postings arrays."""
+
+    def __init__(self):
+        self.term_ids = {}
+        self.doc_terms = []
+        self.doc_lengths = []
+
+    def add(self, position, text):
+        if position != len(self.doc_lengths):
+            raise ValueError(f"positions must be added in order, expected {len(self.doc_lengths)}, got {position}")
+        counts = Counter(tokenize(text))
+        self.doc_terms.append({self.term_ids.setdefault(term, len(self.term_ids)): tf for term, tf in counts.items()})
+        self.doc_lengths.append(sum(counts.values()))
+
+    def save(self, path):
+        out_dir = os.path.join(path, LEXICAL_DIR)
+        os.makedirs(out_dir, exist_ok=True)
+        terms = sorted(self.term_ids, key=self.term_ids.get)
+        df = np.zeros(len(terms), dtype=np.int64)
+        for doc in self.doc_terms:
+            for term_id in doc:
+                df[term_id] += 1
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(df, out=offsets[1:])
+        docs = np.empty(offsets[-1], dtype=np.int32)
+        tfs = np.empty(offsets[-1], dtype=np.uint16)
+        fill = offsets[:-1].copy()
+        for position, doc in enumerate(self.doc_terms):
+            for term_id, tf in doc.items():
+                docs[fill[term_id]] = position
+                tfs[fill[term_id]] = min(tf, np.iinfo(np.uint16).max)
+                fill[term_id] += 1
+
+        arrays = {"offsets": offsets, "docs": docs, "tfs": tfs,
+                  "doc_lengths": np.asarray(self.doc_lengths, dtype=np.int32)}
+        for name, array in arrays.items():
+            with open(os.path.join(out_dir, f"{name}.npy.tmp"), "wb") as f:
+                np.save(f, array)
+            os.replace(os.path.join(out_dir, f"{name}.npy.tmp"), os.path.join(out_dir, f"{name}.npy"))
+        meta = {"terms": terms, "documents": len(self.doc_lengths),
+                "avg_length": float(np.mean(self.doc_lengths)) if self.doc_lengths else 0.0}
+        with open(os.path.join(out_dir, "terms.json.tmp"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(os.path.join(out_dir, "terms.json.tmp"), os.path.join(out_dir, "terms.json"))
+        print(f"🔤 Lexical index: {len(terms)} terms, {len(docs)} postings for {len(self.doc_lengths)} chunks")
+
+
+class LexicalIndex:
+    """BM25 over the memory-mapped postings written by LexicalIndexBuilder, by FAISS position."""
+
+    def __init__(self, path, k1=K1, b=B):
+        index_dir = os.path.join(path, LEXICAL_DIR)
+        with open(os.path.join(index_dir, "terms.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.term_ids = {term: i for i, term in enumerate(meta["terms"])}
+        self.documents = meta["documents"]
+        self.avg_length = meta["avg_length"] or 1.0
+        self.offsets = np.load(os.path.join(index_dir, "offsets.npy"), mmap_mode="r")
+        self.docs = np.load(os.path.join(index_dir, "docs.npy"), mmap_mode="r")
+        self.tfs = np.load(os.path.join(index_dir, "tfs.npy"), mmap_mode="r")
+        self.doc_lengths = np.load(os.path.join(index_dir, "doc_lengths.npy"), mmap_mode="r")
+        self.k1 = k1
+        self.b = b
+
+    @staticmethod
+    def exists(path):
+        return os.path.exists(os.path.join(path, LEXICAL_DIR, "terms.json"))
+
+    def search(self, query, k, allowed=None):
+        """[(position, bm25 score), ...] best first; with `allowed` (sorted positions), only those can match."""
+        doc_parts, score_parts = [], []
+        for term in set(tokenize(query)):
+            term_id = self.term_ids.get(term)
+            if term_id is None:
+                continue
+            start, end = int(self.offsets[term_id]), int(self.offsets[term_id + 1])
+            docs = np.asarray(self.docs[start:end])
+            tfs = np.asarray(self.tfs[start:end], dtype=np.float32)
+            idf = np.log(1 + (self.documents - len(docs) + 0.5) / (len(docs) + 0.5))
+            if allowed is not None:
+                keep = np.isin(docs, allowed, assume_unique=True)
+                docs, tfs = docs[keep], tfs[keep]
+                if not len(docs):
+                    continue
+            norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[docs] / self.avg_length)
+            doc_parts.append(docs)
+            score_parts.append(idf * tfs * (self.k1 + 1) / (tfs + norm))
+        if not doc_parts:
+            return []
+        positions, inverse = np.unique(np.concatenate(doc_parts), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(score_parts))
+        top = np.argsort(-scores)[:k] if len(scores) <= k else np.argpartition(-scores, k)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(positions[i]), float(scores[i])) for i in top]
+
+
+def reciprocal_rank_fusion(rankings, k, rrf_k=RRF_K):
+    """Fuses lists of positions (each best first) into [(position, rrf score), ...] best first."""
+    fused = {}
+    for ranking in rankings:
+        for rank, position in enumerate(ranking):
+            fused[position] = fused.get(position, 0.0) + 1.0 / (rrf_k + rank + 1)
+    return sorted(fused.items(), key=lambda item: -item[1])[:k]
+
+
+def load_lexical_index(path):
+    if not LexicalIndex.exists(path):
+        print(f"⚠️ No lexical index in {path}/; retrieval is vector-only until the index is re-saved.")
+        return None
+    start = time.perf_counter()
+    index = LexicalIndex(path)
+    print(f"🔤 Loaded lexical index ({len(index.term_ids)} terms) in {(time.perf_counter() - start) * 1000:.1f} ms")
+    return index
@@ -0,0 +1,125 @@
+import json
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+
+FILTER_DIR = "filters"
+# Metadata fields with a position list per value; crawl time gets a range filter instead.
+FILTER_FIELDS = ("source", "volume", "part", "chapter")
+NO_CRAWL_TIME = -1
+
+
+def filter_value(value):
+    return str(value).strip().lower()
+
+
+def crawl_epoch(value):
+    if not value:
+        return NO_CRAWL_TIME
+    return int(datetime.fromisoformat(str(value)).timestamp())
+
+
+class FilterIndexBuilder:
+    """Collects per-position metadata; save() writes sorted position arrays per field value."""
+
+    def __init__(self, fields=FILTER_FIELDS):
+        self.fields = fields
+        self.postings = {field: {} for field in fields}
+        self.crawl_times = []
+
+    def add(self, position, metadata):
+        if position != len(self.crawl_times):
+            raise ValueError(f"positions must be added in order, expected {len(self.crawl_times)}, got {position}")
+        for field in self.fields:
+            value = metadata.get(field)
+            if value is not None:
+                self.postings[field].setdefault(filter_value(value), []).append(position)
+        self.crawl_times.append(crawl_epoch(metadata.get("crawled_at")))
+
+    def save(self, path):
+        out_dir = os.path.join(path, FILTER_DIR)
+        os.makedirs(out_dir, exist_ok=True)
+        ranges = {}
+        parts = []
+        start = 0
+        for field in self.fields:
+            ranges[field] = {}
+            for value, positions in sorted(self.postings[field].items()):
+                # Positions arrive in order, so every list is already sorted.
+                parts.append(np.asarray(positions, dtype=np.int64))
+                ranges[field][value] = [start, start + len(positions)]
+                start += len(positions)
+        arrays = {"positions": np.concatenate(parts) if parts else np.empty(0, dtype=np.int64),
+                  "crawl_times": np.asarray(self.crawl_times, dtype=np.int64)}
+        for name, array in arrays.items():
+            with open(os.path.join(out_dir, f"{name}.npy.tmp"), "wb") as f:
+                np.save(f, array)
+            os.replace(os.path.join(out_dir, f"{name}.npy.tmp"), os.path.join(out_dir, f"{name}.npy"))
+        with open(os.path.join(out_dir, "values.json.tmp"), "w", encoding="utf-8") as f:
+            json.dump({"documents": len(self.crawl_times), "values": ranges}, f)
+        os.replace(os.path.join(out_dir, "values.json.tmp"), os.path.join(out_dir, "values.json"))
+        counts = ", ".join(f"{len(self.postings[field])} {field}s" for field in self.fields)
+        print(f"🏷️ Filter index: {counts} over {len(self.crawl_times)} chunks")
+
+
+class FilterIndex:
+    """Answers metadata filters with the sorted FAISS positions that satisfy them.
+
+    A filter is a dict of field -> value or list of values, e.g.
+    {"volume": 7, "part": ["A", "B"]}; values of one field are ORed, fields
+    are ANDed. "crawled_after" takes an ISO timestamp.
+    """
+
+    def __init__(self, path):
+        index_dir = os.path.join(path, FILTER_DIR)
+        with open(os.path.join(index_dir, "values.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.documents = meta["documents"]
+        self.values = meta["values"]
+        self.positions_array = np.load(os.path.join(index_dir, "positions.npy"), mmap_mode="r")
+        self.crawl_times = np.load(os.path.join(index_dir, "crawl_times.npy"), mmap_mode="r")
+
+    @staticmethod
+    def exists(path):
+        return os.path.exists(os.path.join(path, FILTER_DIR, "values.json"))
+
+    def _field_positions(self, field, wanted):
+        if field == "crawled_after":
+            return np.flatnonzero(np.asarray(self.crawl_times) >= crawl_epoch(wanted)).astype(np.int64)
+        if field not in self.values:
+            raise ValueError(f"Unknown filter field {field!r}; expected one of "
+                             f"{', '.join(list(self.values) + ['crawled_after'])}")
+        if not isinstance(wanted, (list, tuple, set)):
+            wanted = [wanted]
+        parts = []
+        for value in wanted:
+            span = self.values[field].get(filter_value(value))
+            if span is not None:
+                parts.append(np.asarray(self.positions_array[span[0]:span[1]]))
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        return parts[0] if len(parts) == 1 else np.union1d(parts[0], np.concatenate(parts[1:]))
+
+    def positions(self, filters):
+        """Sorted positions matching every field of `filters`; None when there is nothing to filter on."""
+        if not filters:
+            return None
+        result = None
+        for field, wanted in filters.items():
+            positions = self._field_positions(field, wanted)
+            result = positions if result is None else np.intersect1d(result, positions, assume_unique=True)
+            if len(result) == 0:
+                break
+        return result
+
+
+def load_filter_index(path):
+    if not FilterIndex.exists(path):
+        print(f"⚠️ No filter index in {path}/; metadata filters are unavailable until the index is re-saved.")
+        return None
+    start = time.perf_counter()
+    index = FilterIndex(path)
+    print(f"🏷️ Loaded filter index ({', '.join(index.values)}) in {(time.perf_counter() - start) * 1000:.1f} ms")
+    return index
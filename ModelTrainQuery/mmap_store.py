@@ -0,0 +1,158 @@
+import argparse
+import json
+import mmap
+import os
+import time
+
+import faiss
+import numpy as np
+from langchain_community.docstore.base import Docstore
+from langchain_community.vectorstores import FAISS
+from langchain.docstore.document import Document
+
+from lexical_index import LexicalIndexBuilder
+from metadata_filter import FilterIndexBuilder
+
+INDEX_FILE = "index.faiss"
+DOCS_FILE = "docs.jsonl"
+OFFSETS_FILE = "docs_offsets.npy"
+
+
+def save_vectorstore(vectorstore, path):
+    """save_local plus the memory-mappable docstore, lexical and filter indexes the query scripts load."""
+    vectorstore.save_local(path)
+    write_search_files(vectorstore, path)
+
+
+def write_search_files(vectorstore, path):
+    """The docstore, lexical index and filter index, built in one pass over the chunks."""
+    lexical = LexicalIndexBuilder()
+    filters = FilterIndexBuilder()
+
+    def index_record(position, doc):
+        lexical.add(position, doc.page_content)
+        filters.add(position, doc.metadata)
+
+    write_docstore(vectorstore, path, on_record=index_record)
+    lexical.save(path)
+    filters.save(path)
+
+
+def write_docstore(vectorstore, path, on_record=None):
+    """One JSON record per index position in docs.jsonl, with byte offsets in docs_offsets.npy.
+
+    Offsets are written last, so a reader never sees more positions than the
+    records file holds. on_record(position, doc) sees every chunk on the way.
+    """
+    count = vectorstore.index.ntotal
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    docs_path = os.path.join(path, DOCS_FILE)
+    with open(f"{docs_path}.tmp", "wb") as f:
+        for position in range(count):
+            doc_id = vectorstore.index_to_docstore_id[position]
+            doc = vectorstore.docstore.search(doc_id)
+            record = {"id": doc_id, "text": doc.page_content, "metadata": doc.metadata}
+            f.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+            offsets[position + 1] = f.tell()
+            if on_record is not None:
+                on_record(position, doc)
+    os.replace(f"{docs_path}.tmp", docs_path)
+    offsets_path = os.path.join(path, OFFSETS_FILE)
+    with open(f"{offsets_path}.tmp", "wb") as f:
+        np.save(f, offsets)
+    os.replace(f"{offsets_path}.tmp", offsets_path)
+    print(f"🗃️ Wrote {count} docstore records to {docs_path}")
+
+
+class MmapDocstore(Docstore):
+    """Read-only docstore over docs.jsonl, looked up by index position.
+
+    Records are decoded only when a search returns them, and the mapped pages
+    are shared by every process that opens the same store.
+    """
+
+    def __init__(self, path):
+        self.offsets = np.load(os.path.join(path, OFFSETS_FILE), mmap_mode="r")
+        self._file = open(os.path.join(path, DOCS_FILE), "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def record(self, position):
+        start, end = int(self.offsets[position]), int(self.offsets[position + 1])
+        return json.loads(self._data[start:end])
+
+    def search(self, search):
+        position = int(search)
+        if not 0 <= position < len(self):
+            return f"ID {search} not found."
+        record = self.record(position)
+        return Document(id=record["id"], page_content=record["text"], metadata=record["metadata"])
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._file.close()
+
+
+class PositionIds:
+    """index_to_docstore_id for MmapDocstore: every position is its own key."""
+
+    def __init__(self, count):
+        self.count = count
+
+    def __getitem__(self, position):
+        if not 0 <= position < self.count:
+            raise KeyError(position)
+        return int(position)
+
+    def __len__(self):
+        return self.count
+
+
+def read_index_mmap(index_path):
+    """Maps the index file read-only, so its vectors live in the shared page cache, not each process's heap.
+
+    IO_FLAG_MMAP_IFC maps the flat codes of flat and HNSW indexes; IVF lists
+    are only mapped by IO_FLAG_MMAP, and faiss rejects the two combined.
+    """
+    readonly = faiss.IO_FLAG_READ_ONLY
+    try:
+        if hasattr(faiss, "IO_FLAG_MMAP_IFC"):
+            index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP_IFC | readonly)
+            if faiss.try_extract_index_ivf(index) is None:
+                return index
+        return faiss.read_index(index_path, faiss.IO_FLAG_MMAP | readonly)
+    except RuntimeError:
+        # Older faiss builds cannot map every index type.
+        print(f"⚠️ Could not memory-map {index_path}; reading it into memory.")
+        return faiss.read_index(index_path)
+
+
+def has_mmap_store(path):
+    return os.path.exists(os.path.join(path, OFFSETS_FILE)) and os.path.exists(os.path.join(path, DOCS_FILE))
+
+
+def load_mmap_vectorstore(path, embedding):
+    """A read-only FAISS store backed by mapped files; nothing is unpickled."""
+    start = time.perf_counter()
+    index = read_index_mmap(os.path.join(path, INDEX_FILE))
+    docstore = MmapDocstore(path)
+    if len(docstore) != index.ntotal:
+        raise ValueError(f"{path} holds {index.ntotal} vectors but {len(docstore)} docstore records; "
+                         f"re-export it with mmap_store.py")
+    print(f"⚡ Mapped {index.ntotal} vectors from {path}/ in {(time.perf_counter() - start) * 1000:.1f} ms")
+    return FAISS(embedding, index, docstore, PositionIds(index.ntotal))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Write the memory-mapped docstore, lexical and filter indexes for an existing index.")
+    parser.add_argument("path", nargs="?", default="vector_index")
+    args = parser.parse_args()
+
+    # The pickle is trusted here: it is our own build output, converted once.
+    store = FAISS.load_local(args.path, lambda text: None, allow_dangerous_deserialization=True)
+    write_search_files(store, args.path)
@@ -0,0 +1,186 @@
+import argparse
+import inspect
+import json
+import os
+
+import numpy as np
+
+ONNX_MODEL_DIR = "onnx-miniLM"
+FP32_FILE = "model.onnx"
+INT8_FILE = "model.int8.onnx"
+CONFIG_FILE = "embedder_config.json"
+PARITY_TEXTS = [
+    "What is Form G-1055?",
+    "How to file an asylum claim?",
+    "Form I-589 is used to apply for asylum and for withholding of removal.",
+    "An applicant may request a fee waiver by filing Form I-912.",
+    "USCIS may issue a Request for Evidence if the record is incomplete.",
+]
+
+
+def _pooling_config(st_model):
+    pooling = {"mode": "mean", "normalize": False}
+    for module in st_model:
+        name = type(module).__name__
+        if name == "Pooling":
+            config = module.get_config_dict()
+            if config.get("pooling_mode_cls_token"):
+                pooling["mode"] = "cls"
+            elif config.get("pooling_mode_max_tokens"):
+                pooling["mode"] = "max"
+        elif name == "Normalize":
+            pooling["normalize"] = True
+    return pooling
+
+
+def export_onnx(model_name, output_dir=ONNX_MODEL_DIR, quantize=True, opset=14):
+    """Export a SentenceTransformer (hub name or a local path such as finetune.py's output) to ONNX.
+
+    Writes the fp32 graph, an int8 dynamically quantized copy, the tokenizer and
+    the pooling settings needed to reproduce sentence embeddings.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    st_model = SentenceTransformer(model_name, device="cpu")
+    transformer = st_model[0].auto_model.eval()
+    tokenizer = st_model.tokenizer
+    sample = tokenizer(["hello world"], return_tensors="pt", padding=True)
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+
+    class LastHiddenState(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *inputs):
+            return self.model(**dict(zip(input_names, inputs))).last_hidden_state
+
+    os.makedirs(output_dir, exist_ok=True)
+    fp32_path = os.path.join(output_dir, FP32_FILE)
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]}
+    # Newer torch defaults to the dynamo exporter; the TorchScript one handles dynamic_axes directly.
+    legacy = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+    with torch.no_grad():
+        torch.onnx.export(
+            LastHiddenState(transformer),
+            tuple(sample[name] for name in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            **legacy,
+        )
+    print(f"📦 Exported {model_name} to {fp32_path}")
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(fp32_path, os.path.join(output_dir, INT8_FILE), weight_type=QuantType.QInt8)
+        print(f"🗜️ Quantized to {os.path.join(output_dir, INT8_FILE)}")
+
+    tokenizer.save_pretrained(output_dir)
+    config = {
+        "model_name": model_name,
+        "input_names": input_names,
+        "max_seq_length": st_model.max_seq_length,
+        "pooling": _pooling_config(st_model),
+    }
+    with open(os.path.join(output_dir, CONFIG_FILE), "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+    return st_model
+
+
+class OnnxEmbedder:
+    """Sentence embeddings served by onnxruntime from a directory written by export_onnx."""
+
+    def __init__(self, model_dir=ONNX_MODEL_DIR, quantized=True, threads=None, batch_size=32, cache=None):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        with open(os.path.join(model_dir, CONFIG_FILE), "r", encoding="utf-8") as f:
+            self.config = json.load(f)
+        model_file = INT8_FILE if quantized else FP32_FILE
+        self.model_name = f"{self.config['model_name']}:onnx-{'int8' if quantized else 'fp32'}"
+        print(f"✅ Loading ONNX embedder: {os.path.join(model_dir, model_file)}")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(os.path.join(model_dir, model_file), options,
+                                            providers=["CPUExecutionProvider"])
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.batch_size = batch_size
+        self.cache = cache
+
+    def _encode_batch(self, texts):
+        encoded = self.tokenizer(texts, padding=True, truncation=True,
+                                 max_length=self.config["max_seq_length"], return_tensors="np")
+        feeds = {name: encoded[name].astype(np.int64) for name in self.config["input_names"]}
+        hidden = self.session.run(None, feeds)[0]
+        mask = encoded["attention_mask"][..., None].astype(np.float32)
+
+        mode = self.config["pooling"]["mode"]
+        if mode == "cls":
+            pooled = hidden[:, 0]
+        elif mode == "max":
+            pooled = np.where(mask > 0, hidden, -1e9).max(axis=1)
+        else:
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.config["pooling"]["normalize"]:
+            pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.astype(np.float32)
+
+    def encode(self, texts):
+        texts = list(texts)
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+        batches = [self._encode_batch([texts[i] for i in order[start:start + self.batch_size]])
+                   for start in range(0, len(order), self.batch_size)]
+        encoded = np.concatenate(batches)
+        result = np.empty_like(encoded)
+        result[order] = encoded
+        return result
+
+    def embed_documents(self, texts):
+        if self.cache is None:
+            return self.encode(texts)
+        return self.cache.embed(self.model_name, texts, self.encode)
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def cosine_parity(reference, candidate):
+    """Per-text cosine similarity between two embedding matrices of the same texts."""
+    dots = np.sum(reference * candidate, axis=1)
+    norms = np.linalg.norm(reference, axis=1) * np.linalg.norm(candidate, axis=1)
+    return dots / np.clip(norms, 1e-12, None)
+
+
+def check_parity(st_model, model_dir=ONNX_MODEL_DIR, texts=PARITY_TEXTS):
+    reference = st_model.encode(texts, convert_to_numpy=True, show_progress_bar=False)
+    results = {}
+    for quantized in (False, True):
+        if quantized and not os.path.exists(os.path.join(model_dir, INT8_FILE)):
+            continue
+        cosines = cosine_parity(reference, OnnxEmbedder(model_dir, quantized=quantized).encode(texts))
+        label = "int8" if quantized else "fp32"
+        results[label] = float(cosines.min())
+        print(f"🔍 {label} parity vs PyTorch: min cosine {cosines.min():.5f}, mean {cosines.mean():.5f}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a SentenceTransformer to ONNX with int8 quantization.")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2",
+                        help="hub name or local path, e.g. fine-tuned-miniLM from finetune.py")
+    parser.add_argument("--output", default=ONNX_MODEL_DIR)
+    parser.add_argument("--no-quantize", action="store_true")
+    args = parser.parse_args()
+
+    model = export_onnx(args.model, args.output, quantize=not args.no_quantize)
+    check_parity(model, args.output)
@@ -0,0 +1,105 @@
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+DEFAULT_BATCH_SIZE = 32
+BATCH_SIZE_CANDIDATES = (16, 32, 64, 128)
+AUTOTUNE_SAMPLE = 512
+BATCHES_PER_SHARD = 4
+
+_worker_model = None
+
+
+def _init_worker(model_name, threads):
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    global _worker_model
+    torch.set_num_threads(threads)
+    _worker_model = SentenceTransformer(model_name, device="cpu")
+
+
+def _encode_shard(args):
+    texts, batch_size = args
+    return _worker_model.encode(texts, batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False)
+
+
+def _time_batch_sizes(args):
+    """Chunks/s this worker encodes `texts` at each batch size, after one warm-up pass."""
+    texts, candidates = args
+    _worker_model.encode(texts[:candidates[0]], batch_size=candidates[0], show_progress_bar=False)
+    rates = []
+    for batch_size in candidates:
+        start = time.perf_counter()
+        _worker_model.encode(texts, batch_size=batch_size, convert_to_numpy=True, show_progress_bar=False)
+        rates.append(len(texts) / (time.perf_counter() - start))
+    return rates
+
+
+def _model_info(_):
+    return _worker_model.tokenizer, _worker_model.max_seq_length
+
+
+def default_workers():
+    return max(1, (os.cpu_count() or 1) // 2)
+
+
+class ParallelEmbedder:
+    """Encodes chunks on a pool of CPU worker processes, each with its own model copy.
+
+    Texts are sorted by length so each batch pads to similar lengths, then cut
+    into shards of a few batches that are handed out to workers; results are
+    put back in input order. batch_size=None tunes the batch size on a sample
+    of the first call's texts.
+    """
+
+    def __init__(self, model_name, workers=None, threads_per_worker=None, batch_size=None):
+        self.model_name = model_name
+        self.workers = workers or default_workers()
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // self.workers)
+        self.batch_size = batch_size
+        ctx = multiprocessing.get_context("spawn")
+        self.pool = ctx.Pool(self.workers, initializer=_init_worker,
+                             initargs=(model_name, self.threads_per_worker))
+        print(f"⚙️ Embedding on {self.workers} processes x {self.threads_per_worker} threads")
+
+    def _run(self, texts, batch_size):
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True)
+        shard_size = batch_size * BATCHES_PER_SHARD
+        shards = [([texts[i] for i in order[start:start + shard_size]], batch_size)
+                  for start in range(0, len(order), shard_size)]
+        encoded = np.concatenate(self.pool.map(_encode_shard, shards, chunksize=1))
+        result = np.empty_like(encoded)
+        result[order] = encoded
+        return result
+
+    def autotune(self, texts, candidates=BATCH_SIZE_CANDIDATES):
+        """Times the sample inside one worker, where every batch size gets the same
+        parallelism; timing whole pool runs favours small batches, which make more
+        shards than there are workers while large ones leave workers idle."""
+        rates = self.pool.apply(_time_batch_sizes, ((texts[:AUTOTUNE_SAMPLE], tuple(candidates)),))
+        best, best_rate = candidates[0], 0.0
+        for batch_size, rate in zip(candidates, rates):
+            print(f"   batch_size={batch_size}: {rate:.1f} chunks/s per worker")
+            if rate > best_rate:
+                best, best_rate = batch_size, rate
+        print(f"🎛️ Using batch_size={best}")
+        return best
+
+    def model_info(self):
+        """(tokenizer, max_seq_length) of the workers' model, so the parent need not load the model itself."""
+        return self.pool.apply(_model_info, (None,))
+
+    def encode(self, texts):
+        texts = list(texts)
+        if self.batch_size is None and len(texts) >= 2 * max(BATCH_SIZE_CANDIDATES):
+            self.batch_size = self.autotune(texts)
+        return self._run(texts, self.batch_size or DEFAULT_BATCH_SIZE)
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
@@ -0,0 +1,233 @@
+import time
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_community.llms import LlamaCpp
+from sentence_transformers import SentenceTransformer
+
+from ann_index import search_subset
+from answer_cache import ANSWER_CACHE_FILE, SIMILARITY_THRESHOLD, TTL_SECONDS, AnswerCache, index_version
+from context_packer import ContextPacker, context_block, token_counter
+from embedding_cache import EMBEDDING_CACHE_FILE, EmbeddingCache
+from lexical_index import reciprocal_rank_fusion
+from mmap_store import has_mmap_store, load_mmap_vectorstore
+from onnx_embedder import ONNX_MODEL_DIR, OnnxEmbedder
+
+# "torch" runs the full-precision SentenceTransformer; "onnx" / "onnx-fp32" serve
+# the export written by onnx_embedder.py (int8-quantized / full precision).
+EMBEDDER_BACKEND = "torch"
+EMBEDDER_BACKENDS = ("torch", "onnx", "onnx-fp32")
+LLM_MODEL_PATH = "models/mistral-7b-instruct-v0.1.Q4_K_M.gguf"
+TOP_K = 3
+# Candidates each index contributes to reciprocal rank fusion.
+FUSION_DEPTH = 20
+PROMPT_TEMPLATE = "Answer the question based on the context below:\n\n{context}\n\nQuestion: {question}"
+
+
+class SentenceTransformersEmbedder:
+    def __init__(self, model_name="all-MiniLM-L6-v2", use_cache=True):
+        print(f"✅ Loading embedder: {model_name}")
+        self.model_name = model_name
+        self.model = SentenceTransformer(model_name)
+        # Shared with the index builder, so repeated questions skip the encoder.
+        self.cache = EmbeddingCache(EMBEDDING_CACHE_FILE) if use_cache else None
+
+    def _encode(self, texts):
+        return self.model.encode(texts, convert_to_tensor=False, show_progress_bar=False)
+
+    def embed_documents(self, texts):
+        if self.cache is None:
+            return self._encode(texts)
+        return self.cache.embed(self.model_name, texts, self._encode)
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def load_embedder(backend=EMBEDDER_BACKEND, model_name=None):
+    """model_name: a hub name or local path (e.g. finetune.py's fine-tuned-miniLM) for the torch backend,
+    or an ONNX export directory for the onnx backends."""
+    if backend in ("onnx", "onnx-fp32"):
+        return OnnxEmbedder(model_name or ONNX_MODEL_DIR, quantized=backend == "onnx",
+                            cache=EmbeddingCache(EMBEDDING_CACHE_FILE))
+    if model_name:
+        return SentenceTransformersEmbedder(model_name)
+    return SentenceTransformersEmbedder()
+
+
+def load_vectorstore(path="vector_index", backend=EMBEDDER_BACKEND, embedder=None):
+    print(f"📁 Loading FAISS index from: {path}")
+    embedder = embedder or load_embedder(backend)
+    if has_mmap_store(path):
+        return load_mmap_vectorstore(path, embedder.embed_query)
+    print(f"⚠️ {path}/ has no mapped docstore; unpickling it (run mmap_store.py {path} to convert).")
+    return FAISS.load_local(path, embedder.embed_query, allow_dangerous_deserialization=True)
+
+
+def load_answer_cache(index_path="vector_index", threshold=SIMILARITY_THRESHOLD, ttl=TTL_SECONDS):
+    return AnswerCache(ANSWER_CACHE_FILE, version=index_version(index_path), threshold=threshold, ttl=ttl)
+
+
+def setup_llama_model(model_path=LLM_MODEL_PATH, n_threads=None):
+    return LlamaCpp(
+        model_path=model_path,
+        n_ctx=4096,
+        temperature=0.2,
+        top_p=0.9,
+        n_threads=n_threads,
+        verbose=True
+    )
+
+
+def build_prompt(question, docs):
+    context = "\n\n".join(context_block(d) for d in docs)
+    return PROMPT_TEMPLATE.format(context=context, question=question)
+
+
+def doc_at(vectorstore, position):
+    return vectorstore.docstore.search(vectorstore.index_to_docstore_id[int(position)])
+
+
+def search_index(index, vectors, k, allowed=None):
+    """index.search, limited to the sorted `allowed` positions when a metadata filter gave some."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if allowed is None:
+        return index.search(vectors, k)
+    return search_subset(index, vectors, allowed, k)
+
+
+def search_by_vectors(vectorstore, vectors, k=TOP_K, allowed=None):
+    """One FAISS search for a matrix of query vectors; [(doc, score), ...] per query, like similarity_search_with_score."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if len(vectors) == 0:
+        return []
+    scores, positions = search_index(vectorstore.index, vectors, k, allowed)
+    return [[(doc_at(vectorstore, position), float(score))
+             for score, position in zip(row_scores, row_positions) if position != -1]
+            for row_scores, row_positions in zip(scores, positions)]
+
+
+class QAService:
+    """Retrieval and generation over an already-loaded embedder, index and LLM.
+
+    retrieve() embeds and searches a whole list of questions at once, so
+    callers that collect concurrent questions pay for one encode and one
+    index search per batch. With a lexical index, the vector and BM25
+    rankings are fused by reciprocal rank and the score is the fused one.
+    With a reranker, retrieve() fetches reranker.depth candidates and keeps
+    the k the cross-encoder scores highest, with its scores.
+    With a filter_index, retrieve() takes metadata filters (see
+    metadata_filter.FilterIndex) and only searches the matching chunks.
+    With an answer_cache, lookup() returns earlier
+    answers for equivalent questions and generate() stores new ones.
+    generate() streams tokens to on_token as llama.cpp produces them, after
+    the retrieved chunks are deduplicated and packed into the context budget.
+    llama-cpp-python only evaluates the prompt tokens after the prefix its
+    context already holds, so the instruction, and the chunks too when a
+    follow-up retrieves the same ones, are not evaluated again (see
+    bench_prompt_prefix.py).
+    """
+
+    def __init__(self, embedder, vectorstore, llm, k=TOP_K, answer_cache=None, pack_context=True,
+                 context_tokens=None, lexical=None, fusion_depth=FUSION_DEPTH, filter_index=None,
+                 reranker=None):
+        self.embedder = embedder
+        self.vectorstore = vectorstore
+        self.lexical = lexical
+        self.filter_index = filter_index
+        self.reranker = reranker
+        self.fusion_depth = fusion_depth
+        self.llm = llm
+        self.k = k
+        self.answer_cache = answer_cache
+        self.packer = ContextPacker(token_counter(llm), max_context_tokens=context_tokens) if pack_context else None
+        self.last_context = None
+
+    def allowed_positions(self, filters):
+        """Sorted positions matching `filters`, or None to search everything."""
+        if not filters:
+            return None
+        if self.filter_index is None:
+            raise ValueError("metadata filters need the filter index; re-save the index with mmap_store.py")
+        return self.filter_index.positions(filters)
+
+    def retrieve(self, questions, filters=None):
+        """Questions sharing one set of metadata filters, embedded and searched together."""
+        start = time.perf_counter()
+        vectors = self.embedder.embed_documents(list(questions))
+        embedded = time.perf_counter()
+        allowed = self.allowed_positions(filters)
+        filtered = time.perf_counter()
+        timings = {"embed": embedded - start}
+        if allowed is not None:
+            timings["filter"] = filtered - embedded
+        candidates = self.k if self.reranker is None else max(self.k, self.reranker.depth)
+        if self.lexical is None:
+            results = search_by_vectors(self.vectorstore, vectors, candidates, allowed)
+            timings["search"] = time.perf_counter() - filtered
+            return self._rerank(questions, results, vectors, timings)
+
+        depth = max(candidates, self.fusion_depth)
+        _, positions = search_index(self.vectorstore.index, vectors, depth, allowed)
+        searched = time.perf_counter()
+        lexical_hits = [self.lexical.search(question, depth, allowed) for question in questions]
+        lexical_done = time.perf_counter()
+        results = []
+        for row, hits in zip(positions, lexical_hits):
+            fused = reciprocal_rank_fusion([[p for p in row.tolist() if p != -1], [p for p, _ in hits]], candidates)
+            results.append([(doc_at(self.vectorstore, position), score) for position, score in fused])
+        timings.update(search=searched - filtered, lexical=lexical_done - searched,
+                       fusion=time.perf_counter() - lexical_done)
+        return self._rerank(questions, results, vectors, timings)
+
+    def _rerank(self, questions, results, vectors, timings):
+        if self.reranker is not None:
+            start = time.perf_counter()
+            results = self.reranker.rerank(list(questions), results, self.k)
+            timings["rerank"] = time.perf_counter() - start
+        return results, vectors, timings
+
+    def lookup(self, question_vector, docs_with_scores):
+        if self.answer_cache is None:
+            return None
+        return self.answer_cache.get(question_vector, [doc for doc, _ in docs_with_scores])
+
+    def generate(self, question, docs_with_scores, question_vector=None, on_token=None):
+        docs = [doc for doc, _ in docs_with_scores]
+        context_docs = docs
+        if self.packer is not None:
+            reserved = self.packer.count_tokens(build_prompt(question, []))
+            context_docs, self.last_context = self.packer.pack(docs, reserved)
+        prompt = build_prompt(question, context_docs)
+        if on_token is None:
+            answer = self.llm.invoke(prompt)
+        else:
+            parts = []
+            for token in self.llm.stream(prompt):
+                parts.append(token)
+                on_token(token)
+            answer = "".join(parts)
+        if self.answer_cache is not None and question_vector is not None:
+            self.answer_cache.put(question, question_vector, docs, answer)
+        return answer
+
+    def answer(self, question, on_token=None, filters=None):
+        start = time.perf_counter()
+        (docs_with_scores,), (vector,), timings = self.retrieve([question], filters)
+        lookup_start = time.perf_counter()
+        answer = self.lookup(vector, docs_with_scores)
+        timings["answer_cache"] = time.perf_counter() - lookup_start
+        if answer is not None and on_token is not None:
+            on_token(answer)
+        if answer is None:
+            generate_start = time.perf_counter()
+
+            def record_first_token(token):
+                timings.setdefault("first_token", time.perf_counter() - start)
+                on_token(token)
+
+            answer = self.generate(question, docs_with_scores, vector,
+                                   on_token=record_first_token if on_token is not None else None)
+            timings["generate"] = time.perf_counter() - generate_start
+        timings["total"] = time.perf_counter() - start
+        return answer, docs_with_scores, timings
@@ -0,0 +1,350 @@
+import argparse
+import json
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from answer_cache import SIMILARITY_THRESHOLD, TTL_SECONDS
+from lexical_index import load_lexical_index
+from metadata_filter import load_filter_index
+from reranker import RERANK_DEPTH, RERANK_MODEL, CrossEncoderReranker
+from qa_service import (EMBEDDER_BACKEND, EMBEDDER_BACKENDS, TOP_K, QAService, load_answer_cache, load_embedder,
+                        load_vectorstore, setup_llama_model)
+
+HOST = "127.0.0.1"
+PORT = 8089
+MAX_BATCH = 32
+BATCH_WAIT_MS = 5
+MAX_QUEUED_GENERATIONS = 16
+STATS_WINDOW = 1000
+
+
+class QueueFull(Exception):
+    pass
+
+
+class StageStats:
+    """Rolling per-stage latencies with p50/p99 over the last `window` requests."""
+
+    def __init__(self, window=STATS_WINDOW):
+        self._lock = threading.Lock()
+        self._samples = {}
+        self.window = window
+        self.requests = 0
+        self.rejected = 0
+
+    def record(self, timings):
+        with self._lock:
+            self.requests += 1
+            for stage, seconds in timings.items():
+                self._samples.setdefault(stage, deque(maxlen=self.window)).append(seconds)
+
+    def reject(self):
+        with self._lock:
+            self.rejected += 1
+
+    def summary(self):
+        with self._lock:
+            stages = {
+                stage: {
+                    "p50_ms": round(float(np.percentile(samples, 50)) * 1000, 2),
+                    "p99_ms": round(float(np.percentile(samples, 99)) * 1000, 2),
+                }
+                for stage, samples in self._samples.items()
+            }
+            return {"requests": self.requests, "rejected": self.rejected, "stages": stages}
+
+
+class RetrievalBatcher:
+    """Collects questions from concurrent requests and retrieves them in one embed + search call.
+
+    A batch closes when it reaches max_batch questions or batch_wait_ms after
+    its first question arrived, whichever comes first. Questions with
+    different metadata filters are retrieved in separate calls.
+    """
+
+    def __init__(self, service, max_batch=MAX_BATCH, batch_wait_ms=BATCH_WAIT_MS):
+        self.service = service
+        self.max_batch = max_batch
+        self.batch_wait = batch_wait_ms / 1000
+        self._pending = queue.Queue()
+        threading.Thread(target=self._run, name="retrieval-batcher", daemon=True).start()
+
+    def submit(self, question, filters=None):
+        future = Future()
+        self._pending.put((question, filters or None, future, time.perf_counter()))
+        return future
+
+    def _run(self):
+        while True:
+            batch = []
+            try:
+                batch.append(self._pending.get())
+                deadline = time.perf_counter() + self.batch_wait
+                while len(batch) < self.max_batch:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(self._pending.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+
+                groups = {}
+                for item in batch:
+                    groups.setdefault(json.dumps(item[1], sort_keys=True), []).append(item)
+                for group in groups.values():
+                    self._retrieve(group)
+            except Exception as e:
+                # Fail whatever this batch left unanswered; the thread must outlive any one batch.
+                for _, _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _retrieve(self, group):
+        started = time.perf_counter()
+        try:
+            results, vectors, timings = self.service.retrieve([question for question, _, _, _ in group], group[0][1])
+        except Exception as e:
+            for _, _, future, _ in group:
+                future.set_exception(e)
+            return
+        for (_, _, future, queued_at), docs_with_scores, vector in zip(group, results, vectors):
+            future.set_result((docs_with_scores, vector, dict(timings, batch_wait=started - queued_at,
+                                                              batch_size=len(group))))
+
+
+class GenerationQueue:
+    """Runs LLM calls one at a time on a single thread; llama.cpp holds one context per model."""
+
+    def __init__(self, service, max_queued=MAX_QUEUED_GENERATIONS):
+        self.service = service
+        self._jobs = queue.Queue(maxsize=max_queued)
+        threading.Thread(target=self._run, name="llm-generation", daemon=True).start()
+
+    def submit(self, question, docs_with_scores, question_vector=None, on_token=None):
+        future = Future()
+        try:
+            self._jobs.put_nowait((question, docs_with_scores, question_vector, on_token, future,
+                                   time.perf_counter()))
+        except queue.Full:
+            raise QueueFull(f"{self._jobs.maxsize} generations already queued")
+        return future
+
+    def depth(self):
+        return self._jobs.qsize()
+
+    def _run(self):
+        while True:
+            question, docs_with_scores, question_vector, on_token, future, queued_at = self._jobs.get()
+            started = time.perf_counter()
+            try:
+                answer = self.service.generate(question, docs_with_scores, question_vector, on_token)
+            except Exception as e:
+                future.set_exception(e)
+                continue
+            future.set_result((answer, {"llm_queue": started - queued_at, "generate": time.perf_counter() - started}))
+
+
+class QAServer:
+    """The warm pipeline behind the HTTP handler: batched retrieval, then queued generation."""
+
+    def __init__(self, service, max_batch=MAX_BATCH, batch_wait_ms=BATCH_WAIT_MS,
+                 max_queued=MAX_QUEUED_GENERATIONS):
+        self.service = service
+        self.retriever = RetrievalBatcher(service, max_batch, batch_wait_ms)
+        self.generator = GenerationQueue(service, max_queued)
+        self.stats = StageStats()
+
+    def ask(self, question, generate=True, on_token=None, filters=None):
+        """Answer one question; with on_token, tokens are passed on (from the LLM thread) as they arrive."""
+        start = time.perf_counter()
+        docs_with_scores, vector, timings = self.retriever.submit(question, filters).result()
+        answer = None
+        cached = False
+        if generate:
+            lookup_start = time.perf_counter()
+            answer = self.service.lookup(vector, docs_with_scores)
+            timings["answer_cache"] = time.perf_counter() - lookup_start
+            cached = answer is not None
+            if cached and on_token is not None:
+                on_token(answer)
+
+        def record_first_token(token):
+            timings.setdefault("first_token", time.perf_counter() - start)
+            on_token(token)
+
+        if generate and not cached:
+            try:
+                future = self.generator.submit(question, docs_with_scores, vector,
+                                               record_first_token if on_token is not None else None)
+            except QueueFull:
+                self.stats.reject()
+                raise
+            answer, generation_timings = future.result()
+            timings.update(generation_timings)
+        batch_size = timings.pop("batch_size")
+        timings["total"] = time.perf_counter() - start
+        self.stats.record(timings)
+        return {
+            "answer": answer,
+            "cached": cached,
+            "sources": [{"source": doc.metadata.get("source"), "url": doc.metadata.get("url"), "score": score,
+                         "text": doc.page_content}
+                        for doc, score in docs_with_scores],
+            "batch_size": batch_size,
+            "timings_ms": {stage: round(seconds * 1000, 2) for stage, seconds in timings.items()},
+        }
+
+
+class QAHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def make_handler(qa_server):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # needed for chunked streaming responses
+
+        def _send(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, {"status": "ok", "llm_queue": qa_server.generator.depth()})
+            elif self.path == "/stats":
+                stats = qa_server.stats.summary()
+                if qa_server.service.answer_cache is not None:
+                    stats["answer_cache"] = qa_server.service.answer_cache.summary()
+                if qa_server.service.packer is not None:
+                    stats["context"] = qa_server.service.packer.summary()
+                self._send(200, stats)
+            else:
+                self._send(404, {"error": "not found"})
+
+        def _write_chunk(self, payload):
+            line = json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n"
+            self.wfile.write(f"{len(line):x}\r\n".encode("ascii") + line + b"\r\n")
+            self.wfile.flush()
+
+        def _stream(self, question, filters):
+            """Newline-delimited JSON: {"token": ...} lines as they are generated, then the full response."""
+            events = queue.Queue()
+
+            def run():
+                try:
+                    events.put(dict(qa_server.ask(question, on_token=lambda token: events.put({"token": token}),
+                                                  filters=filters), done=True))
+                except Exception as e:
+                    events.put({"error": str(e), "done": True})
+
+            threading.Thread(target=run, daemon=True).start()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            while True:
+                event = events.get()
+                self._write_chunk(event)
+                if event.get("done"):
+                    break
+            self.wfile.write(b"0\r\n\r\n")
+
+        def do_POST(self):
+            if self.path not in ("/ask", "/retrieve"):
+                self._send(404, {"error": "not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                question = body.get("question", "").strip()
+                filters = body.get("filter") or None
+            except (ValueError, AttributeError):
+                self._send(400, {"error": "expected a JSON body like {\"question\": \"...\"}"})
+                return
+            if not question:
+                self._send(400, {"error": "missing question"})
+                return
+            if filters is not None and not isinstance(filters, dict):
+                self._send(400, {"error": "filter must be an object like {\"volume\": 7, \"part\": \"A\"}"})
+                return
+            if self.path == "/ask" and body.get("stream"):
+                self._stream(question, filters)
+                return
+            try:
+                self._send(200, qa_server.ask(question, generate=self.path == "/ask", filters=filters))
+            except QueueFull as e:
+                self._send(503, {"error": str(e)})
+            except ValueError as e:
+                self._send(400, {"error": str(e)})
+            except Exception as e:
+                self._send(500, {"error": str(e)})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(service, host=HOST, port=PORT, max_batch=MAX_BATCH, batch_wait_ms=BATCH_WAIT_MS,
+          max_queued=MAX_QUEUED_GENERATIONS):
+    qa_server = QAServer(service, max_batch, batch_wait_ms, max_queued)
+    httpd = QAHTTPServer((host, port), make_handler(qa_server))
+    print(f"🌐 Serving on http://{host}:{port} (POST /ask, POST /retrieve, GET /stats, GET /health)")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        print(f"📊 Stage latencies: {json.dumps(qa_server.stats.summary())}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve USCIS Q&A over HTTP with a warm model and index.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--index", default="vector_index")
+    parser.add_argument("--embedder", choices=EMBEDDER_BACKENDS, default=EMBEDDER_BACKEND)
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH, help="questions per embed/search batch")
+    parser.add_argument("--batch-wait-ms", type=float, default=BATCH_WAIT_MS,
+                        help="how long a batch waits for more questions")
+    parser.add_argument("--max-queued", type=int, default=MAX_QUEUED_GENERATIONS,
+                        help="LLM calls allowed to wait before requests get 503")
+    parser.add_argument("--top-k", type=int, default=TOP_K, help="chunks retrieved per question")
+    parser.add_argument("--no-lexical", action="store_true", help="vector search only, without BM25 fusion")
+    parser.add_argument("--rerank", action="store_true", help="re-rank candidates with a cross-encoder")
+    parser.add_argument("--rerank-model", default=RERANK_MODEL)
+    parser.add_argument("--rerank-depth", type=int, default=RERANK_DEPTH, help="candidates the cross-encoder scores")
+    parser.add_argument("--context-tokens", type=int, default=None,
+                        help="cap on context tokens (default: whatever n_ctx leaves after prompt and answer)")
+    parser.add_argument("--no-context-packing", action="store_true",
+                        help="send retrieved chunks as-is, without dedup, merging or a token budget")
+    parser.add_argument("--no-answer-cache", action="store_true", help="always generate a fresh answer")
+    parser.add_argument("--answer-threshold", type=float, default=SIMILARITY_THRESHOLD,
+                        help="question cosine similarity needed to reuse a cached answer")
+    parser.add_argument("--answer-ttl", type=float, default=TTL_SECONDS, help="seconds a cached answer stays valid")
+    args = parser.parse_args()
+
+    print("🚀 Starting USCIS Q&A server")
+    embedder = load_embedder(args.embedder)
+    answer_cache = None
+    if not args.no_answer_cache:
+        answer_cache = load_answer_cache(args.index, args.answer_threshold, args.answer_ttl)
+    service = QAService(embedder, load_vectorstore(args.index, embedder=embedder), setup_llama_model(),
+                        k=args.top_k, answer_cache=answer_cache, pack_context=not args.no_context_packing,
+                        context_tokens=args.context_tokens,
+                        lexical=None if args.no_lexical else load_lexical_index(args.index),
+                        filter_index=load_filter_index(args.index),
+                        reranker=CrossEncoderReranker(args.rerank_model, args.rerank_depth) if args.rerank else None)
+    serve(service, args.host, args.port, args.max_batch, args.batch_wait_ms, args.max_queued)
@@ -1,33 +1,12 @@
-from langchain.chains import RetrievalQA
-from langchain_community.vectorstores import FAISS
-from langchain_community.llms import LlamaCpp
-from sentence_transformers import SentenceTransformer
-
-class SentenceTransformersEmbedder:
-    def __init__(self, model_name="all-MiniLM-L6-v2"):
-        print(f"✅ Loading embedder: {model_name}")
-        self.model = SentenceTransformer(model_name)
-
-    def embed_query(self, text):
-        return self.model.encode(text, convert_to_tensor=False)
+import argparse
 
-def load_vectorstore(path="vector_index"):
-    print(f"📁 Loading FAISS index from: {path}")
-    embedder = SentenceTransformersEmbedder()
-    return FAISS.load_local(path, embedder.embed_query, allow_dangerous_deserialization=True)
+from langchain.chains import RetrievalQA
 
-def setup_llama_model():
-    return LlamaCpp(
-        model_path="models/mistral-7b-instruct-v0.1.Q4_K_M.gguf",
-        n_ctx=4096,
-        temperature=0.2,
-        top_p=0.9,
-        verbose=True
-    )
+from qa_service import EMBEDDER_BACKEND, EMBEDDER_BACKENDS, load_vectorstore, setup_llama_model
 
-def main():
+def main(backend=EMBEDDER_BACKEND):
     print("🚀 Starting USCIS Q&A system")
-    vectorstore = load_vectorstore()
+    vectorstore = load_vectorstore(backend=backend)
     llm = setup_llama_model()
 
     qa = RetrievalQA.from_chain_type(
@@ -45,4 +24,8 @@ def main():
         print(f"AI: {answer}\n")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Ask questions about USCIS policy.")
+    parser.add_argument("--embedder", choices=EMBEDDER_BACKENDS, default=EMBEDDER_BACKEND,
+                        help="backend used to embed questions")
+    args = parser.parse_args()
+    main(args.embedder)
@@ -1,34 +1,29 @@
+import argparse
+
 from langchain.chains import RetrievalQA
-from langchain_community.vectorstores import FAISS
-from langchain_community.llms import LlamaCpp
-from sentence_transformers import SentenceTransformer
-
-class SentenceTransformersEmbedder:
-    def __init__(self, model_name="all-MiniLM-L6-v2"):
-        print(f"✅ Loading embedder: {model_name}")
-        self.model = SentenceTransformer(model_name)
-
-    def embed_query(self, text):
-        return self.model.encode(text, convert_to_tensor=False)
-
-def load_vectorstore(path="vector_index"):
-    print(f"📁 Loading FAISS index from: {path}")
-    embedder = SentenceTransformersEmbedder()
-    return FAISS.load_local(path, embedder.embed_query, allow_dangerous_deserialization=True)
-
-def setup_llama_model():
-    return LlamaCpp(
-        model_path="models/mistral-7b-instruct-v0.1.Q4_K_M.gguf",
-        n_ctx=4096,
-        temperature=0.2,
-        top_p=0.9,
-        verbose=True
-    )
 
-def main():
+from lexical_index import load_lexical_index
+from metadata_filter import load_filter_index
+from reranker import RERANK_DEPTH, RERANK_MODEL, CrossEncoderReranker
+from qa_service import (EMBEDDER_BACKEND, EMBEDDER_BACKENDS, TOP_K, QAService, load_answer_cache, load_embedder,
+                        load_vectorstore, setup_llama_model)
+from query_server import serve
+
+def main(backend=EMBEDDER_BACKEND, serve_port=None, use_answer_cache=True, stream=True, k=TOP_K,
+         context_tokens=None, lexical=True, filters=None, rerank_depth=None):
     print("🚀 Starting USCIS Q&A system")
-    vectorstore = load_vectorstore()
+    embedder = load_embedder(backend)
+    vectorstore = load_vectorstore(embedder=embedder)
     llm = setup_llama_model()
+    service = QAService(embedder, vectorstore, llm, k=k, context_tokens=context_tokens,
+                        answer_cache=load_answer_cache() if use_answer_cache else None,
+                        lexical=load_lexical_index("vector_index") if lexical else None,
+                        filter_index=load_filter_index("vector_index"),
+                        reranker=CrossEncoderReranker(RERANK_MODEL, rerank_depth) if rerank_depth else None)
+
+    if serve_port is not None:
+        serve(service, port=serve_port)
+        return
 
     qa = RetrievalQA.from_chain_type(
         llm=llm,
@@ -36,6 +31,8 @@ def main():
         retriever=vectorstore.as_retriever()
     )
 
+    if filters:
+        print(f"🏷️ Searching only chunks with {filters}")
     print("🤖 Ask a question about USCIS policy (type 'exit' to quit)")
     while True:
         question = input("You: ")
@@ -43,21 +40,54 @@ def main():
             break
         #answer = qa.run(question)
         # Instead of qa_chain.run(query)
-        docs_with_scores = vectorstore.similarity_search_with_score(question, k=3)
+        if stream:
+            print("\n🧠 Answer: ", end="", flush=True)
+            answer, docs_with_scores, timings = service.answer(
+                question, on_token=lambda token: print(token, end="", flush=True), filters=filters)
+            print()
+        else:
+            answer, docs_with_scores, timings = service.answer(question, filters=filters)
+            print(f"\n🧠 Answer: {answer}")
 
         print("\n🔍 Retrieved context documents with scores:")
         for i, (doc, score) in enumerate(docs_with_scores, 1):
-            print(f"\nDoc #{i} (Score: {score:.4f}):\n{doc.page_content[:300]}...")
+            source = doc.metadata.get("url") or doc.metadata.get("source", "")
+            print(f"\nDoc #{i} (Score: {score:.4f}) {source}:\n{doc.page_content[:300]}...")
 
-        # Feed top document(s) to LLM
-        docs = [doc for doc, _ in docs_with_scores]
-        context = "\n\n".join(d.page_content for d in docs)
-        prompt = f"Answer the question based on the context below:\n\n{context}\n\nQuestion: {question}"
+        if "generate" in timings and service.last_context is not None:
+            context = service.last_context
+            print(f"\n📦 Context: {context['tokens']} tokens in {context['blocks']} blocks from {context['chunks']} chunks "
+                  f"({context['duplicates']} duplicates dropped, {context['merged']} merged)")
 
-        answer = llm.invoke(prompt)
-        print(f"\n🧠 Answer: {answer}")
+        source = "answer cache" if "generate" not in timings else "LLM"
+        first_token = f", first token after {timings['first_token']:.2f}s" if "first_token" in timings else ""
+        rerank = f", re-ranking {timings['rerank'] * 1000:.0f} ms" if "rerank" in timings else ""
+        generate = f" (generation {timings['generate']:.2f}s)" if "rerank" in timings and "generate" in timings else ""
+        print(f"⏱️ {timings['total']:.2f}s from the {source}{first_token}{rerank}{generate}")
 
         print(f"AI: {answer}\n")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Ask questions about USCIS policy.")
+    parser.add_argument("--embedder", choices=EMBEDDER_BACKENDS, default=EMBEDDER_BACKEND,
+                        help="backend used to embed questions")
+    parser.add_argument("--serve", type=int, metavar="PORT", default=None,
+                        help="answer over HTTP on this port instead of the prompt (see query_server.py)")
+    parser.add_argument("--no-answer-cache", action="store_true", help="always generate a fresh answer")
+    parser.add_argument("--no-stream", action="store_true", help="print the answer only once it is complete")
+    parser.add_argument("--top-k", type=int, default=TOP_K, help="chunks retrieved per question")
+    parser.add_argument("--context-tokens", type=int, default=None,
+                        help="cap on context tokens (default: whatever n_ctx leaves after prompt and answer)")
+    parser.add_argument("--no-lexical", action="store_true", help="vector search only, without BM25 fusion")
+    parser.add_argument("--rerank", type=int, nargs="?", const=RERANK_DEPTH, default=None, metavar="DEPTH",
+                        help=f"re-rank DEPTH candidates (default {RERANK_DEPTH}) with a cross-encoder before the LLM")
+    parser.add_argument("--volume", type=int, help="only search this policy-manual volume")
+    parser.add_argument("--part", help="only search this policy-manual part (e.g. A)")
+    parser.add_argument("--chapter", type=int, help="only search this policy-manual chapter")
+    parser.add_argument("--crawled-after", help="only search pages crawled at or after this ISO time")
+    args = parser.parse_args()
+    filters = {field: value for field, value in (("volume", args.volume), ("part", args.part),
+                                                 ("chapter", args.chapter), ("crawled_after", args.crawled_after))
+               if value is not None}
+    main(args.embedder, args.serve, not args.no_answer_cache, not args.no_stream, args.top_k, args.context_tokens,
+         not args.no_lexical, filters, args.rerank)
@@ -0,0 +1,44 @@
+import time
+
+import numpy as np
+
+RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+# Candidates fetched per question for the cross-encoder to reorder.
+RERANK_DEPTH = 20
+RERANK_BATCH_SIZE = 64
+MAX_LENGTH = 512
+
+
+class CrossEncoderReranker:
+    """Rescores (question, chunk) pairs with a cross-encoder on CPU.
+
+    All pairs of a retrieval batch go through a single predict() call, so a
+    batch of questions costs one pass over depth * questions pairs.
+    """
+
+    def __init__(self, model_name=RERANK_MODEL, depth=RERANK_DEPTH, batch_size=RERANK_BATCH_SIZE,
+                 max_length=MAX_LENGTH):
+        from sentence_transformers import CrossEncoder
+
+        start = time.perf_counter()
+        self.model = CrossEncoder(model_name, device="cpu", max_length=max_length)
+        self.model_name = model_name
+        self.depth = depth
+        self.batch_size = batch_size
+        print(f"🎯 Loaded re-ranker {model_name} in {time.perf_counter() - start:.1f}s")
+
+    def rerank(self, questions, candidates, k):
+        """candidates: [(doc, score), ...] per question; returns the k best per question by cross-encoder score."""
+        pairs = [(question, doc.page_content) for question, row in zip(questions, candidates) for doc, _ in row]
+        if not pairs:
+            return [[] for _ in candidates]
+        scores = np.asarray(self.model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False),
+                            dtype=np.float32).reshape(-1)
+        results = []
+        start = 0
+        for row in candidates:
+            row_scores = scores[start:start + len(row)]
+            start += len(row)
+            order = np.argsort(-row_scores, kind="stable")[:k]
+            results.append([(row[i][0], float(row_scores[i])) for i in order])
+        return results
@@ -0,0 +1,110 @@
+import codecs
+import glob
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import boto3
+from botocore.config import Config
+
+LOADER_WORKERS = 16
+CACHE_DIR = "s3_cache"
+STREAM_CHUNK = 64 * 1024
+
+
+def list_text_objects(s3, bucket, prefix):
+    """Yields (key, etag) for chunk files and packed JSON-lines objects under prefix."""
+    paginator = s3.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get("Contents", []):
+            key = obj["Key"]
+            if key.endswith(".txt") or key.endswith(".jsonl"):
+                yield key, obj["ETag"].strip('"')
+
+
+def _cache_stem(cache_dir, key):
+    return os.path.join(cache_dir, hashlib.sha1(key.encode("utf-8")).hexdigest())
+
+
+def _read_object(s3, bucket, key, etag, cache_dir):
+    """Returns (key, text, from_cache), decoding the body as it streams in."""
+    if cache_dir:
+        cached = f"{_cache_stem(cache_dir, key)}_{etag}"
+        if os.path.exists(cached):
+            with open(cached, "r", encoding="utf-8") as f:
+                return key, f.read(), True
+
+    body = s3.get_object(Bucket=bucket, Key=key)["Body"]
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    parts = [decoder.decode(chunk) for chunk in body.iter_chunks(STREAM_CHUNK)]
+    parts.append(decoder.decode(b"", final=True))
+    text = "".join(parts)
+
+    if cache_dir:
+        for stale in glob.glob(f"{_cache_stem(cache_dir, key)}_*"):
+            os.remove(stale)
+        tmp_path = f"{cached}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, cached)
+    return key, text, False
+
+
+def _expand(key, text):
+    if key.endswith(".jsonl"):
+        for line in text.splitlines():
+            if line:
+                record = json.loads(line)
+                yield record["key"], record["text"]
+    else:
+        yield key, text
+
+
+def iter_s3_objects(bucket, prefix, workers=LOADER_WORKERS, cache_dir=CACHE_DIR, s3=None, stats=None):
+    """Yields (key, text) for every chunk under prefix as soon as it is downloaded.
+
+    Downloads run on `workers` threads with at most workers * 4 in flight, so
+    memory stays bounded and callers can start embedding immediately. Objects
+    whose ETag matches the local cache are read from disk instead of S3. Keys
+    of packed objects are expanded into the chunk keys they contain.
+    Objects that fail to load are logged and skipped; pass a `stats` dict to
+    read the objects/cached/failed counts once the generator is exhausted.
+    """
+    s3 = s3 or boto3.client("s3", config=Config(max_pool_connections=workers))
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+
+    start = time.time()
+    counts = stats if stats is not None else {}
+    counts.update(objects=0, cached=0, failed=0)
+
+    def finished(done):
+        for future in done:
+            try:
+                key, text, from_cache = future.result()
+            except Exception as e:
+                print(f"❌ Failed to load {future.key}: {e}")
+                counts["failed"] += 1
+                continue
+            counts["objects"] += 1
+            counts["cached"] += int(from_cache)
+            print(f"📥 Loading: {key}{' (cached)' if from_cache else ''}")
+            yield from _expand(key, text)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for key, etag in list_text_objects(s3, bucket, prefix):
+            future = pool.submit(_read_object, s3, bucket, key, etag, cache_dir)
+            future.key = key
+            pending.add(future)
+            if len(pending) >= workers * 4:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                yield from finished(done)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            yield from finished(done)
+
+    print(f"📦 Loaded {counts['objects']} objects ({counts['cached']} from cache, "
+          f"{counts['failed']} failed) in {time.time() - start:.1f}s")
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+from langchain_community.vectorstores import FAISS
+
+from ann_index import convert_vectorstore, search_subset
+from mmap_store import load_mmap_vectorstore, save_vectorstore
+
+COUNT = 50_000
+DIM = 384
+
+
+def anon_rss_mb():
+    """Private heap of this process; pages of a mapped file are counted as RssFile instead."""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("RssAnon"):
+                return int(line.split()[1]) / 1024
+    pytest.skip("needs /proc/self/status")
+
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw", "ivf-flat"])
+def test_loaded_vectors_stay_out_of_the_heap(tmp_path, index_type):
+    vectors = np.random.default_rng(0).random((COUNT, DIM), dtype=np.float32)
+    texts = [f"chunk {i}" for i in range(COUNT)]
+    store = FAISS.from_embeddings(zip(texts, vectors), None, metadatas=[{"source": "s"}] * COUNT)
+    convert_vectorstore(store, index_type, hnsw_m=8, nlist=64)
+    queries = vectors[:5] + 0.01
+    expected = store.index.search(queries, 5)
+    save_vectorstore(store, str(tmp_path))
+    del store
+
+    before = anon_rss_mb()
+    loaded = load_mmap_vectorstore(str(tmp_path), None)
+    distances, labels = loaded.index.search(queries, 5)
+    grown = anon_rss_mb() - before
+
+    np.testing.assert_array_equal(labels, expected[1])
+    np.testing.assert_allclose(distances, expected[0], rtol=1e-5)
+    assert grown < vectors.nbytes / 2**20 / 10, f"{index_type} load grew the heap by {grown:.0f} MB"
+    if index_type == "flat":
+        _, subset_labels = search_subset(loaded.index, queries, np.arange(0, COUNT, 2), 1)
+        assert (subset_labels % 2 == 0).all()
@@ -0,0 +1,24 @@
+import os
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from bench_parallel_embed import MODEL_NAME, load_texts
+from parallel_embed import BATCH_SIZE_CANDIDATES, ParallelEmbedder
+
+# Set to a local SentenceTransformer directory to run without downloading the model.
+TEST_MODEL = os.environ.get("EMBED_TEST_MODEL", MODEL_NAME)
+
+
+def test_workers_match_single_process_encode():
+    texts = load_texts(None, 3 * max(BATCH_SIZE_CANDIDATES))
+    expected = SentenceTransformer(TEST_MODEL, device="cpu").encode(texts, convert_to_numpy=True)
+    embedder = ParallelEmbedder(TEST_MODEL, workers=2, threads_per_worker=1)
+    try:
+        tuned = embedder.encode(texts)  # long enough to auto-tune the batch size first
+        fixed = embedder.encode(texts[:50])
+    finally:
+        embedder.close()
+    assert embedder.batch_size in BATCH_SIZE_CANDIDATES
+    np.testing.assert_allclose(tuned, expected, atol=1e-5)
+    np.testing.assert_allclose(fixed, expected[:50], atol=1e-5)
@@ -1,24 +1,14 @@
-import boto3
 #from langchain.embeddings import HuggingFaceEmbeddings
 #from langchain.vectorstores import FAISS
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores import FAISS
 from langchain.docstore.document import Document
 
-def load_txt_files_from_s3(bucket, prefix):
-    s3 = boto3.client("s3")
-    paginator = s3.get_paginator("list_objects_v2")
-    all_texts = []
-
-    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
-        for obj in page.get("Contents", []):
-            key = obj["Key"]
-            if key.endswith(".txt"):
-                print(f"Loading: {key}")
-                content = s3.get_object(Bucket=bucket, Key=key)["Body"].read().decode("utf-8")
-                all_texts.append(content)
+from s3_loader import iter_s3_objects
 
-    return all_texts
+def load_txt_files_from_s3(bucket, prefix):
+    for _, text in iter_s3_objects(bucket, prefix):
+        yield text
 
 def create_vectorstore(texts, save_path="vector_index"):
     print("Creating embeddings...")
@@ -1,78 +1,206 @@
-import boto3
+import argparse
+
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores import FAISS
 from langchain.docstore.document import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from sentence_transformers import SentenceTransformer
 
+from ann_index import HNSW_EF_SEARCH, INDEX_TYPES, NPROBE, convert_vectorstore
+from embedding_cache import EMBEDDING_CACHE_FILE, EmbeddingCache
+from index_builder import BATCH_SIZE, CHECKPOINT_EVERY, StreamingIndexBuilder
+from chunk_objects import chunk_metadata, embedder_chunker, latest_pages
+from index_dedup import SmallestSourceFilter, drop_near_duplicates
+from index_maintenance import IndexMaintainer
+from mmap_store import save_vectorstore
+from parallel_embed import ParallelEmbedder
+from s3_loader import iter_s3_objects
+
 # Local model path or identifier for the SentenceTransformer model
 MODEL_NAME = "all-MiniLM-L6-v2"
+# Worker processes for embed_documents (0 or 1 encodes in this process); batch size None auto-tunes
+EMBED_WORKERS = 0
+EMBED_BATCH_SIZE = None
+# FAISS index built for full rebuilds (see ann_index.INDEX_TYPES); --update keeps the saved index's type
+INDEX_TYPE = "flat"
+INDEX_PARAMS = {}
+# Skip pages and chunks that near-duplicate another page's (see index_dedup.py)
+SKIP_NEAR_DUPLICATES = True
 
 
 class SentenceTransformersEmbedder:
-    def __init__(self, model_name=MODEL_NAME):
-        print(f"✅ Loading SentenceTransformer model: {model_name}")
-        self.model = SentenceTransformer(model_name)
+    def __init__(self, model_name=MODEL_NAME, use_cache=True, workers=EMBED_WORKERS, batch_size=EMBED_BATCH_SIZE):
+        self.model_name = model_name
+        self.model = None
+        self.batch_size = batch_size
+        self.cache = EmbeddingCache(EMBEDDING_CACHE_FILE) if use_cache else None
+        self.parallel = None
+        if workers > 1:
+            self.parallel = ParallelEmbedder(model_name, workers=workers, batch_size=batch_size)
+            # The workers hold the model; this process only needs its tokenizer to size chunks.
+            self.tokenizer, max_seq_length = self.parallel.model_info()
+            self.config = {"max_seq_length": max_seq_length}
+        else:
+            print(f"✅ Loading SentenceTransformer model: {model_name}")
+            self.model = SentenceTransformer(model_name)
+
+    def _encode(self, texts):
+        if self.parallel is not None:
+            return self.parallel.encode(texts)
+        return self.model.encode(texts, batch_size=self.batch_size or 32,
+                                 convert_to_tensor=False, show_progress_bar=True)
 
     def embed_documents(self, texts):
-        return self.model.encode(texts, convert_to_tensor=False, show_progress_bar=True)
+        # Only texts missing from the on-disk cache reach the model.
+        if self.cache is None:
+            return self._encode(texts)
+        return self.cache.embed(self.model_name, texts, self._encode)
 
     def embed_query(self, text):
-        return self.model.encode(text, convert_to_tensor=False)
-
-
-def load_txt_files_from_s3(bucket, prefix):
-    s3 = boto3.client("s3")
-    paginator = s3.get_paginator("list_objects_v2")
-    all_texts = []
-
-    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
-        for obj in page.get("Contents", []):
-            key = obj["Key"]
-            if key.endswith(".txt"):
-                print(f"📥 Loading: {key}")
-                content = s3.get_object(Bucket=bucket, Key=key)["Body"].read().decode("utf-8")
-                all_texts.append(content)
-
-    return all_texts
-
-
-def create_vectorstore(texts, save_path="vector_index"):
+        if self.cache is None:
+            if self.parallel is not None:
+                return self.parallel.encode([text])[0]
+            return self.model.encode(text, convert_to_tensor=False)
+        return self.cache.embed(self.model_name, [text], self._encode)[0]
+
+    def print_cache_stats(self):
+        if self.cache is not None:
+            print(f"🗃️ Embedding cache: {self.cache.summary()}")
+
+    def close(self):
+        """Stop the embedding worker processes, if any, and write pending cache last-used times."""
+        if self.parallel is not None:
+            self.parallel.close()
+            self.parallel = None
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
+
+
+def create_vectorstore(objects, save_path="vector_index", index_type=INDEX_TYPE, index_params=INDEX_PARAMS,
+                       skip_near_duplicates=SKIP_NEAR_DUPLICATES, **embedder_options):
+    """Build the index from (key, text) chunk objects, keeping URL, section and crawl time per chunk.
+
+    embedder_options are passed to SentenceTransformersEmbedder (use_cache, workers, batch_size).
+    """
     print("✨ Creating embeddings...")
-    embedding = SentenceTransformersEmbedder()
-
-    # Create Documents
-    documents = [Document(page_content=txt) for txt in texts]
-
-    # Split documents into smaller chunks
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=800,
-        chunk_overlap=100
-    )
-
-    split_docs = []
-    for doc in documents:
-        split_docs.extend(splitter.split_documents([doc]))
-
-    # Embed the document chunks
-    #texts_only = [d.page_content for d in split_docs]
-    #vectors = embedding.embed_documents(texts_only)
-
-    # Create FAISS index manually
-    #vectorstore = FAISS.from_embeddings(vectors, split_docs)
-
-    # Create FAISS index using the custom embedding function
-    vectorstore = FAISS.from_documents(split_docs, embedding)
-
-
-
-    print(f"💾 Saving vector store to {save_path}/")
-    vectorstore.save_local(save_path)
+    embedding = SentenceTransformersEmbedder(**embedder_options)
+    try:
+        # Split chunk objects to the embedder's token window; scraped chunks already fit and stay whole
+        chunker = embedder_chunker(embedding)
+        # Whatever order downloads finish in, the same copy of a near-duplicate pair is kept as by --update
+        near_duplicates = SmallestSourceFilter() if skip_near_duplicates else None
+        split_docs = {}
+        for key, text in objects:
+            text, metadata = chunk_metadata(key, text)
+            for i, piece in enumerate(chunker.chunks(text)):
+                doc_id = f"{key}#{i}"
+                if near_duplicates is not None:
+                    keep, displaced = near_duplicates.add(doc_id, piece, metadata["source"])
+                    for other in displaced:
+                        del split_docs[other]
+                    if not keep:
+                        continue
+                split_docs[doc_id] = Document(page_content=piece, metadata=dict(metadata, split=i))
+        if near_duplicates is not None:
+            print(f"👯 Skipped {near_duplicates.skipped} near-duplicate chunks")
+
+        # Embed the document chunks
+        #texts_only = [d.page_content for d in split_docs]
+        #vectors = embedding.embed_documents(texts_only)
+
+        # Create FAISS index manually
+        #vectorstore = FAISS.from_embeddings(vectors, split_docs)
+
+        # Create FAISS index using the custom embedding function
+        vectorstore = FAISS.from_documents(list(split_docs.values()), embedding)
+        convert_vectorstore(vectorstore, index_type, **index_params)
+
+        embedding.print_cache_stats()
+        print(f"💾 Saving vector store to {save_path}/")
+        save_vectorstore(vectorstore, save_path)
+    finally:
+        embedding.close()
+
+
+def create_vectorstore_streaming(documents, save_path="vector_index", batch_size=BATCH_SIZE,
+                                 checkpoint_every=CHECKPOINT_EVERY, index_type=INDEX_TYPE, index_params=INDEX_PARAMS,
+                                 skip_near_duplicates=SKIP_NEAR_DUPLICATES, **embedder_options):
+    """Embed (key, text) documents in fixed-size batches, checkpointing so a crash can resume."""
+    print("✨ Creating embeddings in streaming mode...")
+    embedding = SentenceTransformersEmbedder(**embedder_options)
+    try:
+        builder = StreamingIndexBuilder(embedding, save_path, batch_size=batch_size, checkpoint_every=checkpoint_every,
+                                        index_type=index_type, index_params=index_params,
+                                        near_duplicates=skip_near_duplicates)
+        vectorstore = builder.build(documents)
+        embedding.print_cache_stats()
+        return vectorstore
+    finally:
+        embedding.close()
+
+
+def update_vectorstore(objects, save_path="vector_index", load_stats=None,
+                       skip_near_duplicates=SKIP_NEAR_DUPLICATES, **embedder_options):
+    """Re-embed only pages whose chunks changed and drop pages that are gone from S3.
+
+    With `load_stats` from iter_s3_objects, nothing is dropped if any object
+    failed to load, since its page would only look gone.
+    """
+    print("🔁 Updating vector store in place...")
+    embedding = SentenceTransformersEmbedder(**embedder_options)
+    try:
+        maintainer = IndexMaintainer(embedding, save_path)
+        pages = latest_pages(objects)
+        failed = (load_stats or {}).get("failed", 0)
+        if failed:
+            print(f"⚠️ {failed} objects failed to load; keeping pages missing from this listing")
+        maintainer.sync(drop_near_duplicates(pages) if skip_near_duplicates else pages, delete_missing=not failed)
+        embedding.print_cache_stats()
+        print(f"💾 Saving vector store to {save_path}/")
+        maintainer.save()
+    finally:
+        embedding.close()
 
 
 if __name__ == "__main__":
     BUCKET_NAME = "cs589-aiproject"
     PREFIX = "uscis_batches_pages/"
 
-    texts = load_txt_files_from_s3(BUCKET_NAME, PREFIX)
-    create_vectorstore(texts)
+    parser = argparse.ArgumentParser(description="Build the FAISS index from scraped chunks in S3.")
+    parser.add_argument("--update", action="store_true",
+                        help="update the saved index page by page instead of rebuilding it")
+    parser.add_argument("--streaming", action="store_true",
+                        help="embed in batches with periodic checkpoints instead of all at once")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="chunks per embedding batch")
+    parser.add_argument("--checkpoint-every", type=int, default=CHECKPOINT_EVERY, help="batches between checkpoints")
+    parser.add_argument("--no-embedding-cache", action="store_true", help="always re-encode every chunk")
+    parser.add_argument("--embed-workers", type=int, default=EMBED_WORKERS,
+                        help="processes to embed with (0 encodes in this process)")
+    parser.add_argument("--embed-batch-size", type=int, default=None,
+                        help="encode batch size (default: auto-tune when using --embed-workers)")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default=INDEX_TYPE,
+                        help="flat is exact; IVF/HNSW trade some recall for faster search, PQ also for memory")
+    parser.add_argument("--nlist", type=int, default=None, help="IVF lists (default: about 4*sqrt(chunks))")
+    parser.add_argument("--nprobe", type=int, default=NPROBE, help="IVF lists searched per query")
+    parser.add_argument("--ef-search", type=int, default=HNSW_EF_SEARCH, help="HNSW search breadth")
+    parser.add_argument("--keep-near-duplicates", action="store_true",
+                        help="embed pages and chunks even when they near-duplicate another page's")
+    args = parser.parse_args()
+
+    embedder_options = {"use_cache": not args.no_embedding_cache, "workers": args.embed_workers,
+                        "batch_size": args.embed_batch_size}
+    skip_near_duplicates = not args.keep_near_duplicates
+    index_options = {"index_type": args.index_type,
+                     "index_params": {"nlist": args.nlist, "nprobe": args.nprobe, "ef_search": args.ef_search}}
+
+    if args.update:
+        load_stats = {}
+        update_vectorstore(iter_s3_objects(BUCKET_NAME, PREFIX, stats=load_stats), load_stats=load_stats,
+                           skip_near_duplicates=skip_near_duplicates, **embedder_options)
+    elif args.streaming:
+        create_vectorstore_streaming(iter_s3_objects(BUCKET_NAME, PREFIX),
+                                     batch_size=args.batch_size, checkpoint_every=args.checkpoint_every,
+                                     skip_near_duplicates=skip_near_duplicates, **index_options, **embedder_options)
+    else:
+        create_vectorstore(iter_s3_objects(BUCKET_NAME, PREFIX), skip_near_duplicates=skip_near_duplicates,
+                           **index_options, **embedder_options)
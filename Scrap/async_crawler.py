@@ -0,0 +1,135 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlparse
+
+
+class HostLimiter:
+    """Per-host politeness: caps concurrent requests and spaces out request starts."""
+
+    def __init__(self, max_per_host=2, delay=0.5):
+        self.max_per_host = max_per_host
+        self.delay = delay
+        self._semaphores = {}
+        self._locks = {}
+        self._next_start = {}
+
+    async def acquire(self, host):
+        semaphore = self._semaphores.setdefault(host, asyncio.Semaphore(self.max_per_host))
+        await semaphore.acquire()
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            now = time.monotonic()
+            start = max(now, self._next_start.get(host, now))
+            self._next_start[host] = start + self.delay
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    def release(self, host):
+        self._semaphores[host].release()
+
+
+class AsyncCrawler:
+    """Crawls a shared frontier with N fetch workers feeding a separate parse stage.
+
+    fetch(url) returns the fetched page or None and runs on a thread pool sized to
+    the concurrency. process(url, page) returns (saved, hrefs); it runs on a single
+    thread so chunk files and the visited file keep a single writer.
+
+    With prepare, the CPU-heavy part is split off: prepare(page) runs on
+    parse_pool (a process pool; the writer thread when None), parse_workers
+    pages at a time, and process(url, page, prepared) gets its result.
+    """
+
+    def __init__(self, fetch, process, base_url, concurrency=8, max_per_host=4, host_delay=0.1,
+                 prepare=None, parse_pool=None, parse_workers=1):
+        self.fetch = fetch
+        self.process = process
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.limiter = HostLimiter(max_per_host, host_delay)
+        self.prepare = prepare
+        self.parse_pool = parse_pool
+        self.parse_workers = parse_workers if prepare is not None else 1
+
+    async def crawl_batch(self, frontier, processed, limit):
+        """Crawl until `limit` pages are saved or the frontier runs dry.
+
+        `frontier` (hrefs) and `processed` (full URLs) are updated in place, with
+        the same dedup rules as the sequential loop. Returns (pages_scraped, links_found).
+        """
+        loop = asyncio.get_running_loop()
+        cond = asyncio.Condition()
+        parse_queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        in_flight = set()
+        state = {"scraped": 0, "pending": 0, "links": 0}
+
+        async def claim():
+            async with cond:
+                while True:
+                    if state["scraped"] >= limit:
+                        return None
+                    if frontier and state["scraped"] + state["pending"] < limit:
+                        full_url = urljoin(self.base_url, frontier.pop())
+                        if full_url in processed or full_url in in_flight:
+                            continue
+                        in_flight.add(full_url)
+                        state["pending"] += 1
+                        return full_url
+                    if state["pending"] == 0:
+                        return None
+                    await cond.wait()
+
+        async def fetch_worker():
+            while True:
+                full_url = await claim()
+                if full_url is None:
+                    return
+                host = urlparse(full_url).netloc
+                await self.limiter.acquire(host)
+                try:
+                    print(f"🔎 Scraping [{state['scraped'] + 1}]: {full_url}")
+                    page = await loop.run_in_executor(fetch_pool, self.fetch, full_url)
+                except Exception as e:
+                    print(f"❌ Error fetching {full_url}: {e}")
+                    page = None
+                finally:
+                    self.limiter.release(host)
+                await parse_queue.put((full_url, page))
+
+        async def parse_stage():
+            while True:
+                item = await parse_queue.get()
+                if item is None:
+                    return
+                full_url, page = item
+                saved, hrefs = False, ()
+                try:
+                    if page is not None and self.prepare is None:
+                        saved, hrefs = await loop.run_in_executor(write_pool, self.process, full_url, page)
+                    elif page is not None:
+                        prepared = await loop.run_in_executor(self.parse_pool or write_pool, self.prepare, page)
+                        saved, hrefs = await loop.run_in_executor(write_pool, self.process, full_url, page, prepared)
+                except Exception as e:
+                    print(f"❌ Error processing {full_url}: {e}")
+                async with cond:
+                    if saved:
+                        processed.add(full_url)
+                        state["scraped"] += 1
+                    for href in hrefs:
+                        if urljoin(self.base_url, href) not in processed:
+                            frontier.add(href)
+                            state["links"] += 1
+                    in_flight.discard(full_url)
+                    state["pending"] -= 1
+                    cond.notify_all()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as fetch_pool, \
+                ThreadPoolExecutor(max_workers=1) as write_pool:
+            parsers = [asyncio.create_task(parse_stage()) for _ in range(self.parse_workers)]
+            await asyncio.gather(*(fetch_worker() for _ in range(self.concurrency)))
+            for _ in parsers:
+                await parse_queue.put(None)
+            await asyncio.gather(*parsers)
+
+        return state["scraped"], state["links"]
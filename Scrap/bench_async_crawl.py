@@ -0,0 +1,112 @@
+import argparse
+import asyncio
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import html_parser
+from async_crawler import AsyncCrawler
+from scaper_to_s3_page import extract_links, fetch_page, make_parse_pool, parse_page, prepare_page
+
+PARAGRAPH = "Officers review the evidence submitted with the application. " * 12
+
+
+def make_site(num_pages, links_per_page, seed=0, paragraphs=1):
+    rng = random.Random(seed)
+    paths = ["/policy-manual"] + [f"/policy-manual/volume-{i // 100}/chapter-{i}" for i in range(1, num_pages)]
+    body = f"<p>{PARAGRAPH}</p>" * paragraphs
+    site = {}
+    for path in paths:
+        links = "".join(f'<li><a href="{p}">{p}</a></li>' for p in rng.sample(paths, links_per_page))
+        site[path] = (
+            "<html><head><title>Policy Manual</title></head><body>"
+            "<header><a href=\"/forms\">Forms</a></header>"
+            f"<div class=\"region-content\"><h1>{path}</h1>{body}<ul>{links}</ul>"
+            "<p>Last Reviewed/Updated: 01/01/2025</p></div>"
+            "</body></html>"
+        ).encode("utf-8")
+    return site
+
+
+def start_server(site, latency):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            body = site.get(self.path)
+            if body is None:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def process(full_url, page):
+    text, links = parse_page(page.html)
+    return bool(text), extract_links(links)
+
+
+def write(full_url, page, prepared):
+    return prepared.text_hash is not None, prepared.hrefs
+
+
+def run_once(base_url, concurrency, limit, parse_workers=0):
+    if parse_workers:
+        pool = make_parse_pool(parse_workers)
+        crawler = AsyncCrawler(fetch_page, write, base_url, concurrency=concurrency, max_per_host=concurrency,
+                               host_delay=0, prepare=prepare_page, parse_pool=pool, parse_workers=parse_workers)
+    else:
+        pool = None
+        crawler = AsyncCrawler(fetch_page, process, base_url,
+                               concurrency=concurrency, max_per_host=concurrency, host_delay=0)
+    start = time.perf_counter()
+    scraped, _ = asyncio.run(crawler.crawl_batch({"/policy-manual"}, set(), limit))
+    elapsed = time.perf_counter() - start
+    if pool is not None:
+        pool.shutdown()
+    return scraped, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the async crawler against a local HTTP stand-in.")
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--links", type=int, default=8, help="links per page")
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated server latency in seconds")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--parse-workers", type=int, nargs="+", default=[0],
+                        help="parse processes to compare (0 parses inline on the writer thread)")
+    parser.add_argument("--paragraphs", type=int, default=1, help="paragraphs per page, to make parsing heavier")
+    parser.add_argument("--parser", choices=html_parser.BACKENDS, default=html_parser.BACKEND)
+    args = parser.parse_args()
+    html_parser.set_backend(args.parser)
+
+    site = make_site(args.pages, args.links, paragraphs=args.paragraphs)
+    server = start_server(site, args.latency)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    results = []
+    for parse_workers in args.parse_workers:
+        for concurrency in args.concurrency:
+            scraped, elapsed = run_once(base_url, concurrency, args.pages, parse_workers)
+            results.append((concurrency, parse_workers, scraped, elapsed))
+
+    server.shutdown()
+    print(f"\n📊 {args.pages} pages, {args.latency * 1000:.0f} ms simulated latency, {args.parser} parser")
+    print(f"{'workers':>8} {'parsers':>8} {'pages':>6} {'seconds':>8} {'pages/s':>8}")
+    for concurrency, parse_workers, scraped, elapsed in results:
+        print(f"{concurrency:>8} {parse_workers:>8} {scraped:>6} {elapsed:>8.2f} {scraped / elapsed:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import argparse
+import re
+import time
+
+import numpy as np
+
+import html_parser
+from bench_html_parser import CORPUS_DIR, load_corpus
+from boilerplate import (EDGE_LINES, MAX_LEARN_LENGTH, MIN_PAGE_FRACTION, MIN_PAGES, BoilerplateFilter,
+                         BoilerplateLearner, candidate_lines)
+
+
+def regex_clean_text(text):
+    """clean_text as it was: one case-insensitive regex search per line."""
+    filtered = []
+    for line in text.strip().splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if re.search(r'uscis\.gov|last reviewed|last updated', line, re.IGNORECASE):
+            continue
+        if len(line) < 3:
+            continue
+        filtered.append(line)
+    return "\n".join(filtered)
+
+
+def time_clean(clean, texts, repeat):
+    samples = []
+    for _ in range(repeat):
+        for text in texts:
+            start = time.perf_counter()
+            clean(text)
+            samples.append(time.perf_counter() - start)
+    return np.asarray(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time and output of the boilerplate filter against the old regex cleaner.")
+    parser.add_argument("--corpus", default=CORPUS_DIR, help="directory of saved .html pages (see bench_html_parser.py)")
+    parser.add_argument("--repeat", type=int, default=5, help="passes over the corpus per cleaner")
+    parser.add_argument("--min-pages", type=int, default=MIN_PAGES)
+    parser.add_argument("--min-fraction", type=float, default=MIN_PAGE_FRACTION)
+    parser.add_argument("--edge-lines", type=int, default=EDGE_LINES,
+                        help="leading and trailing lines of each page counted as boilerplate candidates")
+    args = parser.parse_args()
+
+    texts = [page.text for _, html in load_corpus(args.corpus) if (page := html_parser.parse(html)).text]
+    if not texts:
+        raise SystemExit(f"No content pages in {args.corpus}/; run bench_html_parser.py --download N first.")
+
+    keyword_filter = BoilerplateFilter()
+    learner = BoilerplateLearner(args.min_pages, args.min_fraction)
+    # Every repeated line, wherever it is on the page: what learning would drop without the edge and heading rules.
+    repeated = BoilerplateLearner(args.min_pages, args.min_fraction)
+    for text in texts:
+        cleaned = keyword_filter.clean(text)
+        learner.observe(candidate_lines(cleaned, edge_lines=args.edge_lines))
+        repeated.observe({line for line in cleaned.split("\n") if len(line) <= MAX_LEARN_LENGTH and " " in line})
+    learner.learn()
+    repeated.learn()
+    learned_filter = BoilerplateFilter(learned=learner.learned)
+    mismatches = sum(keyword_filter.clean(text) != regex_clean_text(text) for text in texts)
+
+    print(f"📄 {len(texts)} pages, {sum(map(len, texts)) / len(texts) / 1024:.0f} KiB of text on average; "
+          f"{len(learner.learned)} lines learned")
+    print(f"\n{'cleaner':>9} {'p50 µs':>8} {'p99 µs':>8} {'pages/s':>9} {'kept KiB':>9}")
+    for name, clean in (("regex", regex_clean_text), ("filter", keyword_filter.clean),
+                        ("learned", learned_filter.clean)):
+        samples = time_clean(clean, texts, args.repeat)
+        kept = sum(len(clean(text)) for text in texts)
+        print(f"{name:>9} {np.percentile(samples, 50) * 1e6:>8.0f} {np.percentile(samples, 99) * 1e6:>8.0f} "
+              f"{len(samples) / samples.sum():>9.0f} {kept / 1024:>9.0f}")
+    print(f"\n{mismatches} pages where the keyword filter differs from the regex cleaner")
+    print(f"\n🧹 {len(learner.learned)} lines learned as boilerplate:")
+    for line in sorted(learner.learned, key=lambda line: -learner.counts[line]):
+        print(f"   {learner.counts[line]:>6} pages: {line[:80]}")
+    kept = repeated.learned - learner.learned
+    print(f"\n📄 {len(kept)} repeated lines kept as content (headings or mid-page):")
+    for line in sorted(kept, key=lambda line: -repeated.counts[line]):
+        print(f"   {repeated.counts[line]:>6} pages: {line[:80]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import argparse
+import time
+
+import numpy as np
+
+import html_parser
+from bench_html_parser import CORPUS_DIR, load_corpus
+from boilerplate import BoilerplateFilter
+from uscis_text.text_chunker import (MAX_TOKENS, TOKENIZER_MODEL, TextChunker, estimate_tokens, load_tokenizer,
+                                     tokenizer_counter)
+
+
+def line_chunks(text, max_length=800):
+    """scaper_to_s3_page.chunk_text as it was."""
+    chunks, current, length = [], [], 0
+    for line in text.splitlines():
+        if length + len(line) > max_length:
+            chunks.append("\n".join(current))
+            current, length = [], 0
+        current.append(line)
+        length += len(line)
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def sliced_chunks(text, size=1000):
+    """scraper_with_chunks.save_text_chunks as it was."""
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def chunkers(token_counts, max_tokens):
+    yield "lines-800", line_chunks
+    yield "slice-1000", sliced_chunks
+    try:
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+        yield "recursive", RecursiveCharacterTextSplitter(chunk_size=800, chunk_overlap=100).split_text
+    except ImportError:
+        pass
+    yield "tokens", TextChunker(token_counts, max_tokens=max_tokens).split_text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunk counts, sizes and time of the old chunkers and TextChunker.")
+    parser.add_argument("--corpus", default=CORPUS_DIR, help="directory of saved .html pages (see bench_html_parser.py)")
+    parser.add_argument("--tokenizer", default=TOKENIZER_MODEL)
+    parser.add_argument("--max-tokens", type=int, default=MAX_TOKENS)
+    args = parser.parse_args()
+
+    clean = BoilerplateFilter().clean
+    texts = [clean(page.text) for _, html in load_corpus(args.corpus) if (page := html_parser.parse(html)).text]
+    if not texts:
+        raise SystemExit(f"No content pages in {args.corpus}/; run bench_html_parser.py --download N first.")
+    tokenizer = load_tokenizer(args.tokenizer)
+    token_counts = tokenizer_counter(tokenizer) if tokenizer is not None else estimate_tokens
+    print(f"📄 {len(texts)} pages; tokens counted with {args.tokenizer if tokenizer is not None else 'an estimate'}")
+
+    print(f"\n{'chunker':>10} {'ms/page':>8} {'chunks':>7} {'empty':>6} {'p50 tok':>8} {'max tok':>8} "
+          f"{f'> {args.max_tokens}':>7}")
+    for name, split in chunkers(token_counts, args.max_tokens):
+        start = time.perf_counter()
+        chunks = [chunk for text in texts for chunk in split(text)]
+        elapsed = time.perf_counter() - start
+        tokens = np.asarray(token_counts(chunks))
+        print(f"{name:>10} {elapsed / len(texts) * 1000:>8.2f} {len(chunks):>7} "
+              f"{sum(not chunk.strip() for chunk in chunks):>6} {np.percentile(tokens, 50):>8.0f} "
+              f"{tokens.max():>8} {int((tokens > args.max_tokens).sum()):>7}")
+
+
+if __name__ == "__main__":
+    main()
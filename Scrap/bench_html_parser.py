@@ -0,0 +1,91 @@
+import argparse
+import os
+import time
+from urllib.parse import urljoin
+
+import numpy as np
+
+import html_parser
+from fetcher import fetch
+from scaper_to_s3_page import BASE_URL, HEADERS, START_URL, is_valid_link, slugify_url
+
+CORPUS_DIR = "uscis_html_corpus"
+
+
+def save_corpus(corpus_dir, count, delay=0.5):
+    """Crawl `count` pages from START_URL and keep their raw HTML as <slug>.html."""
+    os.makedirs(corpus_dir, exist_ok=True)
+    frontier, seen, saved = [START_URL], set(), 0
+    while frontier and saved < count:
+        url = urljoin(BASE_URL, frontier.pop(0))
+        if url in seen:
+            continue
+        seen.add(url)
+        try:
+            response = fetch(url, headers=HEADERS, timeout=10)
+            response.raise_for_status()
+        except Exception as e:
+            print(f"❌ Error fetching {url}: {e}")
+            continue
+        with open(os.path.join(corpus_dir, f"{slugify_url(url)}.html"), "w", encoding="utf-8") as f:
+            f.write(response.text)
+        saved += 1
+        frontier.extend(href for href in html_parser.parse(response.text, "bs4").links if is_valid_link(href))
+        time.sleep(delay)
+    print(f"💾 Saved {saved} pages to {corpus_dir}/")
+
+
+def load_corpus(corpus_dir):
+    pages = []
+    for name in sorted(os.listdir(corpus_dir)):
+        if name.endswith(".html"):
+            with open(os.path.join(corpus_dir, name), "r", encoding="utf-8") as f:
+                pages.append((name, f.read()))
+    return pages
+
+
+def time_backend(backend, pages, repeat):
+    samples = []
+    for _ in range(repeat):
+        for _, html in pages:
+            start = time.perf_counter()
+            html_parser.parse(html, backend)
+            samples.append(time.perf_counter() - start)
+    return np.asarray(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse time and BeautifulSoup parity of the HTML parser backends.")
+    parser.add_argument("--corpus", default=CORPUS_DIR, help="directory of saved .html pages")
+    parser.add_argument("--download", type=int, default=0, help="first crawl this many pages into the corpus")
+    parser.add_argument("--repeat", type=int, default=3, help="passes over the corpus per backend")
+    parser.add_argument("--backends", nargs="+", choices=html_parser.BACKENDS, default=html_parser.available_backends())
+    args = parser.parse_args()
+
+    if args.download:
+        save_corpus(args.corpus, args.download)
+    pages = load_corpus(args.corpus)
+    if not pages:
+        raise SystemExit(f"No .html pages in {args.corpus}/; run with --download N first.")
+    total_bytes = sum(len(html.encode("utf-8")) for _, html in pages)
+    print(f"📄 {len(pages)} pages, {total_bytes / len(pages) / 1024:.0f} KiB on average")
+
+    baseline = None
+    print(f"\n{'parser':>10} {'p50 ms':>8} {'p99 ms':>8} {'pages/s':>9} {'speedup':>8} {'mismatches':>11}")
+    for backend in sorted(args.backends, key=lambda b: b != "bs4"):  # bs4 first, as the speedup baseline
+        samples = time_backend(backend, pages, args.repeat)
+        rate = len(samples) / samples.sum()
+        baseline = baseline or (rate if backend == "bs4" else None)
+        mismatched = []
+        if backend != "bs4":
+            mismatched = [(name, problems) for name, html in pages
+                          if (problems := html_parser.check_parity(html, backend))]
+        speedup = f"{rate / baseline:.1f}x" if baseline else ""
+        print(f"{backend:>10} {np.percentile(samples, 50) * 1000:>8.2f} {np.percentile(samples, 99) * 1000:>8.2f} "
+              f"{rate:>9.1f} {speedup:>8} {len(mismatched):>11}")
+        for name, problems in mismatched[:3]:
+            print(f"{'':>12}⚠️ {name}: {'; '.join(problems)}")
+
+
+if __name__ == "__main__":
+    main()
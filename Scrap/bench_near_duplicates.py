@@ -0,0 +1,61 @@
+import argparse
+import random
+import time
+
+import numpy as np
+
+import html_parser
+from bench_html_parser import CORPUS_DIR, load_corpus
+from boilerplate import BoilerplateFilter
+from uscis_text.near_duplicates import DUPLICATE_JACCARD, MinHashIndex, minhash
+
+
+def variants(text, rng):
+    """Near-duplicates of a page like the ones the crawl meets: a print view, and small edits."""
+    lines = text.split("\n")
+    yield "print view", "Print this page\n" + text + "\nPrinted from the USCIS Policy Manual"
+    edited = list(lines)
+    edited[rng.randrange(len(edited))] = "This paragraph was revised since the last crawl."
+    yield "one line edited", "\n".join(edited)
+    for _ in range(4):
+        edited[rng.randrange(len(edited))] = f"Revised paragraph {rng.random()}."
+    yield "five lines edited", "\n".join(edited)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Signature time, recall and false positives of near-duplicate detection.")
+    parser.add_argument("--corpus", default=CORPUS_DIR, help="directory of saved .html pages (see bench_html_parser.py)")
+    parser.add_argument("--threshold", type=float, default=DUPLICATE_JACCARD)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    clean = BoilerplateFilter().clean
+    texts = [clean(page.text) for _, html in load_corpus(args.corpus) if (page := html_parser.parse(html)).text]
+    if not texts:
+        raise SystemExit(f"No content pages in {args.corpus}/; run bench_html_parser.py --download N first.")
+
+    index = MinHashIndex(args.threshold)
+    start = time.perf_counter()
+    signatures = [minhash(text) for text in texts]
+    signed = time.perf_counter()
+    false_positives = 0
+    for i, signature in enumerate(signatures):
+        false_positives += index.find(signature) is not None
+        index.add(str(i), signature)
+    added = time.perf_counter()
+    print(f"📄 {len(texts)} pages: {(signed - start) / len(texts) * 1000:.2f} ms to sign, "
+          f"{(added - signed) / len(texts) * 1000:.3f} ms to look up and add; "
+          f"{false_positives} distinct pages taken for near-duplicates")
+
+    rng = random.Random(args.seed)
+    found = {}
+    for i, text in enumerate(texts):
+        for name, variant in variants(text, rng):
+            found.setdefault(name, []).append(index.find(minhash(variant)) == str(i))
+    print(f"\n{'variant':>18} {'found':>7}")
+    for name, hits in found.items():
+        print(f"{name:>18} {np.mean(hits):>7.1%}")
+
+
+if __name__ == "__main__":
+    main()
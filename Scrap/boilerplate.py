@@ -0,0 +1,136 @@
+import json
+import os
+import re
+from collections import Counter
+
+# Lines containing any of these (case-insensitive) are dropped, as clean_text always has.
+BOILERPLATE_KEYWORDS = ("uscis.gov", "last reviewed", "last updated")
+MIN_LINE_LENGTH = 3
+# A line is learned as boilerplate once it is on this many pages and this share of all pages seen.
+MIN_PAGES = 20
+MIN_PAGE_FRACTION = 0.25
+# Only short lines are counted; headers, footers and nav items are short. Single words are
+# left alone: inline links put fragments like "see" or "Form" on lines of their own.
+MAX_LEARN_LENGTH = 200
+# Headers and footers sit at the ends of a page, so only this many leading and trailing lines
+# are counted. Outline headings ("A. Purpose", "Chapter 2") repeat across pages but are content
+# and the chunker's section boundaries, so they are never learned.
+EDGE_LINES = 10
+HEADING_RE = re.compile(r"(?:[A-Za-z]|[IVXLC]+|\d+(?:\.\d+)*)[.)]\s"
+                        r"|(?:Chapter|Part|Section|Volume|Appendix)\s+(?:[A-Z]|[IVXLC]+|\d+(?:\.\d+)*)\b")
+MAX_TRACKED_LINES = 200_000
+
+
+class BoilerplateFilter:
+    """Drops boilerplate lines from page text in a single pass.
+
+    Keyword lines are found with str.find over the lowercased text and cut out
+    as whole lines; the remaining lines are stripped and kept unless they are
+    shorter than min_length, one of the learned lines, or match an extra
+    regex pattern.
+    """
+
+    def __init__(self, keywords=BOILERPLATE_KEYWORDS, patterns=(), min_length=MIN_LINE_LENGTH, learned=()):
+        self.keywords = tuple(keyword.lower() for keyword in keywords)
+        self.pattern = re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE) if patterns else None
+        self.min_length = min_length
+        self.learned = frozenset(learned)
+
+    def _drop_keyword_lines(self, text):
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # Some characters change length when lowercased; positions no longer line up.
+            return "\n".join(line for line in text.split("\n")
+                             if not any(keyword in line.lower() for keyword in self.keywords))
+        spans = []
+        for keyword in self.keywords:
+            position = lowered.find(keyword)
+            while position != -1:
+                start = lowered.rfind("\n", 0, position) + 1
+                end = lowered.find("\n", position)
+                if end == -1:
+                    end = len(lowered)
+                spans.append((start, end))
+                position = lowered.find(keyword, end)
+        if not spans:
+            return text
+        parts = []
+        kept_from = 0
+        for start, end in sorted(spans):
+            if start >= kept_from:
+                parts.append(text[kept_from:start])
+            kept_from = max(kept_from, end)
+        parts.append(text[kept_from:])
+        return "".join(parts)
+
+    def clean(self, text):
+        text = "\n".join(text.splitlines())
+        if self.keywords:
+            text = self._drop_keyword_lines(text)
+        min_length, learned, pattern = self.min_length, self.learned, self.pattern
+        lines = (line for line in map(str.strip, text.split("\n")) if len(line) >= min_length and line not in learned)
+        if pattern is not None:
+            lines = (line for line in lines if not pattern.search(line))
+        return "\n".join(lines)
+
+
+def is_heading(line):
+    return HEADING_RE.match(line) is not None
+
+
+def candidate_lines(text, max_length=MAX_LEARN_LENGTH, edge_lines=EDGE_LINES):
+    """The distinct lines of a cleaned page that could be boilerplate.
+
+    Only the first and last edge_lines lines count, and of those only short
+    lines of more than one word that are not outline headings.
+    """
+    lines = text.split("\n")
+    if len(lines) > 2 * edge_lines:
+        lines = lines[:edge_lines] + lines[-edge_lines:]
+    return {line for line in lines if len(line) <= max_length and " " in line and not is_heading(line)}
+
+
+class BoilerplateLearner:
+    """Counts how many pages each short line appears on; lines on enough pages become boilerplate.
+
+    Learned lines stay learned. Counts persist with the learned lines, so
+    learning carries over between crawls.
+    """
+
+    def __init__(self, min_pages=MIN_PAGES, min_fraction=MIN_PAGE_FRACTION, pages=0, counts=None, learned=()):
+        self.min_pages = min_pages
+        self.min_fraction = min_fraction
+        self.pages = pages
+        self.counts = Counter(counts or {})
+        self.learned = set(learned)
+
+    def observe(self, lines):
+        self.pages += 1
+        self.counts.update(lines)
+        if len(self.counts) > MAX_TRACKED_LINES:
+            self.counts = Counter({line: count for line, count in self.counts.items() if count > 1})
+
+    def learn(self):
+        """Adds newly frequent lines to the learned set; returns how many were added."""
+        threshold = max(self.min_pages, self.min_fraction * self.pages)
+        new = {line for line, count in self.counts.items() if count >= threshold} - self.learned
+        self.learned |= new
+        return len(new)
+
+    def save(self, path):
+        state = {"pages": self.pages, "learned": sorted(self.learned),
+                 "counts": {line: count for line, count in self.counts.items() if count > 1}}
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(f"{path}.tmp", path)
+
+    @classmethod
+    def load(cls, path, min_pages=MIN_PAGES, min_fraction=MIN_PAGE_FRACTION):
+        if not os.path.exists(path):
+            return cls(min_pages, min_fraction)
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        # Headings learned before they were excluded are forgotten.
+        counts = {line: count for line, count in state["counts"].items() if not is_heading(line)}
+        return cls(min_pages, min_fraction, state["pages"], counts,
+                   [line for line in state["learned"] if not is_heading(line)])
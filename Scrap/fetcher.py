@@ -0,0 +1,194 @@
+import socket
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util import connection as urllib3_connection
+from urllib3.util.retry import Retry
+
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 32
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_local = threading.local()
+_session = None
+_session_lock = threading.Lock()
+
+
+class FetchTiming:
+    """Per-request timing in seconds. dns/connect are zero when a kept-alive socket was reused."""
+
+    def __init__(self):
+        self.dns = 0.0
+        self.connect = 0.0
+        self.ttfb = 0.0
+        self.body = 0.0
+        self.total = 0.0
+        self.new_connection = False
+        self.status = None
+        self.bytes = 0
+
+    def __repr__(self):
+        return (f"FetchTiming(dns={self.dns * 1000:.1f}ms, connect={self.connect * 1000:.1f}ms, "
+                f"ttfb={self.ttfb * 1000:.1f}ms, body={self.body * 1000:.1f}ms, "
+                f"total={self.total * 1000:.1f}ms, new_connection={self.new_connection})")
+
+
+class FetchStats:
+    """Running totals over every fetch in the process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.requests = 0
+        self.new_connections = 0
+        self.bytes = 0
+        self.totals = {"dns": 0.0, "connect": 0.0, "ttfb": 0.0, "body": 0.0, "total": 0.0}
+
+    def record(self, timing):
+        with self._lock:
+            self.requests += 1
+            self.new_connections += int(timing.new_connection)
+            self.bytes += timing.bytes
+            for name in self.totals:
+                self.totals[name] += getattr(timing, name)
+
+    def summary(self):
+        with self._lock:
+            if not self.requests:
+                return "no requests"
+            avg = {name: value / self.requests * 1000 for name, value in self.totals.items()}
+            reused = self.requests - self.new_connections
+            return (f"{self.requests} requests, {reused} on reused connections, "
+                    f"avg dns {avg['dns']:.1f}ms / connect {avg['connect']:.1f}ms / "
+                    f"ttfb {avg['ttfb']:.1f}ms / body {avg['body']:.1f}ms / total {avg['total']:.1f}ms")
+
+
+stats = FetchStats()
+
+
+_create_connection = urllib3_connection.create_connection
+
+
+def _timed_create_connection(address, *args, **kwargs):
+    """urllib3's create_connection, resolving the host once here so fetch() can time the lookup.
+
+    The resolved addresses are handed to urllib3 in order, so it does no second
+    lookup. Connections made outside fetch() go straight to urllib3.
+    """
+    timing = getattr(_local, "timing", None)
+    if timing is None:
+        return _create_connection(address, *args, **kwargs)
+    host, port = address
+    start = time.perf_counter()
+    addresses = socket.getaddrinfo(host.strip("[]"), port, urllib3_connection.allowed_gai_family(),
+                                   socket.SOCK_STREAM)
+    timing.dns += time.perf_counter() - start
+    error = None
+    for *_, sockaddr in addresses:
+        try:
+            return _create_connection((sockaddr[0], port), *args, **kwargs)
+        except OSError as e:
+            error = e
+    raise error or OSError("getaddrinfo returns an empty list")
+
+
+urllib3_connection.create_connection = _timed_create_connection
+
+
+class _TimedConnectionMixin:
+    def connect(self):
+        timing = getattr(_local, "timing", None)
+        start = time.perf_counter()
+        dns = timing.dns if timing is not None else 0.0
+        super().connect()
+        if timing is not None:
+            # TCP and TLS time; the lookup inside it was timed by _timed_create_connection.
+            timing.connect += time.perf_counter() - start - (timing.dns - dns)
+            timing.new_connection = True
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose pooled connections report DNS and connect time."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+
+def build_session(pool_maxsize=POOL_MAXSIZE, max_retries=MAX_RETRIES, backoff_factor=BACKOFF_FACTOR):
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        raise_on_status=False,
+    )
+    adapter = TimedHTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=pool_maxsize, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session():
+    """Process-wide session shared by every scraper and fetch thread."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = build_session()
+    return _session
+
+
+def fetch(url, headers=None, timeout=10, session=None, **kwargs):
+    """GET `url` over a pooled keep-alive connection, retrying transient errors.
+
+    The returned response has its body loaded and carries a `timing` attribute.
+    """
+    session = session or get_session()
+    timing = FetchTiming()
+    _local.timing = timing
+    start = time.perf_counter()
+    try:
+        response = session.get(url, headers=headers, timeout=timeout, stream=True, **kwargs)
+        headers_received = time.perf_counter()
+        response.content
+    finally:
+        _local.timing = None
+    end = time.perf_counter()
+
+    timing.ttfb = headers_received - start - timing.dns - timing.connect
+    timing.body = end - headers_received
+    timing.total = end - start
+    timing.status = response.status_code
+    timing.bytes = len(response.content)
+    response.timing = timing
+    stats.record(timing)
+    return response
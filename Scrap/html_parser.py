@@ -0,0 +1,114 @@
+from collections import namedtuple
+
+CONTENT_CLASS = "region-content"
+# Subtrees BeautifulSoup's get_text() leaves out; the fast backends drop them to match.
+NON_TEXT_TAGS = ("script", "style", "template")
+BACKENDS = ("selectolax", "lxml", "bs4")
+
+# text: the region-content div's strings, stripped and joined with newlines (None without the div);
+# links: every <a href> of the page, in document order.
+ParsedPage = namedtuple("ParsedPage", ["text", "links"])
+
+
+def _parse_bs4(html, exclude=()):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    content_div = soup.find("div", class_=CONTENT_CLASS)
+    text = None
+    if content_div:
+        for tag in content_div.find_all(list(exclude)) if exclude else ():
+            tag.decompose()
+        text = content_div.get_text(separator="\n", strip=True)
+    return ParsedPage(text, [a_tag["href"] for a_tag in soup.find_all("a", href=True)])
+
+
+def _parse_lxml(html, exclude=()):
+    import lxml.html
+    from lxml import etree
+
+    if not html.strip():
+        return ParsedPage(None, [])
+    document = lxml.html.document_fromstring(html)
+    matches = document.xpath(
+        f'//div[contains(concat(" ", normalize-space(@class), " "), " {CONTENT_CLASS} ")]')
+    text = None
+    if matches:
+        content_div = matches[0]
+        etree.strip_elements(content_div, *NON_TEXT_TAGS, *exclude, etree.Comment, with_tail=False)
+        text = "\n".join(s for s in (s.strip() for s in content_div.itertext()) if s)
+    return ParsedPage(text, [href for href in (a.get("href") for a in document.iter("a")) if href is not None])
+
+
+def _parse_selectolax(html, exclude=()):
+    from selectolax.lexbor import LexborHTMLParser
+
+    tree = LexborHTMLParser(html)
+    content_div = tree.css_first(f"div.{CONTENT_CLASS}")
+    text = None
+    if content_div is not None:
+        content_div.strip_tags([*NON_TEXT_TAGS, *exclude])
+        strings = (node.text_content.strip() for node in content_div.traverse(include_text=True)
+                   if node.tag == "-text")
+        text = "\n".join(s for s in strings if s)
+    return ParsedPage(text, [a.attributes["href"] for a in tree.css("a[href]") if a.attributes["href"] is not None])
+
+
+PARSERS = {"selectolax": _parse_selectolax, "lxml": _parse_lxml, "bs4": _parse_bs4}
+
+
+def available_backends():
+    found = []
+    for backend, module in (("selectolax", "selectolax.lexbor"), ("lxml", "lxml.html"), ("bs4", "bs4")):
+        try:
+            __import__(module)
+        except ImportError:
+            continue
+        found.append(backend)
+    return found
+
+
+# The fastest installed backend; set_backend() or the scrapers' --parser flag overrides it.
+BACKEND = (available_backends() or ["bs4"])[0]
+
+
+def set_backend(backend):
+    global BACKEND
+    if backend not in PARSERS:
+        raise ValueError(f"Unknown parser {backend!r}; expected one of {', '.join(BACKENDS)}")
+    if backend not in available_backends():
+        fallback = (available_backends() or ["bs4"])[0]
+        print(f"⚠️ Parser {backend} is not installed; using {fallback}.")
+        backend = fallback
+    BACKEND = backend
+
+
+def parse(html, backend=None, exclude=()):
+    """Region-content text and page links from one parse of `html`.
+
+    exclude: tag names whose subtrees are left out of the text (links are always page-wide).
+    """
+    return PARSERS[backend or BACKEND](html, exclude)
+
+
+def check_parity(html, backend, exclude=()):
+    """Differences between `backend` and the BeautifulSoup path for one page; an empty list when they agree."""
+    expected = _parse_bs4(html, exclude)
+    actual = parse(html, backend, exclude)
+    problems = []
+    if actual.text != expected.text:
+        if actual.text is None or expected.text is None:
+            problems.append(f"content div found by bs4: {expected.text is not None}, by {backend}: "
+                            f"{actual.text is not None}")
+        else:
+            expected_lines, actual_lines = expected.text.split("\n"), actual.text.split("\n")
+            first = next((i for i, (a, b) in enumerate(zip(expected_lines, actual_lines)) if a != b),
+                         min(len(expected_lines), len(actual_lines)))
+            problems.append(f"text differs at line {first}: bs4 {expected_lines[first:first + 1]!r}, "
+                            f"{backend} {actual_lines[first:first + 1]!r}")
+    if actual.links != expected.links:
+        missing = len(set(expected.links) - set(actual.links))
+        extra = len(set(actual.links) - set(expected.links))
+        problems.append(f"links differ: {len(expected.links)} vs {len(actual.links)} "
+                        f"({missing} missing, {extra} extra)")
+    return problems
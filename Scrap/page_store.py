@@ -0,0 +1,122 @@
+import hashlib
+import json
+import sqlite3
+import threading
+from collections import Counter
+from datetime import datetime
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class PageStore:
+    """Per-URL HTTP validators, content hash and links, used to re-crawl only pages that changed.
+
+    Links are kept so a 304 can still hand back the page's links; rows from
+    before they were stored get no conditional headers until they have them.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT,
+                chunk_count INTEGER,
+                checked_at TEXT,
+                changed_at TEXT,
+                links TEXT
+            )"""
+        )
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(pages)")]
+        if "links" not in columns:
+            self._conn.execute("ALTER TABLE pages ADD COLUMN links TEXT")
+        self._conn.commit()
+        self.outcomes = Counter()
+        self.changed_urls = []
+
+    def get(self, url):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, content_hash FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        return row
+
+    def urls(self):
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT url FROM pages")]
+
+    def links(self, url):
+        """The links recorded for url, or None if none were."""
+        with self._lock:
+            row = self._conn.execute("SELECT links FROM pages WHERE url = ?", (url,)).fetchone()
+        return json.loads(row[0]) if row and row[0] is not None else None
+
+    def conditional_headers(self, url):
+        row = self.get(url)
+        headers = {}
+        if row and self.links(url) is not None:
+            etag, last_modified, _ = row
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def mark_not_modified(self, url):
+        with self._lock:
+            self._conn.execute("UPDATE pages SET checked_at = ? WHERE url = ?", (_now(), url))
+            self._conn.commit()
+            self.outcomes["not_modified"] += 1
+
+    def mark_unchanged(self, url, etag, last_modified, links):
+        """Server sent the page again but the cleaned text hashes the same."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE pages SET etag = ?, last_modified = ?, checked_at = ?, links = ? WHERE url = ?",
+                (etag, last_modified, _now(), json.dumps(links), url),
+            )
+            self._conn.commit()
+            self.outcomes["unchanged"] += 1
+
+    def record(self, url, etag, last_modified, text_hash, chunk_count, links):
+        now = _now()
+        with self._lock:
+            existed = self._conn.execute("SELECT 1 FROM pages WHERE url = ?", (url,)).fetchone()
+            self._conn.execute(
+                """INSERT INTO pages (url, etag, last_modified, content_hash, chunk_count, checked_at, changed_at, links)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(url) DO UPDATE SET
+                       etag = excluded.etag,
+                       last_modified = excluded.last_modified,
+                       content_hash = excluded.content_hash,
+                       chunk_count = excluded.chunk_count,
+                       checked_at = excluded.checked_at,
+                       changed_at = excluded.changed_at,
+                       links = excluded.links""",
+                (url, etag, last_modified, text_hash, chunk_count, now, now, json.dumps(links)),
+            )
+            self._conn.commit()
+            self.outcomes["changed" if existed else "new"] += 1
+            self.changed_urls.append(url)
+
+    def pop_changed_urls(self):
+        with self._lock:
+            urls, self.changed_urls = self.changed_urls, []
+        return urls
+
+    def summary(self):
+        return ", ".join(f"{name}: {self.outcomes[name]}" for name in ("new", "changed", "unchanged", "not_modified"))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
@@ -0,0 +1,88 @@
+import queue
+import threading
+from concurrent.futures.process import BrokenProcessPool
+
+
+class ParsePipeline:
+    """Fetched pages -> prepare(page) on a process pool -> write(url, page, prepared) on one writer thread.
+
+    submit() blocks while max_pending pages are being parsed or waiting to be
+    written, so a fetch loop that outruns the parsers cannot pile up HTML in
+    memory. Pages are written in the order their parses finish; drain()
+    hands back (url, saved, hrefs) for each written page. Without a pool,
+    prepare runs on the writer thread, which still keeps it off the fetch loop.
+    If a pool worker dies, the pool is dropped and the pages it held are
+    prepared on the writer thread instead.
+    """
+
+    def __init__(self, prepare, write, pool=None, max_pending=16):
+        self.prepare = prepare
+        self.write = write
+        self.pool = pool
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._writes = queue.Queue()
+        self._done = queue.Queue()
+        # Submitted but not yet handed back by drain(); only the submitting thread touches it.
+        self.pending = 0
+        self.max_pending_seen = 0
+        self._writer = threading.Thread(target=self._run, name="page-writer", daemon=True)
+        self._writer.start()
+
+    def submit(self, url, page):
+        self._slots.acquire()
+        self.pending += 1
+        self.max_pending_seen = max(self.max_pending_seen, self.pending)
+        if self.pool is None:
+            self._writes.put((url, page, None))
+            return
+        try:
+            future = self.pool.submit(self.prepare, page)
+        except BrokenProcessPool:
+            print("⚠️ A parse worker died; preparing the remaining pages on the writer thread")
+            self.pool = None
+            self._writes.put((url, page, None))
+            return
+        future.add_done_callback(lambda done: self._writes.put((url, page, done)))
+
+    def _run(self):
+        while True:
+            item = self._writes.get()
+            if item is None:
+                return
+            url, page, future = item
+            saved, hrefs = False, []
+            try:
+                try:
+                    prepared = self.prepare(page) if future is None else future.result()
+                except BrokenProcessPool:
+                    prepared = self.prepare(page)
+                saved, hrefs = self.write(url, page, prepared)
+            except Exception as e:
+                print(f"❌ Error processing {url}: {e}")
+            self._done.put((url, saved, hrefs))
+            self._slots.release()
+
+    def drain(self, block=False):
+        """Results written since the last call; with block, waits for at least one if any page is pending."""
+        results = []
+        if block and self.pending:
+            results.append(self._done.get())
+        while True:
+            try:
+                results.append(self._done.get_nowait())
+            except queue.Empty:
+                self.pending -= len(results)
+                return results
+
+    def join(self):
+        """Wait for every submitted page; returns the results not drained yet."""
+        results = self.drain()
+        while self.pending:
+            results.extend(self.drain(block=True))
+        return results
+
+    def close(self):
+        results = self.join()
+        self._writes.put(None)
+        self._writer.join()
+        return results
@@ -0,0 +1,189 @@
+import atexit
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import boto3
+from botocore.config import Config
+
+UPLOAD_WORKERS = 8
+MAX_PENDING = 256
+PACK_PREFIX = "packed"
+
+
+class Boto3Backend:
+    """One boto3 client for the whole process; clients are thread-safe, sessions are not."""
+
+    def __init__(self, bucket, max_pool_connections=UPLOAD_WORKERS, client=None):
+        self.bucket = bucket
+        if client is None:
+            client = boto3.client("s3", config=Config(max_pool_connections=max_pool_connections))
+        self.client = client
+
+    def put(self, key, data):
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=data)
+
+    def __str__(self):
+        return f"s3://{self.bucket}"
+
+
+class FilesystemBackend:
+    """Writes objects under a local directory, laid out as <root>/<bucket>/<key>."""
+
+    def __init__(self, root, bucket):
+        self.root = os.path.join(root, bucket)
+
+    def put(self, key, data):
+        path = os.path.join(self.root, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+
+    def __str__(self):
+        return self.root
+
+
+class S3Uploader:
+    """Queues uploads onto a background thread pool.
+
+    With pack_bytes > 0, upload_text buffers small chunks and writes them as one
+    JSON-lines object ({"key": ..., "text": ...} per line) under pack_prefix once the
+    buffer reaches pack_bytes. Submissions block while MAX_PENDING uploads are queued.
+    """
+
+    def __init__(self, backend, workers=UPLOAD_WORKERS, pack_bytes=0, pack_prefix=PACK_PREFIX,
+                 max_pending=MAX_PENDING):
+        self.backend = backend
+        self.pack_bytes = pack_bytes
+        self.pack_prefix = pack_prefix.rstrip("/")
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="s3-upload")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._pack = []
+        self._pack_size = 0
+        self._pack_seq = 0
+        self._closed = False
+        self.started = time.perf_counter()
+        self.pending = 0
+        self.max_pending_seen = 0
+        self.objects = 0
+        self.chunks = 0
+        self.bytes = 0
+        self.failures = 0
+        atexit.register(self.close)
+
+    def upload_file(self, file_path, key):
+        """Snapshot the file now and upload it as its own object."""
+        with open(file_path, "rb") as f:
+            data = f.read()
+        self._submit(key, data, chunks=1, label=file_path)
+
+    def upload_text(self, key, text):
+        """Upload a chunk, packing it with others when pack_bytes is set."""
+        data = text.encode("utf-8")
+        if not self.pack_bytes:
+            self._submit(key, data, chunks=1, label=key)
+            return
+        line = json.dumps({"key": key, "text": text}, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._pack.append(line)
+            self._pack_size += len(line)
+            full = self._pack_size >= self.pack_bytes
+        if full:
+            self.flush_pack()
+
+    def flush_pack(self):
+        pack = self._take_pack()
+        if pack:
+            self._submit(*pack)
+
+    def _take_pack(self):
+        with self._lock:
+            if not self._pack:
+                return None
+            lines, self._pack, self._pack_size = self._pack, [], 0
+            self._pack_seq += 1
+            stamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+            key = f"{self.pack_prefix}/{stamp}_{os.getpid()}_{self._pack_seq:06d}.jsonl"
+        return key, "".join(lines).encode("utf-8"), len(lines), f"{len(lines)} chunks"
+
+    def _submit(self, key, data, chunks, label):
+        if self._closed:
+            # The pool takes no more work after close(); upload on the calling thread.
+            self._put(key, data, chunks, label)
+            return
+        self._slots.acquire()
+        with self._lock:
+            self.pending += 1
+            self.max_pending_seen = max(self.max_pending_seen, self.pending)
+        try:
+            self._pool.submit(self._queued_put, key, data, chunks, label)
+        except RuntimeError:
+            # close() shut the pool down after the check above; give the slot back.
+            with self._lock:
+                self.pending -= 1
+            self._slots.release()
+            self._put(key, data, chunks, label)
+
+    def _queued_put(self, key, data, chunks, label):
+        try:
+            self._put(key, data, chunks, label)
+        finally:
+            with self._lock:
+                self.pending -= 1
+            self._slots.release()
+
+    def _put(self, key, data, chunks, label):
+        try:
+            self.backend.put(key, data)
+            with self._lock:
+                self.objects += 1
+                self.chunks += chunks
+                self.bytes += len(data)
+            print(f"✅ Uploaded {label} to {self.backend} as '{key}'")
+        except Exception as e:
+            with self._lock:
+                self.failures += 1
+            print(f"❌ Failed to upload to S3: {e}")
+
+    def stats(self):
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        with self._lock:
+            return (f"{self.objects} objects ({self.chunks} chunks, {self.bytes / 1024:.0f} KiB), "
+                    f"{self.objects / elapsed:.1f} obj/s, {self.bytes / 1024 / elapsed:.0f} KiB/s, "
+                    f"queue depth {self.pending} (max {self.max_pending_seen}), {self.failures} failed")
+
+    def close(self):
+        """Wait for every queued upload, then write out the last partial pack."""
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
+        # At interpreter exit the pool no longer accepts work, so the final pack
+        # is uploaded on the calling thread.
+        self._pool.shutdown(wait=True)
+        pack = self._take_pack()
+        if pack:
+            self._put(*pack)
+
+
+_default = None
+
+
+def configure(bucket, workers=UPLOAD_WORKERS, pack_bytes=0, pack_prefix=PACK_PREFIX, local_dir=None):
+    """Set up the process-wide uploader; local_dir swaps S3 for a filesystem stand-in."""
+    global _default
+    if _default is not None:
+        _default.close()
+    backend = FilesystemBackend(local_dir, bucket) if local_dir else Boto3Backend(bucket, max_pool_connections=workers)
+    _default = S3Uploader(backend, workers=workers, pack_bytes=pack_bytes, pack_prefix=pack_prefix)
+    return _default
+
+
+def default_uploader(bucket):
+    if _default is None:
+        configure(bucket)
+    return _default
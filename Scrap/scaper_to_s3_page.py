@@ -1,16 +1,34 @@
-import requests
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
+import argparse
+import asyncio
 import time
 import os
-import boto3
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from functools import partial
 import re
 
+from async_crawler import AsyncCrawler
+from boilerplate import BoilerplateFilter, BoilerplateLearner, candidate_lines
+import fetcher
+from fetcher import fetch
+import html_parser
+from page_store import PageStore, content_hash
+from parse_pipeline import ParsePipeline
+import s3_uploader
+from s3_uploader import default_uploader
+from uscis_text.near_duplicates import CHUNKS_FILE, PAGES_FILE, NearDuplicateFilter, minhash
+from uscis_text.text_chunker import chunk_text
+
 AWS_BUCKET_NAME = "cs589-aiproject"
 BASE_URL = "https://www.uscis.gov"
 START_URL = "https://www.uscis.gov/policy-manual"
 BATCH_LIMIT = 1000
+# Processes parsing, cleaning and chunking fetched pages (0 does it on the writer thread; see --parse-workers)
+PARSE_WORKERS = 0
+# Fetched pages allowed to wait for a parser or the writer before fetching blocks
+MAX_PENDING_PAGES = 32
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (compatible; AI-Agent/1.0; +https://yourdomain.com)"
 }
@@ -18,44 +36,25 @@ HEADERS = {
 VISITED_DIR = "uscis_batches_visited"
 PAGES_DIR = "uscis_batches_pages"
 VISITED_FILE = os.path.join(VISITED_DIR, "visited_urls.txt")
+PAGE_STORE_FILE = os.path.join(VISITED_DIR, "page_store.sqlite3")
+BOILERPLATE_FILE = os.path.join(VISITED_DIR, "boilerplate_lines.json")
 
 os.makedirs(VISITED_DIR, exist_ok=True)
 os.makedirs(PAGES_DIR, exist_ok=True)
 
 
+boilerplate = BoilerplateFilter()
+
+
+def use_learned_boilerplate(lines):
+    """Start dropping `lines` (headers, footers and nav learned across the crawl) from cleaned pages."""
+    global boilerplate
+    boilerplate = BoilerplateFilter(learned=lines)
+
+
 def clean_text(text):
     """Remove headers/footers and boilerplate."""
-    lines = text.strip().splitlines()
-    filtered = []
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-        if re.search(r'uscis\.gov|last reviewed|last updated', line, re.IGNORECASE):
-            continue
-        if len(line) < 3:
-            continue
-        filtered.append(line)
-    return "\n".join(filtered)
-
-
-def chunk_text(text, max_length=800):
-    """Split long text into chunks under max_length, preserving line boundaries."""
-    chunks = []
-    current_chunk = []
-    current_len = 0
-
-    for line in text.splitlines():
-        if current_len + len(line) > max_length:
-            chunks.append("\n".join(current_chunk))
-            current_chunk = []
-            current_len = 0
-        current_chunk.append(line)
-        current_len += len(line)
-
-    if current_chunk:
-        chunks.append("\n".join(current_chunk))
-    return chunks
+    return boilerplate.clean(text)
 
 
 def slugify_url(url):
@@ -85,38 +84,230 @@ def is_valid_link(href):
     ])
 
 
-def extract_text_from_page(url):
+FetchedPage = namedtuple("FetchedPage", ["html", "status", "etag", "last_modified"])
+# What prepare_page hands the writer: MinHash signatures of the page and each chunk, and the
+# page's boilerplate candidate lines, next to its hash, chunks and links.
+PreparedPage = namedtuple("PreparedPage", ["text_hash", "chunks", "hrefs", "lines", "signature", "chunk_signatures"])
+
+
+def fetch_page(url, store=None):
+    """Fetch a page; with a store, send its validators so unchanged pages come back as 304."""
+    headers = {**HEADERS, **store.conditional_headers(url)} if store else HEADERS
     try:
-        response = requests.get(url, headers=HEADERS, timeout=10)
+        response = fetch(url, headers=headers, timeout=10)
         response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
-
-        content_div = soup.find("div", class_="region-content")
-        if content_div:
-            raw_text = content_div.get_text(separator="\n", strip=True)
-            return clean_text(raw_text), soup
+        html = None if response.status_code == 304 else response.text
+        return FetchedPage(html, response.status_code,
+                           response.headers.get("ETag"), response.headers.get("Last-Modified"))
     except Exception as e:
         print(f"❌ Error fetching {url}: {e}")
-    return None, None
+    return None
+
+
+def parse_page(html):
+    """(cleaned region-content text, page hrefs) from a single parse; (None, []) without the content div."""
+    page = html_parser.parse(html)
+    if page.text is not None:
+        return clean_text(page.text), page.links
+    return None, []
+
+
+def extract_text_from_page(url):
+    page = fetch_page(url)
+    if page is None:
+        return None, []
+    try:
+        return parse_page(page.html)
+    except Exception as e:
+        print(f"❌ Error parsing {url}: {e}")
+    return None, []
+
+
+def extract_links(hrefs):
+    return [href for href in hrefs if is_valid_link(href)]
 
 
 def upload_to_s3(file_path, s3_filename):
     try:
-        s3 = boto3.client("s3")
-        s3.upload_file(file_path, AWS_BUCKET_NAME, s3_filename)
-        print(f"✅ Uploaded {file_path} to S3 as '{s3_filename}'")
+        default_uploader(AWS_BUCKET_NAME).upload_file(file_path, s3_filename)
     except Exception as e:
         print(f"❌ Failed to upload to S3: {e}")
 
 
+def upload_chunk_to_s3(chunk, s3_filename):
+    default_uploader(AWS_BUCKET_NAME).upload_text(s3_filename, chunk)
+
+
 def get_timestamp():
     return datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
 
 
-def run_continuous_scraper():
-    visited_links = load_visited_links()
-    processed_links = set(visited_links)
-    unprocessed_links = set([START_URL])
+def save_page_chunks(full_url, chunks, timestamp):
+    """Write and upload each chunk under the page's slug, starting with a "---\\n<url>\\n" header.
+
+    The slug cannot be turned back into the URL, so the indexers read it from the header.
+    """
+    slug = slugify_url(full_url)
+    for i, chunk in enumerate(chunks):
+        file_name = f"{timestamp}_{slug}_chunk{i+1}.txt"
+        file_path = os.path.join(PAGES_DIR, file_name)
+        body = f"---\n{full_url}\n{chunk}"
+        with open(file_path, "w", encoding="utf-8") as f:
+            f.write(body)
+        upload_chunk_to_s3(body, f"uscis_batches_pages/{file_name}")
+    return len(chunks)
+
+
+def prepare_page(page):
+    """The CPU-bound part of processing: parse, clean, hash and chunk a fetched page.
+
+    Returns a PreparedPage, with text_hash None when there is no content, or
+    None for a 304. Runs in the parse worker processes.
+    """
+    if page.status == 304:
+        return None
+    text, links = parse_page(page.html)
+    hrefs = extract_links(links)
+    if not text:
+        return PreparedPage(None, [], hrefs, (), None, [])
+    chunks = chunk_text(text)
+    return PreparedPage(content_hash(text), chunks, hrefs, candidate_lines(text), minhash(text),
+                        [minhash(chunk) for chunk in chunks])
+
+
+def write_page(full_url, page, prepared, timestamp, store, refresh=False, learner=None, duplicates=None):
+    """Record and upload a page prepared by prepare_page. Returns (saved, hrefs).
+
+    In refresh mode a 304, or a page whose cleaned text hashes the same as last
+    time, counts as saved without being re-chunked or re-uploaded; a 304 hands
+    back the links stored with the page.
+    With a NearDuplicateFilter, a page that near-duplicates another URL's page
+    is recorded with no chunks, and chunks that near-duplicate another page's
+    are not uploaded; the page's links are followed either way. A refreshed
+    page that has become a near-duplicate keeps its old record, matching the
+    chunks already uploaded for it, and is compared again on the next refresh.
+    """
+    if page.status == 304:
+        store.mark_not_modified(full_url)
+        return True, store.links(full_url) or []
+
+    if prepared.text_hash is None:
+        return False, prepared.hrefs
+    if learner is not None:
+        learner.observe(prepared.lines)
+
+    known = store.get(full_url) if refresh else None
+    if known:
+        if known[2] == prepared.text_hash:
+            store.mark_unchanged(full_url, page.etag, page.last_modified, prepared.hrefs)
+            return True, prepared.hrefs
+
+    chunks = prepared.chunks
+    if duplicates is not None:
+        original = duplicates.original_page(full_url, prepared.signature)
+        if original is not None:
+            if known:
+                print(f"👯 Changed page is now a near-duplicate of {original}; keeping {full_url} as uploaded")
+                return True, prepared.hrefs
+            print(f"👯 Near-duplicate of {original}; not uploading {full_url}")
+            store.record(full_url, page.etag, page.last_modified, prepared.text_hash, 0, prepared.hrefs)
+            save_visited_link(full_url)
+            return True, prepared.hrefs
+        kept = duplicates.unique_chunks(full_url, chunks, prepared.chunk_signatures)
+        chunks = [chunk for chunk, _ in kept]
+        duplicates.add_page(full_url, prepared.signature, [signature for _, signature in kept])
+
+    chunk_count = save_page_chunks(full_url, chunks, timestamp)
+    store.record(full_url, page.etag, page.last_modified, prepared.text_hash, chunk_count, prepared.hrefs)
+    save_visited_link(full_url)
+    return True, prepared.hrefs
+
+
+def process_page(full_url, page, timestamp, store, refresh=False, learner=None, duplicates=None):
+    """Prepare and write a fetched page inline. Returns (saved, hrefs)."""
+    return write_page(full_url, page, prepare_page(page), timestamp, store, refresh, learner, duplicates)
+
+
+def init_parse_worker(backend, learned):
+    html_parser.set_backend(backend)
+    use_learned_boilerplate(learned)
+
+
+def make_parse_pool(workers=PARSE_WORKERS):
+    """Worker processes for prepare_page, using the parser backend and boilerplate lines of this process.
+
+    Workers copy the learned lines when they start, so a pool is made per batch.
+    """
+    if workers <= 0:
+        return None
+    return ProcessPoolExecutor(max_workers=workers, initializer=init_parse_worker,
+                               initargs=(html_parser.BACKEND, sorted(boilerplate.learned)))
+
+
+def load_boilerplate_learner(learning=True):
+    """The learner saved by earlier crawls (None with learning off); its learned lines are used either way."""
+    learner = BoilerplateLearner.load(BOILERPLATE_FILE)
+    use_learned_boilerplate(learner.learned)
+    if learner.learned:
+        print(f"🧹 Dropping {len(learner.learned)} learned boilerplate lines")
+    return learner if learning else None
+
+
+def learn_boilerplate(learner):
+    """Promote lines repeated across enough pages to boilerplate for the next batch."""
+    if learner is None:
+        return
+    new = learner.learn()
+    use_learned_boilerplate(learner.learned)
+    learner.save(BOILERPLATE_FILE)
+    upload_to_s3(BOILERPLATE_FILE, "uscis_batches_visited/boilerplate_lines.json")
+    print(f"🧹 Boilerplate: {len(learner.learned)} learned lines (+{new}) from {learner.pages} pages")
+
+
+def load_near_duplicates(enabled=True):
+    if not enabled:
+        return None
+    duplicates = NearDuplicateFilter.load(VISITED_DIR)
+    print(f"👯 {len(duplicates.pages)} pages and {len(duplicates.chunks)} chunks in the near-duplicate index")
+    return duplicates
+
+
+def save_near_duplicates(duplicates):
+    if duplicates is None:
+        return
+    print(f"👯 Near-duplicates: {duplicates.summary()}")
+    duplicates.save(VISITED_DIR)
+    for name in (PAGES_FILE, CHUNKS_FILE):
+        upload_to_s3(os.path.join(VISITED_DIR, name), f"uscis_batches_visited/{name}")
+
+
+def initial_frontier(store, refresh):
+    """Returns (processed_links, unprocessed_links) for the first batch."""
+    if refresh:
+        return set(), set([START_URL]) | set(store.urls())
+    return set(load_visited_links()), set([START_URL])
+
+
+def finish_batch(store, refresh, timestamp):
+    uploader = default_uploader(AWS_BUCKET_NAME)
+    uploader.flush_pack()
+    print(f"☁️ Upload stats: {uploader.stats()}")
+    upload_to_s3(VISITED_FILE, f"uscis_batches_visited/visited_urls_{timestamp}.txt")
+    upload_to_s3(PAGE_STORE_FILE, "uscis_batches_visited/page_store.sqlite3")
+    if refresh:
+        print(f"♻️ Refresh: {store.summary()}")
+        changed_file = os.path.join(VISITED_DIR, f"changed_urls_{timestamp}.txt")
+        with open(changed_file, "w", encoding="utf-8") as f:
+            f.writelines(url + "\n" for url in store.pop_changed_urls())
+        upload_to_s3(changed_file, f"uscis_batches_visited/changed_urls_{timestamp}.txt")
+
+
+def run_continuous_scraper(refresh=False, parse_workers=PARSE_WORKERS, learn=True, dedup=True):
+    """Fetch pages one at a time while a process pool parses and chunks them and one thread writes them."""
+    store = PageStore(PAGE_STORE_FILE)
+    processed_links, unprocessed_links = initial_frontier(store, refresh)
+    learner = load_boilerplate_learner(learn)
+    duplicates = load_near_duplicates(dedup)
     batch_number = 1
 
     while True:
@@ -125,53 +316,119 @@ def run_continuous_scraper():
         internal_links_found = 0
         batch_start_time = time.time()
         timestamp = get_timestamp()
+        in_flight = set()
+        parse_pool = make_parse_pool(parse_workers)
+        pipeline = ParsePipeline(prepare_page,
+                                 partial(write_page, timestamp=timestamp, store=store, refresh=refresh,
+                                         learner=learner, duplicates=duplicates),
+                                 parse_pool, MAX_PENDING_PAGES)
+
+        def apply(results):
+            nonlocal new_links_scraped, internal_links_found
+            for full_url, saved, hrefs in results:
+                in_flight.discard(full_url)
+                if saved:
+                    processed_links.add(full_url)
+                    new_links_scraped += 1
+                for href in hrefs:
+                    full_href = urljoin(BASE_URL, href)
+                    if full_href not in processed_links:
+                        unprocessed_links.add(href)
+                        internal_links_found += 1
 
         print(f"\n🚀 Starting Batch #{batch_number} - {timestamp}")
 
-        while unprocessed_links and new_links_scraped < BATCH_LIMIT:
+        while new_links_scraped < BATCH_LIMIT:
+            apply(pipeline.drain())
+            if not unprocessed_links or new_links_scraped + pipeline.pending >= BATCH_LIMIT:
+                # Wait for pages still being parsed; they may add links or fill the batch.
+                if not pipeline.pending:
+                    break
+                apply(pipeline.drain(block=True))
+                continue
+
             current_url = unprocessed_links.pop()
             full_url = urljoin(BASE_URL, current_url)
 
-            if full_url in processed_links:
+            if full_url in processed_links or full_url in in_flight:
                 continue
 
             print(f"🔎 Scraping [{page_counter}]: {full_url}")
-            text, soup = extract_text_from_page(full_url)
-
-            if text:
-                slug = slugify_url(full_url)
-                chunks = chunk_text(text)
-
-                for i, chunk in enumerate(chunks):
-                    file_name = f"{timestamp}_{slug}_chunk{i+1}.txt"
-                    file_path = os.path.join(PAGES_DIR, file_name)
-                    with open(file_path, "w", encoding="utf-8") as f:
-                        f.write(chunk)
-                    upload_to_s3(file_path, f"uscis_batches_pages/{file_name}")
-
-                save_visited_link(full_url)
-                processed_links.add(full_url)
-                new_links_scraped += 1
-                page_counter += 1
-
-            if soup:
-                for a_tag in soup.find_all("a", href=True):
-                    href = a_tag["href"]
-                    if is_valid_link(href):
-                        full_href = urljoin(BASE_URL, href)
-                        if full_href not in processed_links:
-                            unprocessed_links.add(href)
-                            internal_links_found += 1
+            page_counter += 1
+            page = fetch_page(full_url, store if refresh else None)
+            if page is not None:
+                in_flight.add(full_url)
+                pipeline.submit(full_url, page)
 
             time.sleep(0.5)
 
+        apply(pipeline.close())
+        if parse_pool is not None:
+            parse_pool.shutdown()
+        duration = round(time.time() - batch_start_time, 2)
+        print(f"\n✅ Finished Batch #{batch_number}")
+        print(f"📄 Pages scraped: {new_links_scraped}")
+        print(f"🔗 New links found: {internal_links_found}")
+        print(f"⏱️ Duration: {duration} seconds")
+        print(f"🌐 Fetch stats: {fetcher.stats.summary()}")
+
+        finish_batch(store, refresh, timestamp)
+        learn_boilerplate(learner)
+        save_near_duplicates(duplicates)
+
+        if new_links_scraped == 0:
+            print("🎉 All available links scraped.")
+            break
+
+        batch_number += 1
+        print("🔄 Starting next batch...\n")
+
+    store.close()
+
+
+def run_async_scraper(concurrency=8, max_per_host=4, host_delay=0.1, refresh=False, parse_workers=PARSE_WORKERS,
+                      learn=True, dedup=True):
+    """Same batches, frontier and dedup as run_continuous_scraper, with concurrent fetches."""
+    store = PageStore(PAGE_STORE_FILE)
+    processed_links, unprocessed_links = initial_frontier(store, refresh)
+    learner = load_boilerplate_learner(learn)
+    duplicates = load_near_duplicates(dedup)
+    batch_number = 1
+
+    while True:
+        batch_start_time = time.time()
+        timestamp = get_timestamp()
+
+        print(f"\n🚀 Starting Batch #{batch_number} - {timestamp} (concurrency={concurrency})")
+        parse_pool = make_parse_pool(parse_workers)
+        crawler = AsyncCrawler(
+            partial(fetch_page, store=store if refresh else None),
+            partial(write_page, timestamp=timestamp, store=store, refresh=refresh, learner=learner,
+                    duplicates=duplicates),
+            BASE_URL,
+            concurrency=concurrency,
+            max_per_host=max_per_host,
+            host_delay=host_delay,
+            prepare=prepare_page,
+            parse_pool=parse_pool,
+            parse_workers=max(1, parse_workers),
+        )
+        new_links_scraped, internal_links_found = asyncio.run(
+            crawler.crawl_batch(unprocessed_links, processed_links, BATCH_LIMIT)
+        )
+        if parse_pool is not None:
+            parse_pool.shutdown()
+
         duration = round(time.time() - batch_start_time, 2)
         print(f"\n✅ Finished Batch #{batch_number}")
         print(f"📄 Pages scraped: {new_links_scraped}")
         print(f"🔗 New links found: {internal_links_found}")
         print(f"⏱️ Duration: {duration} seconds")
+        print(f"🌐 Fetch stats: {fetcher.stats.summary()}")
 
-        upload_to_s3(VISITED_FILE, f"uscis_batches_visited/visited_urls_{timestamp}.txt")
+        finish_batch(store, refresh, timestamp)
+        learn_boilerplate(learner)
+        save_near_duplicates(duplicates)
 
         if new_links_scraped == 0:
             print("🎉 All available links scraped.")
@@ -180,6 +437,42 @@ def run_continuous_scraper():
         batch_number += 1
         print("🔄 Starting next batch...\n")
 
+    store.close()
+
 
 if __name__ == "__main__":
-    run_continuous_scraper()
+    parser = argparse.ArgumentParser(description="Scrape the USCIS policy manual into S3 chunks.")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="fetch pages concurrently")
+    parser.add_argument("--concurrency", type=int, default=8, help="number of fetch workers in async mode")
+    parser.add_argument("--max-per-host", type=int, default=4, help="concurrent requests per host in async mode")
+    parser.add_argument("--host-delay", type=float, default=0.1, help="seconds between request starts per host")
+    parser.add_argument("--refresh", action="store_true",
+                        help="re-check every known page with conditional requests and upload only changed ones")
+    parser.add_argument("--upload-workers", type=int, default=s3_uploader.UPLOAD_WORKERS,
+                        help="background threads uploading to S3")
+    parser.add_argument("--pack-bytes", type=int, default=0,
+                        help="pack chunks into JSON-lines objects of about this many bytes (0 uploads each chunk)")
+    parser.add_argument("--local-s3-dir", help="write objects under this directory instead of S3")
+    parser.add_argument("--parse-workers", type=int, default=PARSE_WORKERS,
+                        help="processes parsing and chunking pages (default 0 parses on the writer thread; "
+                             "use about the core count when parsing cannot keep up with fetching)")
+    parser.add_argument("--parser", choices=html_parser.BACKENDS, default=html_parser.BACKEND,
+                        help="HTML parser backend (default: fastest installed)")
+    parser.add_argument("--no-boilerplate-learning", dest="learn_boilerplate", action="store_false",
+                        help="keep dropping previously learned boilerplate lines but learn no new ones")
+    parser.add_argument("--keep-near-duplicates", dest="dedup", action="store_false",
+                        help="upload pages and chunks even when they near-duplicate ones already uploaded")
+    args = parser.parse_args()
+
+    html_parser.set_backend(args.parser)
+
+    s3_uploader.configure(AWS_BUCKET_NAME, workers=args.upload_workers, pack_bytes=args.pack_bytes,
+                          pack_prefix="uscis_batches_pages/packed", local_dir=args.local_s3_dir)
+
+    if args.use_async:
+        run_async_scraper(args.concurrency, args.max_per_host, args.host_delay, refresh=args.refresh,
+                          parse_workers=args.parse_workers, learn=args.learn_boilerplate, dedup=args.dedup)
+    else:
+        run_continuous_scraper(refresh=args.refresh, parse_workers=args.parse_workers,
+                               learn=args.learn_boilerplate, dedup=args.dedup)
+    default_uploader(AWS_BUCKET_NAME).close()
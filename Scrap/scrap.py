@@ -1,12 +1,14 @@
-import requests
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 import time
 import os
-import boto3
 from datetime import datetime
 import re
 
+import fetcher
+from fetcher import fetch
+import html_parser
+from s3_uploader import default_uploader
+
 AWS_BUCKET_NAME = "cs589-aiproject"
 BASE_URL = "https://www.uscis.gov"
 START_URL = "https://www.uscis.gov/policy-manual"
@@ -42,20 +44,14 @@ def is_valid_link(href):
         "javascript:" in href
     ])
 
-def extract_clean_text(soup):
-    content_div = soup.find("div", class_="region-content")
-    if content_div:
-        # Remove common headers/footers
-        for tag in content_div.find_all(["header", "footer", "nav", "aside"]):
-            tag.decompose()
-        return content_div.get_text(separator="\n", strip=True)
-    return ""
+def parse_clean_page(html):
+    # Remove common headers/footers from the content text
+    page = html_parser.parse(html, exclude=("header", "footer", "nav", "aside"))
+    return page.text or "", page.links
 
 def upload_to_s3(local_file, s3_key):
     try:
-        s3 = boto3.client("s3")
-        s3.upload_file(local_file, AWS_BUCKET_NAME, s3_key)
-        print(f"✅ Uploaded to S3: {s3_key}")
+        default_uploader(AWS_BUCKET_NAME).upload_file(local_file, s3_key)
     except Exception as e:
         print(f"❌ Upload error: {e}")
 
@@ -73,10 +69,9 @@ def run_scraper():
 
         try:
             print(f"🔎 Scraping: {full_url}")
-            res = requests.get(full_url, headers=HEADERS, timeout=10)
+            res = fetch(full_url, headers=HEADERS, timeout=10)
             res.raise_for_status()
-            soup = BeautifulSoup(res.text, "html.parser")
-            text = extract_clean_text(soup)
+            text, links = parse_clean_page(res.text)
 
             if text and len(text) > 100:
                 filename = sanitize_filename(full_url)
@@ -88,8 +83,7 @@ def run_scraper():
                 save_visited_link(full_url)
                 scraped_count += 1
 
-                for a in soup.find_all("a", href=True):
-                    href = a["href"]
+                for href in links:
                     if is_valid_link(href):
                         queue.add(href)
 
@@ -99,6 +93,8 @@ def run_scraper():
             print(f"❌ Failed: {e}")
 
     print(f"\n🎉 Scraped {scraped_count} new pages.")
+    print(f"🌐 Fetch stats: {fetcher.stats.summary()}")
 
 if __name__ == "__main__":
     run_scraper()
+    default_uploader(AWS_BUCKET_NAME).close()
@@ -1,12 +1,15 @@
 
-import requests
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 import time
 import os
-import boto3
 from datetime import datetime
 
+import fetcher
+from fetcher import fetch
+import html_parser
+from s3_uploader import default_uploader
+from uscis_text.text_chunker import chunk_text
+
 AWS_BUCKET_NAME = "cs589-aiproject"
 BASE_URL = "https://www.uscis.gov"
 START_URL = "https://www.uscis.gov/policy-manual"
@@ -43,23 +46,18 @@ def is_valid_link(href):
 
 def extract_text_from_page(url):
     try:
-        response = requests.get(url, headers=HEADERS, timeout=10)
+        response = fetch(url, headers=HEADERS, timeout=10)
         response.raise_for_status()
-        soup = BeautifulSoup(response.text, "html.parser")
-
-        content_div = soup.find("div", class_="region-content")
-        if content_div:
-            text = content_div.get_text(separator="\n", strip=True)
-            return text, soup
+        page = html_parser.parse(response.text)
+        if page.text is not None:
+            return page.text, page.links
     except Exception as e:
         print(f"❌ Error fetching {url}: {e}")
     return None, None
 
 def upload_to_s3(file_path, s3_filename):
     try:
-        s3 = boto3.client("s3")
-        s3.upload_file(file_path, AWS_BUCKET_NAME, s3_filename)
-        print(f"✅ Uploaded {file_path} to S3 bucket '{AWS_BUCKET_NAME}' as '{s3_filename}'")
+        default_uploader(AWS_BUCKET_NAME).upload_file(file_path, s3_filename)
     except Exception as e:
         print(f"❌ Failed to upload to S3: {e}")
 
@@ -70,10 +68,8 @@ def sanitize_filename(url):
     return url.replace("https://", "").replace("http://", "").replace("/", "_").replace("?", "_").replace("&", "_")
 
 def save_text_chunks(text, base_filename, url):
-    chunk_size = 1000
-    for i in range(0, len(text), chunk_size):
-        chunk = text[i:i+chunk_size]
-        chunk_filename = f"{base_filename}_chunk_{i//chunk_size + 1}.txt"
+    for i, chunk in enumerate(chunk_text(text), 1):
+        chunk_filename = f"{base_filename}_chunk_{i}.txt"
         chunk_path = os.path.join(PAGES_DIR, chunk_filename)
         with open(chunk_path, "w", encoding="utf-8") as f:
             f.write(f"---\n{url}\n{chunk}\n")
@@ -100,7 +96,7 @@ def run_continuous_scraper():
                 continue
 
             print(f"🔎 Scraping [{page_counter}]: {full_url}")
-            text, soup = extract_text_from_page(full_url)
+            text, links = extract_text_from_page(full_url)
 
             if text:
                 file_base = sanitize_filename(full_url)
@@ -110,9 +106,8 @@ def run_continuous_scraper():
                 save_visited_link(full_url)
                 processed_links.add(full_url)
 
-            if soup:
-                for a_tag in soup.find_all("a", href=True):
-                    href = a_tag["href"]
+            if links:
+                for href in links:
                     if is_valid_link(href):
                         full_href = urljoin(BASE_URL, href)
                         if full_href not in processed_links:
@@ -126,6 +121,8 @@ def run_continuous_scraper():
         print(f"📄 Pages scraped: {new_links_scraped}")
         print(f"🔗 New internal links discovered: {internal_links_found}")
         print(f"⏱️ Time taken: {batch_duration} seconds")
+        print(f"🌐 Fetch stats: {fetcher.stats.summary()}")
+        print(f"☁️ Upload stats: {default_uploader(AWS_BUCKET_NAME).stats()}")
 
         if new_links_scraped == 0:
             print("🎉 All available USCIS links have been scraped. Exiting loop.")
@@ -136,3 +133,4 @@ def run_continuous_scraper():
 
 if __name__ == "__main__":
     run_continuous_scraper()
+    default_uploader(AWS_BUCKET_NAME).close()
@@ -0,0 +1,6 @@
+"""Page text handling shared by the scrapers (Scrap/) and the index builders (ModelTrainQuery/).
+
+text_chunker splits pages into embedder-sized chunks; near_duplicates finds
+pages and chunks that near-duplicate each other. Both trees chunk and dedup
+with the same code, so install this package next to either: pip install -e .
+"""
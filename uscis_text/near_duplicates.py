@@ -0,0 +1,213 @@
+import hashlib
+import os
+import re
+from collections import Counter
+
+import numpy as np
+
+SHINGLE_SIZE = 5
+# MinHash signatures of BANDS * ROWS values. Two texts share a band with probability
+# 1 - (1 - J**ROWS)**BANDS for shingle Jaccard similarity J (0.99 at J = 0.8); candidates
+# are then kept if their estimated Jaccard is at least DUPLICATE_JACCARD.
+BANDS = 12
+ROWS = 5
+DUPLICATE_JACCARD = 0.8
+PAGES_FILE = "near_duplicate_pages.npz"
+CHUNKS_FILE = "near_duplicate_chunks.npz"
+
+WORD_RE = re.compile(r"\w+")
+
+# Odd 64-bit multipliers mixing each word of a shingle in, and the murmur3 finalizer constant.
+SHINGLE_MULTIPLIERS = np.array([0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93,
+                                0x27D4EB2F165667C5, 0x94D049BB133111EB, 0xBF58476D1CE4E5B9, 0x85EBCA77C2B2AE63],
+                               dtype=np.uint64)
+FINALIZER = np.uint64(0xFF51AFD7ED558CCD)
+# Fixed permutations (h * a + b, top 32 bits), so signatures from any process and run compare.
+_permutations = np.random.default_rng(589).integers(1, 2 ** 63, size=(2, BANDS * ROWS), dtype=np.uint64)
+PERMUTATION_A = _permutations[0] | np.uint64(1)
+PERMUTATION_B = _permutations[1]
+
+
+def shingle_hashes(text, size=SHINGLE_SIZE):
+    """64-bit hashes of the text's word shingles, as a uint64 array.
+
+    Each distinct word is hashed once; shingle hashes are mixed from the
+    word hashes with numpy instead of hashing every shingle string.
+    """
+    if size > len(SHINGLE_MULTIPLIERS):
+        raise ValueError(f"shingles of more than {len(SHINGLE_MULTIPLIERS)} words are not supported")
+    vocabulary = {}
+    words = np.fromiter((vocabulary.setdefault(word, len(vocabulary)) for word in WORD_RE.findall(text.lower())),
+                        dtype=np.int64)
+    word_hashes = np.frombuffer(b"".join(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+                                         for word in vocabulary), dtype=np.uint64)
+    hashes = word_hashes[words] if len(words) else np.zeros(1, dtype=np.uint64)
+    count = max(1, len(hashes) - size + 1)
+    shingles = np.zeros(count, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for i in range(min(size, len(hashes))):
+            shingles = (shingles ^ hashes[i:i + count]) * SHINGLE_MULTIPLIERS[i]
+        shingles ^= shingles >> np.uint64(33)
+        shingles *= FINALIZER
+        shingles ^= shingles >> np.uint64(33)
+    return np.unique(shingles)
+
+
+def minhash(text, size=SHINGLE_SIZE):
+    """MinHash signature of the text's word shingles: BANDS * ROWS uint32 minimums."""
+    hashes = shingle_hashes(text, size)
+    with np.errstate(over="ignore"):
+        permuted = (hashes[:, None] * PERMUTATION_A + PERMUTATION_B) >> np.uint64(32)
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def estimated_jaccard(a, b):
+    return float(np.count_nonzero(a == b)) / len(a)
+
+
+class MinHashIndex:
+    """Banded LSH over MinHash signatures.
+
+    Each entry has a key and the source (page) it came from. find() only
+    compares against entries sharing a band with the signature, and can skip
+    one source, so a page is never a duplicate of its own older copy.
+    """
+
+    def __init__(self, threshold=DUPLICATE_JACCARD, bands=BANDS, rows=ROWS):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = rows
+        self.entries = {}
+        self.by_source = {}
+        self.buckets = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _band_keys(self, signature):
+        if len(signature) != self.bands * self.rows:
+            raise ValueError(f"signature has {len(signature)} values, expected {self.bands * self.rows}")
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+
+    def find(self, signature, skip_source=None):
+        """The key of the most similar entry with estimated Jaccard >= threshold, or None."""
+        best, best_similarity = None, self.threshold
+        seen = set()
+        for band_key in self._band_keys(signature):
+            for key in self.buckets.get(band_key, ()):
+                if key in seen:
+                    continue
+                seen.add(key)
+                source, other = self.entries[key]
+                if source == skip_source:
+                    continue
+                similarity = estimated_jaccard(signature, other)
+                if similarity >= best_similarity:
+                    best, best_similarity = key, similarity
+        return best
+
+    def matches(self, signature, skip_source=None):
+        """Keys of every entry with estimated Jaccard >= threshold, other than skip_source's."""
+        found = []
+        seen = set()
+        for band_key in self._band_keys(signature):
+            for key in self.buckets.get(band_key, ()):
+                if key in seen:
+                    continue
+                seen.add(key)
+                source, other = self.entries[key]
+                if source != skip_source and estimated_jaccard(signature, other) >= self.threshold:
+                    found.append(key)
+        return found
+
+    def add(self, key, signature, source=None):
+        self.remove(key)
+        source = key if source is None else source
+        self.entries[key] = (source, signature)
+        self.by_source.setdefault(source, set()).add(key)
+        for band_key in self._band_keys(signature):
+            self.buckets.setdefault(band_key, set()).add(key)
+
+    def remove(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        source, signature = entry
+        self.by_source[source].discard(key)
+        if not self.by_source[source]:
+            del self.by_source[source]
+        for band_key in self._band_keys(signature):
+            self.buckets[band_key].discard(key)
+            if not self.buckets[band_key]:
+                del self.buckets[band_key]
+
+    def discard_source(self, source):
+        for key in list(self.by_source.get(source, ())):
+            self.remove(key)
+
+    def save(self, path):
+        keys = list(self.entries)
+        signatures = np.asarray([self.entries[key][1] for key in keys], dtype=np.uint32)
+        with open(f"{path}.tmp", "wb") as f:
+            np.savez(f, keys=np.asarray(keys, dtype=str),
+                     sources=np.asarray([self.entries[key][0] for key in keys], dtype=str),
+                     signatures=signatures.reshape(len(keys), self.bands * self.rows))
+        os.replace(f"{path}.tmp", path)
+
+    @classmethod
+    def load(cls, path, threshold=DUPLICATE_JACCARD, bands=BANDS, rows=ROWS):
+        index = cls(threshold, bands, rows)
+        if os.path.exists(path):
+            with np.load(path) as arrays:
+                for key, source, signature in zip(arrays["keys"].tolist(), arrays["sources"].tolist(),
+                                                  arrays["signatures"]):
+                    index.add(key, signature, source)
+        return index
+
+
+class NearDuplicateFilter:
+    """Page- and chunk-level near-duplicate checks for the scrapers, keyed by URL.
+
+    A page close to a page already kept under another URL (print views,
+    query-string variants, the same chapter reached by another path) is not
+    written at all; of the pages that are, chunks close to another page's
+    chunks are dropped. add_page() replaces a URL's signatures when it is
+    written again.
+    """
+
+    def __init__(self, pages=None, chunks=None):
+        self.pages = pages if pages is not None else MinHashIndex()
+        self.chunks = chunks if chunks is not None else MinHashIndex()
+        self.stats = Counter()
+
+    def original_page(self, url, signature):
+        original = self.pages.find(signature, skip_source=url)
+        if original is not None:
+            self.stats["pages"] += 1
+        return original
+
+    def unique_chunks(self, url, chunks, signatures):
+        """[(chunk, signature)] for the chunks not already kept from another page."""
+        kept = [(chunk, signature) for chunk, signature in zip(chunks, signatures)
+                if self.chunks.find(signature, skip_source=url) is None]
+        self.stats["chunks"] += len(chunks) - len(kept)
+        return kept
+
+    def add_page(self, url, signature, chunk_signatures):
+        self.pages.add(url, signature)
+        self.chunks.discard_source(url)
+        for i, chunk_signature in enumerate(chunk_signatures, 1):
+            self.chunks.add(f"{url}#{i}", chunk_signature, url)
+
+    def summary(self):
+        return (f"{self.stats['pages']} near-duplicate pages and {self.stats['chunks']} chunks skipped; "
+                f"{len(self.pages)} pages and {len(self.chunks)} chunks indexed")
+
+    def save(self, directory):
+        self.pages.save(os.path.join(directory, PAGES_FILE))
+        self.chunks.save(os.path.join(directory, CHUNKS_FILE))
+
+    @classmethod
+    def load(cls, directory):
+        return cls(MinHashIndex.load(os.path.join(directory, PAGES_FILE)),
+                   MinHashIndex.load(os.path.join(directory, CHUNKS_FILE)))
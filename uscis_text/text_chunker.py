@@ -0,0 +1,128 @@
+import re
+from collections import deque
+
+# The embedder's tokenizer; chunks are sized for its 256-token window minus [CLS] and [SEP].
+TOKENIZER_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+MAX_TOKENS = 254
+OVERLAP_TOKENS = 32
+# A heading starts a new chunk once the current one is at least this full.
+HEADING_FILL = 0.5
+HEADING_MAX_CHARS = 100
+# Segments are tokenized this many at a time.
+COUNT_BATCH = 64
+
+# A sentence runs to the end of its line or to ".", "!" or "?" after a lowercase letter, digit or
+# closing bracket and before a capitalised word, so "U.S." and "A." do not end one.
+SENTENCE_RE = re.compile(r"\S.*?(?:(?<=[a-z0-9)\]\"'][.!?])(?=\s+[A-Z0-9\"'(\[])|$)", re.MULTILINE)
+WORD_RE = re.compile(r"\S+")
+SENTENCE_END_CHARS = ".!?:;,"
+
+
+def estimate_tokens(texts):
+    """About 4 characters per token, rounded up, for when the tokenizer is not installed."""
+    return [len(text) // 4 + 1 for text in texts]
+
+
+def tokenizer_counter(tokenizer):
+    """Token counts for a list of texts from a Hugging Face tokenizer, without special tokens."""
+    def count(texts):
+        return [len(ids) for ids in tokenizer(texts, add_special_tokens=False, verbose=False)["input_ids"]]
+    return count
+
+
+def load_tokenizer(model_name=TOKENIZER_MODEL):
+    try:
+        from transformers import AutoTokenizer
+        return AutoTokenizer.from_pretrained(model_name)
+    except (ImportError, OSError) as e:
+        print(f"⚠️ Could not load the {model_name} tokenizer ({e}); estimating tokens from length.")
+        return None
+
+
+class TextChunker:
+    """Splits text into chunks of at most max_tokens, on sentence and heading boundaries.
+
+    Sentences are matched lazily over the text and tokenized a batch at a
+    time; chunks are slices of the original text, so a page is never copied
+    whole. Consecutive chunks share up to overlap_tokens of whole sentences,
+    except across a heading, which starts a new chunk when the current one is
+    heading_fill full and is never left at the end of a chunk. A sentence
+    longer than max_tokens is split between words.
+    split_text() makes it a drop-in for the langchain splitters.
+    """
+
+    def __init__(self, token_counts=estimate_tokens, max_tokens=MAX_TOKENS, overlap_tokens=OVERLAP_TOKENS,
+                 heading_fill=HEADING_FILL):
+        if overlap_tokens >= max_tokens:
+            raise ValueError(f"overlap_tokens ({overlap_tokens}) must be smaller than max_tokens ({max_tokens})")
+        self.token_counts = token_counts
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.heading_tokens = heading_fill * max_tokens
+
+    @staticmethod
+    def _is_heading(text, start, end):
+        line_start = start == 0 or text[start - 1] == "\n"
+        line_end = end == len(text) or text[end] == "\n"
+        return (line_start and line_end and end - start <= HEADING_MAX_CHARS
+                and text[end - 1] not in SENTENCE_END_CHARS)
+
+    def _counted(self, text, spans):
+        counts = self.token_counts([text[start:end] for start, end in spans])
+        return [(start, end, tokens) for (start, end), tokens in zip(spans, counts)]
+
+    def _segments(self, text):
+        """(start, end, tokens, heading) for each sentence, or for each word of an over-long sentence."""
+        matches = SENTENCE_RE.finditer(text)
+        while True:
+            batch = [match.span() for _, match in zip(range(COUNT_BATCH), matches)]
+            if not batch:
+                return
+            for start, end, tokens in self._counted(text, batch):
+                if tokens <= self.max_tokens:
+                    yield start, end, tokens, self._is_heading(text, start, end)
+                    continue
+                words = [match.span() for match in WORD_RE.finditer(text, start, end)]
+                for i in range(0, len(words), COUNT_BATCH):
+                    for word in self._counted(text, words[i:i + COUNT_BATCH]):
+                        yield (*word, False)
+
+    def chunks(self, text):
+        window = deque()
+        used = 0
+        for start, end, tokens, heading in self._segments(text):
+            if window and (used + tokens > self.max_tokens or (heading and used >= self.heading_tokens)):
+                carried = window.pop() if window[-1][3] and len(window) > 1 else None
+                yield text[window[0][0]:window[-1][1]]
+                if carried is not None or heading:
+                    # A new section starts here; the previous one's tail is not carried into it.
+                    window = deque([carried] if carried is not None else [])
+                else:
+                    while window and (used > self.overlap_tokens or used + tokens > self.max_tokens):
+                        used -= window.popleft()[2]
+                used = sum(segment[2] for segment in window)
+                while window and used + tokens > self.max_tokens:
+                    used -= window.popleft()[2]
+            window.append((start, end, tokens, heading))
+            used += tokens
+        if window:
+            yield text[window[0][0]:window[-1][1]]
+
+    def split_text(self, text):
+        return list(self.chunks(text))
+
+
+_default_chunker = None
+
+
+def default_chunker():
+    """A TextChunker counting with the embedder's tokenizer, loaded once per process."""
+    global _default_chunker
+    if _default_chunker is None:
+        tokenizer = load_tokenizer()
+        _default_chunker = TextChunker(tokenizer_counter(tokenizer) if tokenizer is not None else estimate_tokens)
+    return _default_chunker
+
+
+def chunk_text(text):
+    return default_chunker().split_text(text)